@@ -0,0 +1,13 @@
+"""Benchmarks for the site generator
+
+Run from the repository root with python3 -m bench, see python3 -m bench --help.
+The generator modules live in src/ and import each other by bare name, so src
+is put on the path here.
+"""
+
+import sys
+from pathlib import Path
+
+SRC_PATH = Path(__file__).resolve().parent.parent.joinpath("src")
+if str(SRC_PATH) not in sys.path:
+    sys.path.insert(0, str(SRC_PATH))
@@ -0,0 +1,175 @@
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import platform
+import statistics
+import tempfile
+from collections.abc import Callable
+from pathlib import Path
+
+from bench.corpus import generate_corpus
+
+import config as cfg
+from blocks import get_block_type, markdown_to_blocks
+from main import SiteBuilder, parse_args
+from md_converter import md_to_html_node
+from textnode import block_to_text_nodes
+
+REPO_PATH = Path(__file__).resolve().parent.parent
+BASELINE_PATH = REPO_PATH.joinpath("bench", "baseline.json")
+
+
+def time_it(func: Callable[[], object], repeat: int) -> dict[str, float]:
+    samples: list[float] = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        _ = func()
+        samples.append(time.perf_counter() - started)
+
+    return {"min": min(samples), "median": statistics.median(samples)}
+
+
+def run_benchmarks(args: argparse.Namespace) -> dict[str, object]:
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        pages = generate_corpus(
+            root.joinpath(cfg.get_content_path()),
+            pages=args.pages,
+            blocks_per_page=args.blocks,
+            inline_density=args.inline_density,
+            list_length=args.list_length,
+            code_lines=args.code_lines,
+            seed=args.seed,
+        )
+        _ = shutil.copy(REPO_PATH.joinpath(cfg.get_template_path()), root)
+        _ = shutil.copytree(
+            REPO_PATH.joinpath(cfg.get_static_path()),
+            root.joinpath(cfg.get_static_path()),
+        )
+
+        markdown = [page.read_text() for page in pages]
+        blocks = [block for md in markdown for block in markdown_to_blocks(md)]
+        blocks = [block for block in blocks if block]
+        inline = [
+            block
+            for block in blocks
+            if get_block_type(block).value in ("paragraph", "heading")
+        ]
+
+        # without the render cache, so every repeat renders every block again
+        build_args = parse_args(["--full", "--no-cache", "--jobs", str(args.jobs)])
+
+        def _build():
+            SiteBuilder(build_args).build(full=True)
+
+        cwd = os.getcwd()
+        os.chdir(root)
+        try:
+            results = {
+                "markdown_to_blocks": time_it(
+                    lambda: [markdown_to_blocks(md) for md in markdown], args.repeat
+                ),
+                "get_block_type": time_it(
+                    lambda: [get_block_type(block) for block in blocks], args.repeat
+                ),
+                "block_to_text_nodes": time_it(
+                    lambda: [block_to_text_nodes(block) for block in inline],
+                    args.repeat,
+                ),
+                "md_to_html": time_it(
+                    lambda: [md_to_html_node(md).to_html() for md in markdown],
+                    args.repeat,
+                ),
+                "build": time_it(_build, args.repeat),
+            }
+        finally:
+            os.chdir(cwd)
+
+    return {
+        "python": platform.python_version(),
+        "corpus": {
+            "pages": args.pages,
+            "blocks": len(blocks),
+            "inline_density": args.inline_density,
+            "list_length": args.list_length,
+            "code_lines": args.code_lines,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+
+
+def compare(
+    report: dict[str, object], baseline: dict[str, object], tolerance: float
+) -> list[str]:
+    """Return a message for every benchmark slower than the baseline allows"""
+    if baseline.get("corpus") != report["corpus"]:
+        return ["baseline was recorded with a different corpus, re-record it"]
+
+    regressions: list[str] = []
+    for name, timing in report["results"].items():
+        expected = baseline["results"].get(name)
+        if expected is None:
+            continue
+        if timing["min"] > expected["min"] * (1 + tolerance):
+            regressions.append(
+                f"{name}: {timing['min'] * 1000:.1f}ms vs baseline "
+                f"{expected['min'] * 1000:.1f}ms"
+            )
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="python3 -m bench", description="Time the generator's hot paths"
+    )
+    _ = parser.add_argument("--pages", type=int, default=200)
+    _ = parser.add_argument("--blocks", type=int, default=30, help="blocks per page")
+    _ = parser.add_argument("--inline-density", type=float, default=0.1)
+    _ = parser.add_argument("--list-length", type=int, default=6)
+    _ = parser.add_argument("--code-lines", type=int, default=10)
+    _ = parser.add_argument("--seed", type=int, default=0)
+    _ = parser.add_argument("--repeat", type=int, default=5)
+    _ = parser.add_argument("--jobs", type=int, default=1)
+    _ = parser.add_argument("--output", type=Path, help="write the JSON report here")
+    _ = parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    _ = parser.add_argument(
+        "--save-baseline", action="store_true", help="record this run as the baseline"
+    )
+    _ = parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="allowed slowdown against the baseline, as a fraction",
+    )
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    report = run_benchmarks(args)
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        _ = args.output.write_text(text + "\n")
+
+    if args.save_baseline:
+        _ = args.baseline.write_text(text + "\n")
+        return
+
+    if not args.baseline.exists():
+        print(f"no baseline at {args.baseline}", file=sys.stderr)
+        return
+
+    regressions = compare(report, json.loads(args.baseline.read_text()), args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}", file=sys.stderr)
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
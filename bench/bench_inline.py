@@ -0,0 +1,55 @@
+"""Compare block_to_text_nodes with the previous five-pass splitter
+
+Run from the repository root: python3 -m bench.bench_inline
+"""
+
+import timeit
+import logging
+
+from textnode import (
+    TextNode,
+    TextType,
+    _split_node_images,
+    _split_node_links,
+    _split_nodes,
+    block_to_text_nodes,
+)
+
+INLINE_HEAVY = " ".join(
+    [
+        "Some **bold** words, an _italic_ aside and `inline code`,",
+        "a [link](https://www.boot.dev) and ![an image](/images/tom.png)",
+    ]
+    * 20
+)
+PLAIN = "A paragraph of plain prose with no markup at all in it. " * 40
+
+
+def five_pass(text: str) -> list[TextNode]:
+    removed_nl = " ".join(line.strip() for line in text.splitlines())
+    text_node = TextNode(removed_nl, TextType.TEXT)
+    nodes = _split_nodes([text_node], extractor=_split_node_images)
+    nodes = _split_nodes(nodes, extractor=_split_node_links)
+    nodes = _split_nodes(nodes, "`", TextType.CODE)
+    nodes = _split_nodes(nodes, "_", TextType.ITALIC)
+    return _split_nodes(nodes, "**", TextType.BOLD)
+
+
+def main():
+    logging.disable(logging.DEBUG)
+    assert five_pass(INLINE_HEAVY) == block_to_text_nodes(INLINE_HEAVY)
+
+    for name, text in (("inline heavy", INLINE_HEAVY), ("plain", PLAIN)):
+        number = 2000
+        old = min(timeit.repeat(lambda: five_pass(text), number=number, repeat=5))
+        new = min(
+            timeit.repeat(lambda: block_to_text_nodes(text), number=number, repeat=5)
+        )
+        print(
+            f"{name:>12}: five pass {old / number * 1e6:8.1f}us"
+            f"  single pass {new / number * 1e6:8.1f}us  ({old / new:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
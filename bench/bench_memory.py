@@ -0,0 +1,41 @@
+"""Peak memory and allocations while rendering one large synthetic page
+
+Run from the repository root: python3 -m bench.bench_memory
+"""
+
+import gc
+import random
+import logging
+import tracemalloc
+
+from bench.corpus import DEFAULT_BLOCK_MIX, random_block
+from md_converter import md_to_html_node
+
+
+def main():
+    logging.disable(logging.INFO)
+    rng = random.Random(0)
+    kinds, weights = list(DEFAULT_BLOCK_MIX), list(DEFAULT_BLOCK_MIX.values())
+    blocks = rng.choices(kinds, weights, k=2000)
+    markdown = "\n\n".join(random_block(rng, kind, 0.2, 6, 10) for kind in blocks)
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    node = md_to_html_node(markdown)
+    _, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    stats = after.compare_to(before, "filename")
+    allocations = sum(stat.count_diff for stat in stats if stat.count_diff > 0)
+    retained = sum(stat.size_diff for stat in stats)
+    print(f"markdown size:    {len(markdown) / 1024:8.1f} KiB")
+    print(f"peak traced:      {peak / 1024:8.1f} KiB")
+    print(f"tree retained:    {retained / 1024:8.1f} KiB")
+    print(f"live allocations: {allocations:8d}")
+    del node
+
+
+if __name__ == "__main__":
+    main()
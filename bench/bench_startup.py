@@ -0,0 +1,100 @@
+"""Cold-start import time of main.py, checked against a budget
+
+Run from the repository root: python3 -m bench.bench_startup
+
+Each run is a fresh interpreter under python -X importtime, so the numbers are
+what every CLI invocation pays before doing any work. Exits non-zero when the
+fastest run is over budget, or when a module only some commands need is
+imported at startup.
+"""
+
+import os
+import re
+import sys
+import argparse
+import subprocess
+
+from bench import SRC_PATH
+
+# cumulative import time of main, in milliseconds, with warm bytecode caches
+STARTUP_BUDGET_MS = 60.0
+# imported only by the commands and flags that use them
+LAZY_MODULES = (
+    "asyncio",
+    "concurrent.futures.process",
+    "cProfile",
+    "http.server",
+    "PIL",
+    "assets",
+    "compress",
+    "images",
+    "links",
+    "search",
+    "server",
+    "watch",
+)
+# "import time: self [us] | cumulative | imported package"
+_LINE_RE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)")
+
+
+def import_times(module: str) -> dict[str, tuple[int, int]]:
+    """Self and cumulative microseconds of every module importing module loads"""
+    env = dict(os.environ)
+    # bytecode is written by the warm-up run, as it would be by any install
+    _ = env.pop("PYTHONDONTWRITEBYTECODE", None)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SRC_PATH,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    times: dict[str, tuple[int, int]] = {}
+    for match in _LINE_RE.finditer(result.stderr):
+        times[match[4]] = (int(match[1]), int(match[2]))
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="python3 -m bench.bench_startup",
+        description="Check main.py imports within its startup budget",
+    )
+    _ = parser.add_argument("--repeat", type=int, default=5)
+    _ = parser.add_argument(
+        "--budget",
+        type=float,
+        default=STARTUP_BUDGET_MS,
+        help="allowed cumulative import time of main, in milliseconds",
+    )
+    _ = parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    _ = import_times("main")  # warm up bytecode and the OS file cache
+    runs = [import_times("main") for _ in range(args.repeat)]
+    fastest = min(runs, key=lambda times: times["main"][1])
+    total = fastest["main"][1] / 1000
+
+    print(f"import main: {total:6.1f}ms (budget {args.budget:.1f}ms)")
+    slowest = sorted(fastest.items(), key=lambda item: item[1][0], reverse=True)
+    for name, (own, _) in slowest[: args.top]:
+        print(f"  {own / 1000:6.1f}ms  {name}")
+
+    failures: list[str] = []
+    if total > args.budget:
+        failures.append(f"import main took {total:.1f}ms, over {args.budget:.1f}ms")
+    failures.extend(
+        f"{name} is imported at startup, import it where it is used"
+        for name in LAZY_MODULES
+        if name in fastest
+    )
+    for failure in failures:
+        print(f"REGRESSION {failure}", file=sys.stderr)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import random
+from pathlib import Path
+
+WORDS = (
+    "the ring bearer walked through rivendell towards mordor while elves sang of "
+    "valinor and dwarves counted gold beneath the misty mountains as hobbits ate "
+    "second breakfast in the shire under a grey sky"
+).split()
+
+# relative weights of each block type in a generated page
+DEFAULT_BLOCK_MIX = {
+    "paragraph": 5,
+    "heading": 1,
+    "code": 1,
+    "quote": 1,
+    "unordered": 1,
+    "ordered": 1,
+}
+
+
+def generate_corpus(
+    root: Path,
+    pages: int = 200,
+    blocks_per_page: int = 30,
+    block_mix: dict[str, int] | None = None,
+    inline_density: float = 0.1,
+    list_length: int = 6,
+    code_lines: int = 10,
+    seed: int = 0,
+) -> list[Path]:
+    """Write a synthetic content/ tree under root and return the page paths
+
+    inline_density is the chance that any word is wrapped in inline markup.
+    """
+    rng = random.Random(seed)
+    mix = block_mix or DEFAULT_BLOCK_MIX
+    kinds, weights = list(mix), list(mix.values())
+
+    written: list[Path] = []
+    for i in range(pages):
+        # nest pages a couple of levels deep, like content/blog/<post>/index.md
+        path = root.joinpath(f"section{i % 10}", f"page{i}", "index.md")
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        blocks = [f"# Page {i} about {rng.choice(WORDS)}"]
+        for kind in rng.choices(kinds, weights, k=blocks_per_page):
+            block = random_block(rng, kind, inline_density, list_length, code_lines)
+            blocks.append(block)
+        _ = path.write_text("\n\n".join(blocks) + "\n")
+        written.append(path)
+
+    return written
+
+
+def random_block(
+    rng: random.Random,
+    kind: str,
+    inline_density: float,
+    list_length: int,
+    code_lines: int,
+) -> str:
+    match kind:
+        case "heading":
+            return "#" * rng.randint(2, 6) + " " + _sentence(rng, 6, inline_density)
+        case "code":
+            lines = [f"value_{n} = compute({n})" for n in range(code_lines)]
+            return "```python\n" + "\n".join(lines) + "\n```"
+        case "quote":
+            return "\n".join(
+                "> " + _sentence(rng, 10, 0) for _ in range(rng.randint(1, 4))
+            )
+        case "unordered":
+            return "\n".join(
+                "- " + _sentence(rng, 8, inline_density) for _ in range(list_length)
+            )
+        case "ordered":
+            return "\n".join(
+                f"{n}. " + _sentence(rng, 8, inline_density)
+                for n in range(1, list_length + 1)
+            )
+        case _:
+            return "\n".join(
+                _sentence(rng, 16, inline_density) for _ in range(rng.randint(1, 4))
+            )
+
+
+def _sentence(rng: random.Random, length: int, inline_density: float) -> str:
+    words: list[str] = []
+    for _ in range(length):
+        word = rng.choice(WORDS)
+        if rng.random() < inline_density:
+            word = rng.choice(
+                (
+                    f"**{word}**",
+                    f"_{word}_",
+                    f"`{word}`",
+                    f"[{word}](/blog/{word})",
+                    f"![{word}](/images/{word}.png)",
+                )
+            )
+        words.append(word)
+
+    return " ".join(words)
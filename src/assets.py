@@ -0,0 +1,90 @@
+import logging
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from manifest import hash_bytes, hash_if_changed, load_json_state, save_json_state
+from minify import minify_css
+from sync import publish_file, same_contents
+
+logger = logging.getLogger(__name__)
+
+# hex digits of the content hash put in fingerprinted names, e.g. index.1a2b3c4d5e6f.css
+FINGERPRINT_LENGTH = 12
+
+
+def fingerprinted_name(name: str, digest: str) -> str:
+    stem, dot, suffix = name.rpartition(".")
+    if not dot:
+        return f"{name}.{digest[:FINGERPRINT_LENGTH]}"
+    return f"{stem}.{digest[:FINGERPRINT_LENGTH]}.{suffix}"
+
+
+def fingerprint_assets(
+    sources: Iterable[Path],
+    static_path: Path,
+    index_path: Path,
+    minify: bool = False,
+    jobs: int = 1,
+) -> dict[str, str]:
+    """{URL: fingerprinted URL} for static files, from a hash of their published form
+
+    Hashes come from the sources, so URLs are known before anything is copied.
+    CSS is hashed as minified when minify is on, since that is what gets served.
+    """
+    index: dict[str, dict[str, int | str | bool]] = load_json_state(index_path)
+    sources = list(sources)
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        digests = list(pool.map(lambda src: _digest(src, index, minify), sources))
+    save_json_state(index_path, index, indent=2)
+
+    assets: dict[str, str] = {}
+    for src, digest in zip(sources, digests):
+        rel = src.relative_to(static_path)
+        hashed = rel.with_name(fingerprinted_name(rel.name, digest))
+        assets[f"/{rel.as_posix()}"] = f"/{hashed.as_posix()}"
+
+    return assets
+
+
+def _digest(
+    src: Path, index: dict[str, dict[str, int | str | bool]], minify: bool
+) -> str:
+    minified = minify and src.suffix == ".css"
+    key = src.as_posix()
+    known = index.get(key)
+    if known is not None and known["minified"] != minified:
+        known = None  # hashed in the other form
+
+    def _hash_published(path: Path) -> str:
+        data = path.read_bytes()
+        if minified:
+            data = minify_css(data.decode()).encode()
+        return hash_bytes(data)
+
+    digest, stat = hash_if_changed(src, known, _hash_published)
+    # written from several threads, but each to its own key
+    index[key] = {
+        "hash": digest,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "minified": minified,
+    }
+    return digest
+
+
+def link_fingerprinted(assets: dict[str, str], public_path: Path) -> dict[str, str]:
+    """Hardlink each published asset to its fingerprinted name, returning {key: output}
+
+    The plain name is kept, so references from CSS and other sites keep working.
+    """
+    outputs: dict[str, str] = {}
+    for url, hashed_url in assets.items():
+        output = public_path.joinpath(url[1:])
+        hashed = public_path.joinpath(hashed_url[1:])
+        if not (hashed.exists() and same_contents(output, hashed)):
+            publish_file(output, hashed)
+            logger.info("fingerprinted %s as %s", output, hashed)
+        outputs[f"{output.as_posix()}#fingerprint"] = hashed.as_posix()
+
+    return outputs
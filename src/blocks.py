@@ -1,11 +1,13 @@
 from enum import Enum
+import os
 import logging
-from config import get_logging_level
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import override
+from config import get_languages
+from largefile import iter_mmap_lines
 
 logger = logging.getLogger(__name__)
-logging.basicConfig(
-    level=get_logging_level(),
-)
 
 
 class BlockType(Enum):
@@ -17,60 +19,212 @@ class BlockType(Enum):
     ORDERED_LIST = "ordered list"
 
 
+class Block:
+    """A block with its type already known and its markers stripped from lines
+
+    Headings hold their text as the only line, and code blocks hold the code with
+    the fence and any recognised language line removed. line is where the block
+    starts in its source, counting from 1, or 0 when it was not lexed from one.
+    """
+
+    __slots__ = ("block_type", "lines", "level", "language", "line")
+
+    def __init__(
+        self,
+        block_type: BlockType,
+        lines: list[str],
+        level: int = 0,
+        language: str | None = None,
+        line: int = 0,
+    ):
+        self.block_type: BlockType = block_type
+        self.lines: list[str] = lines
+        self.level: int = level
+        self.language: str | None = language
+        self.line: int = line
+
+    @override
+    def __eq__(self, other: object):
+        if not isinstance(other, Block):
+            return False
+
+        return (
+            self.block_type == other.block_type
+            and self.lines == other.lines
+            and self.level == other.level
+            and self.language == other.language
+        )
+
+    @override
+    def __repr__(self):
+        return (
+            f"Block({self.block_type.value}, {self.lines}, {self.level}, "
+            f"{self.language})"
+        )
+
+
+UNORDERED_PREFIXES = ("-", "+", "*")
+# fence languages are looked up once per code block, so keep them hashed
+LANGUAGES = frozenset(get_languages())
+
+
+class _BlockBuilder:
+    """Collects one block's lines, narrowing down its type as each line arrives"""
+
+    __slots__ = (
+        "lines",
+        "first_token",
+        "last_text",
+        "quote",
+        "bullet",
+        "ordered",
+        "start",
+    )
+
+    def __init__(self):
+        self.lines: list[str] = []
+        self.start: int = 0
+        self.first_token: str | None = None
+        self.last_text: str = ""
+        self.quote: bool = True
+        self.bullet: str | None = None
+        self.ordered: bool = True
+
+    def add(self, line: str):
+        number = len(self.lines) + 1
+        self.lines.append(line)
+
+        tokens = line.split(maxsplit=1)
+        if tokens:
+            self.last_text = line
+            if self.first_token is None:
+                self.first_token = tokens[0]
+
+        self.quote = self.quote and line.startswith(">")
+        if number == 1:
+            is_bullet = bool(tokens) and tokens[0] in UNORDERED_PREFIXES
+            self.bullet = tokens[0] if is_bullet else None
+        elif self.bullet is not None and (not tokens or tokens[0] != self.bullet):
+            self.bullet = None
+        self.ordered = self.ordered and line.split(" ", 1)[0] == f"{number}."
+
+    def block_type(self) -> BlockType:
+        first = self.first_token or ""
+        if first and all(char == "#" for char in first) and len(first) <= 6:
+            return BlockType.HEADING
+        elif first.startswith("```") and self.last_text.rstrip().endswith("```"):
+            return BlockType.CODE
+        elif self.quote:
+            return BlockType.QUOTE
+        elif self.bullet is not None:
+            return BlockType.UNORDERED_LIST
+        elif self.ordered:
+            return BlockType.ORDERED_LIST
+        else:
+            return BlockType.PARAGRAPH
+
+    def finish(self) -> Block:
+        block_type = self.block_type()
+        match block_type:
+            case BlockType.HEADING:
+                words = " ".join(self.lines).split()
+                return Block(
+                    block_type,
+                    [" ".join(words[1:])],
+                    level=len(words[0]),
+                    line=self.start,
+                )
+            case BlockType.CODE:
+                return _code_block("\n".join(self.lines), self.start)
+            case BlockType.QUOTE | BlockType.UNORDERED_LIST | BlockType.ORDERED_LIST:
+                # markers end at the block's first space, measured from the first line
+                space_idx = "\n".join(self.lines).find(" ")
+                return Block(
+                    block_type,
+                    [line[space_idx + 1 :] for line in self.lines],
+                    line=self.start,
+                )
+            case _:
+                return Block(block_type, self.lines, line=self.start)
+
+
+def _code_block(block: str, start: int = 0) -> Block:
+    # also remove leading new lines and empty space
+    code = block.strip()[3:-3].strip()
+    language = code.split("\n", 1)[0]
+    if code and language.lower() in LANGUAGES:
+        lines = code[len(language) + 1 :].split("\n")
+        return Block(BlockType.CODE, lines, language=language, line=start)
+
+    return Block(BlockType.CODE, code.split("\n"), line=start)
+
+
+def lex_blocks(markdown: str) -> Iterator[Block]:
+    """Split markdown into typed blocks in one pass over its lines"""
+    return lex_lines(markdown.splitlines())
+
+
+def lex_lines(lines: Iterable[str]) -> Iterator[Block]:
+    """Like lex_blocks, but lazily over lines, e.g. from a file too big to hold"""
+    builder = _BlockBuilder()
+    in_code = False
+
+    for number, line in enumerate(lines, 1):
+        if not in_code:
+            line = line.strip()
+
+        if not line:
+            if builder.lines:
+                yield builder.finish()
+                builder = _BlockBuilder()
+                in_code = False
+            continue
+
+        if not builder.lines:
+            in_code = line.startswith("```")
+            builder.start = number
+        builder.add(line)
+
+    if builder.lines:
+        yield builder.finish()
+
+
+def read_blocks(src: Path, large_file_threshold: int) -> Iterator[Block]:
+    """The blocks of a page file, streamed from a memory map when it is large"""
+    if os.stat(src).st_size >= large_file_threshold:
+        return lex_lines(iter_mmap_lines(src))
+    with open(src, "r") as f:
+        return lex_lines(f.read().splitlines())
+
+
 def markdown_to_blocks(markdown: str) -> list[str]:
     blocks: list[str] = []
 
-    current_block = ""
+    current_block: list[str] = []
+    in_code = False
     for line in markdown.splitlines():
-        if not current_block.startswith("```"):
+        if not in_code:
             line = line.strip()
 
-        if (not line or line == "\n") and current_block:
-            blocks.append(current_block)
-            current_block = ""
+        if not line:
+            if current_block:
+                blocks.append("\n".join(current_block))
+                current_block = []
+                in_code = False
             continue
 
-        if current_block:
-            current_block += "\n"
+        if not current_block:
+            in_code = line.startswith("```")
+        current_block.append(line)
 
-        current_block += line
-
-    blocks.append(current_block)
+    blocks.append("\n".join(current_block))
     logger.debug("markdown_to_blocks: blocks: %s", blocks)
     return blocks
 
 
 def get_block_type(string_block: str) -> BlockType:
-    def _is_ordered_list(lines: list[str]):
-        number = 1
-
-        for line in lines:
-            parts = line.split(" ")
-            if parts[0] != f"{number}.":
-                return False
-            number += 1
+    builder = _BlockBuilder()
+    for line in string_block.splitlines():
+        builder.add(line)
 
-        return True
-
-    parts = string_block.split()
-    lines = string_block.splitlines()
-
-    unordered_prefixes = ["-", "+", "*"]
-
-    if all(char == "#" for char in parts[0]) and len(parts[0]) <= 6:
-        return BlockType.HEADING
-    elif string_block.strip().startswith("```") and string_block.strip().endswith(
-        "```"
-    ):
-        return BlockType.CODE
-    elif all(line.startswith(">") for line in lines):
-        return BlockType.QUOTE
-    elif any(
-        all(line.split()[0] == prefix for line in lines)
-        for prefix in unordered_prefixes
-    ):
-        return BlockType.UNORDERED_LIST
-    elif _is_ordered_list(lines):
-        return BlockType.ORDERED_LIST
-    else:
-        return BlockType.PARAGRAPH
+    return builder.block_type()
@@ -0,0 +1,124 @@
+import os
+import gzip
+import logging
+from collections.abc import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import config as cfg
+from manifest import CompressedEntry, hash_bytes, hash_if_changed
+
+try:
+    import brotli
+except ImportError:  # optional, only .gz files are written without it
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+
+def _gzip(data: bytes) -> bytes:
+    # a fixed mtime keeps the output reproducible, so unchanged files stay unchanged
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def _brotli(data: bytes) -> bytes:
+    return brotli.compress(data, quality=11)
+
+
+def compressors() -> dict[str, Callable[[bytes], bytes]]:
+    """Suffix -> compress function for every format available here"""
+    available = {".gz": _gzip}
+    if brotli is not None:
+        available[".br"] = _brotli
+    return available
+
+
+def compress_outputs(
+    outputs: Iterable[Path],
+    previous: dict[str, CompressedEntry],
+    jobs: int = 1,
+    min_bytes: int = 1024,
+    max_ratio: float = 0.9,
+) -> dict[str, CompressedEntry]:
+    """Write .gz and .br next to compressible outputs, returning {output: entry}
+
+    Outputs whose contents hash as they did last build keep their variants. A
+    variant is only kept when the output is at least min_bytes and compresses to
+    at most max_ratio of its size, as smaller wins cost more to serve than they save.
+    """
+    suffixes = cfg.get_compress_suffixes()
+    files = [path for path in outputs if path.suffix in suffixes]
+    available = compressors()
+
+    def _compress(path: Path) -> tuple[CompressedEntry, bool]:
+        return _compress_file(
+            path, previous.get(path.as_posix()), available, min_bytes, max_ratio
+        )
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        results = list(pool.map(_compress, files))
+
+    updated = sum(changed for _, changed in results)
+    logger.info(
+        "compressed outputs with %s: %d updated, %d unchanged",
+        "/".join(available),
+        updated,
+        len(files) - updated,
+    )
+    return {path.as_posix(): entry for path, (entry, _) in zip(files, results)}
+
+
+def _compress_file(
+    path: Path,
+    known: CompressedEntry | None,
+    available: dict[str, Callable[[bytes], bytes]],
+    min_bytes: int,
+    max_ratio: float,
+) -> tuple[CompressedEntry, bool]:
+    data: bytes | None = None
+
+    def _read_and_hash(path: Path) -> str:
+        # keep the bytes, they are compressed below if the hash changed
+        nonlocal data
+        data = path.read_bytes()
+        return hash_bytes(data)
+
+    digest, stat = hash_if_changed(path, known, _read_and_hash)
+
+    if (
+        known is not None
+        and known["hash"] == digest
+        and set(known["variants"]) <= set(available)
+        and all(_variant(path, suffix).exists() for suffix in known["variants"])
+    ):
+        logger.debug("%s unchanged, keeping its compressed copies", path)
+        entry = known.copy()
+        entry.update(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+        return entry, False
+
+    if data is None:
+        data = path.read_bytes()
+    variants: list[str] = []
+    for suffix, compress in available.items():
+        variant = _variant(path, suffix)
+        packed = compress(data) if len(data) >= min_bytes else None
+        if packed is None or len(packed) > len(data) * max_ratio:
+            variant.unlink(missing_ok=True)
+            continue
+
+        tmp = variant.with_name(f".{variant.name}.tmp")
+        _ = tmp.write_bytes(packed)
+        os.replace(tmp, variant)
+        variants.append(suffix)
+
+    entry: CompressedEntry = {
+        "hash": digest,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "variants": variants,
+    }
+    return entry, True
+
+
+def _variant(path: Path, suffix: str) -> Path:
+    return path.with_name(path.name + suffix)
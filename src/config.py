@@ -48,6 +48,35 @@ PUBLIC_PATH = Path("public")
 STATIC_PATH = Path("static")
 CONTENT_PATH = Path("content")
 TEMPLATE_PATH: Path = Path("template.html")
+LAYOUTS_PATH = Path("layouts")
+PARTIALS_PATH = Path("partials")
+CACHE_PATH = Path(".cache")
+# pages at least this big are streamed from a memory map instead of read whole
+LARGE_FILE_THRESHOLD = 8 * 1024 * 1024
+# bump when rendered HTML changes, so cached blocks from older builds go unused
+RENDERER_VERSION = 2
+RENDER_CACHE_MAX_BYTES = 64 * 1024 * 1024
+# pages read ahead of, and rendered ahead of writing, by the build pipeline
+PIPELINE_DEPTH = 8
+# the most pages sent to a --jobs worker at once, so big sites stream through them
+RENDER_BATCH_MAX_PAGES = 32
+# outputs given .gz and .br copies with --compress, when the copy saves enough
+COMPRESS_SUFFIXES = frozenset({".html", ".css", ".svg", ".json"})
+COMPRESS_MIN_BYTES = 1024
+COMPRESS_MAX_RATIO = 0.9
+# with --images, static/images/ is resized to these widths for srcset
+IMAGES_PATH = Path("images")
+IMAGE_WIDTHS = (480, 960, 1600)
+IMAGE_QUALITY = 82
+# matches the 800px max-width of the page body in static/index.css
+IMAGE_SIZES = "(max-width: 800px) 100vw, 800px"
+# with --search, terms sharing this prefix go in one shard of the index
+SEARCH_PATH = Path("search")
+SEARCH_PREFIX_LENGTH = 2
+SEARCH_HEADING_WEIGHT = 3
+# `main.py serve` keeps files up to this size in memory, up to the total below
+SERVE_CACHE_MAX_FILE_BYTES = 1024 * 1024
+SERVE_CACHE_MAX_BYTES = 64 * 1024 * 1024
 LOGGING_LEVEL = logging.INFO
 
 
@@ -71,5 +100,109 @@ def get_template_path() -> Path:
     return TEMPLATE_PATH
 
 
+def get_layouts_path() -> Path:
+    return LAYOUTS_PATH
+
+
+def get_partials_path() -> Path:
+    return PARTIALS_PATH
+
+
+def get_cache_path() -> Path:
+    return CACHE_PATH
+
+
+def get_manifest_path(public_path: Path) -> Path:
+    return CACHE_PATH.joinpath(f"manifest-{public_path.name}.json")
+
+
+def get_render_cache_path() -> Path:
+    return CACHE_PATH.joinpath("render.sqlite")
+
+
+def get_render_cache_max_bytes() -> int:
+    return RENDER_CACHE_MAX_BYTES
+
+
+def get_renderer_version() -> int:
+    return RENDERER_VERSION
+
+
+def get_pipeline_depth() -> int:
+    return PIPELINE_DEPTH
+
+
+def get_render_batch_max_pages() -> int:
+    return RENDER_BATCH_MAX_PAGES
+
+
+def get_compress_suffixes() -> frozenset[str]:
+    return COMPRESS_SUFFIXES
+
+
+def get_compress_min_bytes() -> int:
+    return COMPRESS_MIN_BYTES
+
+
+def get_compress_max_ratio() -> float:
+    return COMPRESS_MAX_RATIO
+
+
+def get_images_path() -> Path:
+    return STATIC_PATH.joinpath(IMAGES_PATH)
+
+
+def get_images_cache_path() -> Path:
+    return CACHE_PATH.joinpath("images")
+
+
+def get_image_widths() -> tuple[int, ...]:
+    return IMAGE_WIDTHS
+
+
+def get_image_quality() -> int:
+    return IMAGE_QUALITY
+
+
+def get_image_sizes() -> str:
+    return IMAGE_SIZES
+
+
+def get_assets_index_path() -> Path:
+    return CACHE_PATH.joinpath("assets.json")
+
+
+def get_search_path(public_path: Path) -> Path:
+    return public_path.joinpath(SEARCH_PATH)
+
+
+def get_search_state_path(public_path: Path) -> Path:
+    return CACHE_PATH.joinpath(f"search-{public_path.name}.json")
+
+
+def get_search_prefix_length() -> int:
+    return SEARCH_PREFIX_LENGTH
+
+
+def get_search_heading_weight() -> int:
+    return SEARCH_HEADING_WEIGHT
+
+
+def get_links_state_path(public_path: Path) -> Path:
+    return CACHE_PATH.joinpath(f"links-{public_path.name}.json")
+
+
+def get_serve_cache_max_bytes() -> int:
+    return SERVE_CACHE_MAX_BYTES
+
+
+def get_serve_cache_max_file_bytes() -> int:
+    return SERVE_CACHE_MAX_FILE_BYTES
+
+
+def get_large_file_threshold() -> int:
+    return LARGE_FILE_THRESHOLD
+
+
 def get_logging_level():
     return LOGGING_LEVEL
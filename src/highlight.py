@@ -0,0 +1,236 @@
+import re
+import html
+import logging
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+# bump when highlighted HTML changes, so cached renders are made again
+HIGHLIGHT_VERSION = 1
+
+# Pygments' short class names, so any Pygments stylesheet colours the output
+_CLASSES = {
+    "comment": "c",
+    "string": "s",
+    "number": "m",
+    "keyword": "k",
+    "tag": "nt",
+}
+
+_NUMBER = r"\b(?:0[xXbBoO][0-9a-fA-F_]+|\d[\d_]*(?:\.\d+)?(?:[eE][+-]?\d+)?)\b"
+_IDENTIFIER = r"[A-Za-z_$][\w$]*"
+_DOUBLE = r'"(?:\\.|[^"\\\n])*"'
+_SINGLE = r"'(?:\\.|[^'\\\n])*'"
+_BACKTICK = r"`(?:\\.|[^`\\])*`"
+_SLASH_COMMENTS = (r"//[^\n]*", r"/\*.*?\*/")
+
+_C_KEYWORDS = (
+    "auto break case char const continue default do double else enum extern float "
+    "for goto if inline int long register return short signed sizeof static "
+    "struct switch typedef union unsigned void volatile while NULL true false"
+)
+_JS_KEYWORDS = (
+    "async await break case catch class const continue debugger default delete do "
+    "else export extends false finally for from function if import in instanceof "
+    "let new null of return static super switch this throw true try typeof "
+    "undefined var void while with yield"
+)
+_SHELL_KEYWORDS = (
+    "case do done elif else esac export fi for function if in local readonly "
+    "return select then until while echo exit set unset source"
+)
+_SQL_KEYWORDS = (
+    "add all alter and as asc between by case create delete desc distinct drop "
+    "else end exists false from group having in index inner insert into is join "
+    "key left like limit not null on or order outer primary references right "
+    "select set table then true union unique update values view when where with"
+)
+_KEYWORDS = {
+    "python": (
+        "False None True and as assert async await break class continue def del "
+        "elif else except finally for from global if import in is lambda match "
+        "case nonlocal not or pass raise return try while with yield self"
+    ),
+    "go": (
+        "break case chan const continue default defer else fallthrough for func go "
+        "goto if import interface map package range return select struct switch "
+        "type var nil true false iota"
+    ),
+    "javascript": _JS_KEYWORDS,
+    "typescript": _JS_KEYWORDS
+    + " abstract as declare enum implements interface keyof namespace private "
+    "protected public readonly type any boolean number string never unknown",
+    "java": (
+        "abstract assert boolean break byte case catch char class const continue "
+        "default do double else enum extends final finally float for if implements "
+        "import instanceof int interface long new null package private protected "
+        "public return short static super switch synchronized this throw throws "
+        "try void volatile while true false var record"
+    ),
+    "c": _C_KEYWORDS,
+    "cpp": _C_KEYWORDS
+    + " auto bool catch class constexpr delete explicit friend namespace new "
+    "noexcept nullptr operator override private protected public template this "
+    "throw try typename using virtual",
+    "objective-c": _C_KEYWORDS + " id self super nil YES NO BOOL",
+    "csharp": (
+        "abstract as base bool break byte case catch char class const continue "
+        "decimal default delegate do double else enum event false finally float "
+        "for foreach if in int interface internal is lock long namespace new null "
+        "object out override private protected public readonly ref return sealed "
+        "short static string struct switch this throw true try typeof using var "
+        "virtual void while async await"
+    ),
+    "rust": (
+        "as async await break const continue crate dyn else enum extern false fn "
+        "for if impl in let loop match mod move mut pub ref return self Self "
+        "static struct super trait true type unsafe use where while"
+    ),
+    "ruby": (
+        "alias and begin break case class def defined do else elsif end ensure "
+        "false for if in module next nil not or redo rescue retry return self "
+        "super then true undef unless until when while yield"
+    ),
+    "php": (
+        "abstract and array as break case catch class const continue declare "
+        "default do echo else elseif extends false final finally fn for foreach "
+        "function global if implements include instanceof interface namespace new "
+        "null or private protected public require return static switch throw "
+        "trait true try use var while yield"
+    ),
+    "swift": (
+        "as break case catch class continue default defer do else enum extension "
+        "false fileprivate for func guard if import in init internal is let nil "
+        "private protocol public repeat return self static struct super switch "
+        "throw throws true try var where while"
+    ),
+    "kotlin": (
+        "as break class continue do else false for fun if in interface is null "
+        "object package return super this throw true try typealias val var when "
+        "while data sealed override private public internal companion"
+    ),
+    "scala": (
+        "abstract case catch class def do else extends false final finally for "
+        "if implicit import lazy match new null object override package private "
+        "protected return sealed super this throw trait true try type val var "
+        "while with yield"
+    ),
+    "dart": (
+        "abstract as async await break case catch class const continue default do "
+        "else enum extends false final finally for if import in is new null "
+        "return static super switch this throw true try var void while"
+    ),
+    "bash": _SHELL_KEYWORDS,
+    "shell": _SHELL_KEYWORDS,
+    "lua": (
+        "and break do else elseif end false for function goto if in local nil not "
+        "or repeat return then true until while"
+    ),
+    "sql": _SQL_KEYWORDS,
+    "json": "true false null",
+}
+# languages whose keywords are matched whatever their case
+_CASELESS = frozenset(("sql",))
+
+
+class _Lexer:
+    __slots__ = ("pattern", "keywords", "caseless")
+
+    def __init__(self, pattern: str, keywords: str = "", caseless: bool = False):
+        self.pattern: re.Pattern[str] = re.compile(pattern, re.DOTALL)
+        self.caseless: bool = caseless
+        self.keywords: frozenset[str] = frozenset(
+            keywords.lower().split() if caseless else keywords.split()
+        )
+
+
+def _code_pattern(comments: tuple[str, ...], strings: tuple[str, ...]) -> str:
+    groups = [
+        f"(?P<comment>{'|'.join(comments)})" if comments else "",
+        f"(?P<string>{'|'.join(strings)})",
+        f"(?P<number>{_NUMBER})",
+        f"(?P<word>{_IDENTIFIER})",
+    ]
+    return "|".join(group for group in groups if group)
+
+
+_HASH = (r"#[^\n]*",)
+_C_STRINGS = (_DOUBLE, _SINGLE)
+_FAMILIES: dict[str, tuple[tuple[str, ...], tuple[str, ...]]] = {
+    "python": (
+        _HASH,
+        (r'"""(?:\\.|.)*?"""', r"'''(?:\\.|.)*?'''", _DOUBLE, _SINGLE),
+    ),
+    "go": (_SLASH_COMMENTS, (_DOUBLE, _SINGLE, _BACKTICK)),
+    "javascript": (_SLASH_COMMENTS, (_DOUBLE, _SINGLE, _BACKTICK)),
+    "typescript": (_SLASH_COMMENTS, (_DOUBLE, _SINGLE, _BACKTICK)),
+    "php": (_SLASH_COMMENTS + _HASH, _C_STRINGS),
+    "sql": ((r"--[^\n]*", r"/\*.*?\*/"), (_SINGLE, _DOUBLE)),
+    "lua": ((r"--\[\[.*?\]\]", r"--[^\n]*"), _C_STRINGS),
+    "haskell": ((r"\{-.*?-\}", r"--[^\n]*"), (_DOUBLE,)),
+    "vhdl": ((r"--[^\n]*",), (_DOUBLE,)),
+    "matlab": ((r"%[^\n]*",), _C_STRINGS),
+    "erlang": ((r"%[^\n]*",), (_DOUBLE,)),
+    "clojure": ((r";[^\n]*",), (_DOUBLE,)),
+    "assembly": ((r";[^\n]*",), _C_STRINGS),
+    "fortran": ((r"![^\n]*",), _C_STRINGS),
+    "cobol": ((r"\*>[^\n]*",), _C_STRINGS),
+    "css": ((r"/\*.*?\*/",), _C_STRINGS),
+    "json": ((), (_DOUBLE,)),
+}
+for _name in (
+    "java c cpp csharp objective-c rust swift kotlin scala dart groovy verilog"
+).split():
+    _FAMILIES[_name] = (_SLASH_COMMENTS, _C_STRINGS)
+for _name in "ruby perl r bash shell powershell julia elixir yaml".split():
+    _FAMILIES[_name] = (_HASH, _C_STRINGS)
+
+_MARKUP = (
+    r"(?P<comment><!--.*?-->)|(?P<tag></?[\w:.-]+|/?>)"
+    rf"|(?P<string>{_DOUBLE}|{_SINGLE})"
+)
+_MARKUP_LANGUAGES = frozenset(("html", "xml"))
+
+
+@lru_cache(maxsize=None)
+def _lexer(language: str) -> _Lexer | None:
+    """The lexer for language, compiled on first use so importing stays cheap"""
+    if language in _MARKUP_LANGUAGES:
+        return _Lexer(_MARKUP)
+    family = _FAMILIES.get(language)
+    if family is None:
+        return None
+    return _Lexer(
+        _code_pattern(*family), _KEYWORDS.get(language, ""), language in _CASELESS
+    )
+
+
+@lru_cache(maxsize=1024)
+def highlight(code: str, language: str) -> str:
+    """Escaped code with <span class=...> around its comments, strings and keywords
+
+    Repeated samples are tokenized once per process. Languages without a lexer,
+    such as markdown, are only escaped.
+    """
+    lexer = _lexer(language.lower())
+    if lexer is None:
+        return html.escape(code, quote=False)
+
+    out: list[str] = []
+    pos = 0
+    for match in lexer.pattern.finditer(code):
+        kind = match.lastgroup or ""
+        text = match.group()
+        if kind == "word":
+            word = text.lower() if lexer.caseless else text
+            if word not in lexer.keywords:
+                continue  # plain identifiers stay in the surrounding text
+            kind = "keyword"
+
+        out.append(html.escape(code[pos : match.start()], quote=False))
+        text = html.escape(text, quote=False)
+        out.append(f'<span class="{_CLASSES[kind]}">{text}</span>')
+        pos = match.end()
+    out.append(html.escape(code[pos:], quote=False))
+
+    return "".join(out)
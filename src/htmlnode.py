@@ -1,9 +1,16 @@
 from __future__ import annotations
-from typing import override
-from collections.abc import Sequence
+from typing import override, TextIO
+from collections.abc import Iterator, Sequence
+
+
+# elements without content or a closing tag, the rest are closed even when empty
+_VOID_TAGS = frozenset(("img", "br", "hr", "input", "meta", "link"))
 
 
 class HTMLNode:
+    # pages allocate thousands of nodes, so skip the per-instance __dict__
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(
         self,
         tag: str | None = None,
@@ -17,16 +24,20 @@ class HTMLNode:
         self.props: dict[str, str] | None = props
 
     def to_html(self) -> str:
+        return "".join(self.iter_html())
+
+    def iter_html(self) -> Iterator[str]:
+        """Yield the rendered HTML in chunks, without building the whole string"""
         raise NotImplementedError
 
-    def props_to_html(self) -> str:
-        html = ""
+    def write_html(self, f: TextIO):
+        f.writelines(self.iter_html())
 
-        if self.props is not None:
-            for k, v in self.props.items():
-                html += f' {k}="{v}"'
+    def props_to_html(self) -> str:
+        if self.props is None:
+            return ""
 
-        return html
+        return "".join(f' {k}="{v}"' for k, v in self.props.items())
 
     @override
     def __repr__(self) -> str:
@@ -34,6 +45,8 @@ class HTMLNode:
 
 
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(
         self,
         tag: str | None,
@@ -48,15 +61,19 @@ class LeafNode(HTMLNode):
         if self.props:
             props_html = super().props_to_html()
 
-        if not self.value:
-            # must be an image node
-            return f"<{self.tag}{props_html}>"
-
         if not self.tag:
-            return self.value
+            return self.value or ""
+
+        if self.tag in _VOID_TAGS:
+            return f"<{self.tag}{props_html}>"
 
         return f"<{self.tag}{props_html}>{self.value}</{self.tag}>"
 
+    @override
+    def iter_html(self) -> Iterator[str]:
+        # a leaf is already a single string, so it is one chunk
+        yield self.to_html()
+
     @override
     def __repr__(self):
         return (
@@ -65,6 +82,8 @@ class LeafNode(HTMLNode):
 
 
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(
         self,
         tag: str,
@@ -74,17 +93,16 @@ class ParentNode(HTMLNode):
         super().__init__(tag, None, children, props)
 
     @override
-    def to_html(self):
+    def iter_html(self) -> Iterator[str]:
         if not self.tag:
             raise ValueError("Parent node missing tags")
         elif not self.children:
             raise ValueError("Parent node mising children")
 
-        children_html: str = ""
+        yield f"<{self.tag}>"
         for child in self.children:
-            children_html += child.to_html()
-
-        return f"<{self.tag}>{children_html}</{self.tag}>"
+            yield from child.iter_html()
+        yield f"</{self.tag}>"
 
     @override
     def __repr__(self):
@@ -0,0 +1,230 @@
+import os
+import json
+import shutil
+import logging
+from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import TypedDict
+
+from manifest import hash_bytes, hash_if_changed, load_json_state, save_json_state
+from sync import fast_copy, publish_file
+
+try:
+    from PIL import Image, features
+except ImportError:  # optional, images are copied unchanged without it
+    Image = None
+    features = None
+
+logger = logging.getLogger(__name__)
+
+# bump when variants are encoded differently, so cached ones are made again
+PIPELINE_VERSION = 1
+IMAGE_SUFFIXES = frozenset({".png", ".jpg", ".jpeg"})
+_FORMATS = {
+    ".png": ("PNG", "image/png"),
+    ".jpg": ("JPEG", "image/jpeg"),
+    ".jpeg": ("JPEG", "image/jpeg"),
+}
+
+
+class Variant(TypedDict):
+    name: str
+    width: int
+    type: str
+
+
+class ImageEntry(TypedDict):
+    dir: str
+    width: int
+    height: int
+    variants: list[Variant]
+
+
+def available() -> bool:
+    return Image is not None
+
+
+def image_sources(images_path: Path) -> list[Path]:
+    if not images_path.is_dir():
+        return []
+    return sorted(
+        path
+        for path in images_path.rglob("*")
+        if path.suffix.lower() in IMAGE_SUFFIXES and path.is_file()
+    )
+
+
+def prepare_images(
+    sources: Iterable[Path],
+    cache_path: Path,
+    jobs: int = 1,
+    widths: Iterable[int] = (480, 960, 1600),
+    quality: int = 82,
+) -> dict[Path, ImageEntry]:
+    """Encode resized and WebP variants of each image, reusing cached ones
+
+    Variants live in cache_path under a hash of the source and these settings, so
+    an image is only processed again when its contents or the settings change.
+    """
+    widths = sorted(set(widths))
+    webp = bool(features and features.check("webp"))
+    settings = json.dumps([PIPELINE_VERSION, widths, quality, webp])
+    index_path = cache_path.joinpath("index.json")
+    index: dict[str, dict[str, int | str]] = load_json_state(index_path)
+
+    entries: dict[Path, Path] = {}
+    missing: list[tuple[Path, Path]] = []
+    for src in sources:
+        digest = _source_hash(src, index)
+        entry_dir = cache_path.joinpath(hash_bytes((digest + settings).encode()))
+        entries[src] = entry_dir
+        if not entry_dir.joinpath("meta.json").exists():
+            missing.append((src, entry_dir))
+
+    if missing:
+        cache_path.mkdir(parents=True, exist_ok=True)
+        with ProcessPoolExecutor(max_workers=max(1, jobs)) as pool:
+            done = pool.map(
+                _process_image,
+                [src for src, _ in missing],
+                [entry_dir for _, entry_dir in missing],
+                [widths] * len(missing),
+                [quality] * len(missing),
+                [webp] * len(missing),
+            )
+            for (src, _), _ in zip(missing, done):
+                logger.info("optimized %s", src)
+
+    save_json_state(index_path, index, indent=2)
+    logger.info(
+        "prepared %d images: %d processed, %d cached",
+        len(entries),
+        len(missing),
+        len(entries) - len(missing),
+    )
+
+    images: dict[Path, ImageEntry] = {}
+    for src, entry_dir in entries.items():
+        with open(entry_dir.joinpath("meta.json"), "r") as f:
+            images[src] = json.load(f)
+        images[src]["dir"] = entry_dir.as_posix()
+
+    return images
+
+
+def _source_hash(src: Path, index: dict[str, dict[str, int | str]]) -> str:
+    digest, stat = hash_if_changed(src, index.get(src.as_posix()))
+    index[src.as_posix()] = {
+        "hash": digest,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+    }
+    return digest
+
+
+def _process_image(
+    src: Path, entry_dir: Path, widths: list[int], quality: int, webp: bool
+) -> None:
+    suffix = src.suffix
+    fmt, mime = _FORMATS[suffix.lower()]
+    # build next to the entry and rename it in, so a cache entry is always complete
+    tmp_dir = entry_dir.with_name(f".{entry_dir.name}.{os.getpid()}.tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+
+    variants: list[Variant] = []
+    with Image.open(src) as img:
+        img.load()
+        width, height = img.size
+        # palette images can only be resized nearest-neighbour, which looks rough
+        smooth = img.convert("RGBA") if img.mode in ("P", "1") else img
+        for target in [w for w in widths if w < width] + [width]:
+            if target == width:
+                resized, name = img, "full"
+            else:
+                size = (target, max(1, round(height * target / width)))
+                resized = smooth.resize(size, Image.Resampling.LANCZOS)
+                name = f"{target}w"
+
+            output = tmp_dir.joinpath(name + suffix)
+            _save(resized, output, fmt, quality)
+            if name == "full" and os.path.getsize(output) >= os.path.getsize(src):
+                fast_copy(src, output)  # the original was already smaller
+            variants.append({"name": output.name, "width": target, "type": mime})
+
+            if webp:
+                output = tmp_dir.joinpath(f"{name}.webp")
+                _save(resized, output, "WEBP", quality)
+                variants.append(
+                    {"name": output.name, "width": target, "type": "image/webp"}
+                )
+
+    with open(tmp_dir.joinpath("meta.json"), "w") as f:
+        json.dump({"width": width, "height": height, "variants": variants}, f)
+    try:
+        os.replace(tmp_dir, entry_dir)
+    except OSError:
+        # another build made the same entry first
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def _save(img, path: Path, fmt: str, quality: int):
+    match fmt:
+        case "PNG":
+            img.save(path, fmt, optimize=True)
+        case "JPEG":
+            if img.mode not in ("RGB", "L"):
+                img = img.convert("RGB")
+            img.save(path, fmt, quality=quality, optimize=True, progressive=True)
+        case "WEBP":
+            img.save(path, fmt, quality=quality, method=6)
+
+
+def variant_output(src: Path, name: str) -> str:
+    """Output file name of a variant, e.g. tom.png for full.png, tom-480w.webp"""
+    stem, _, suffix = name.partition(".")
+    if stem == "full":
+        return f"{src.stem}.{suffix}"
+    return f"{src.stem}-{stem}.{suffix}"
+
+
+def image_srcsets(
+    images: dict[Path, ImageEntry], static_path: Path
+) -> dict[str, list[tuple[str, int, str]]]:
+    """{image URL: [(variant URL, width, MIME type)]}, for Template to write srcset"""
+    srcsets: dict[str, list[tuple[str, int, str]]] = {}
+    for src, entry in images.items():
+        rel = src.relative_to(static_path)
+        srcsets[f"/{rel.as_posix()}"] = [
+            (
+                f"/{rel.with_name(variant_output(src, v['name'])).as_posix()}",
+                v["width"],
+                v["type"],
+            )
+            for v in entry["variants"]
+        ]
+
+    return srcsets
+
+
+def publish_images(
+    images: dict[Path, ImageEntry], static_path: Path, public_path: Path
+) -> dict[str, str]:
+    """Link cached variants into the output, returning {source: output}"""
+    outputs: dict[str, str] = {}
+    for src, entry in images.items():
+        rel = src.relative_to(static_path)
+        for variant in entry["variants"]:
+            cached = Path(entry["dir"], variant["name"])
+            name = variant_output(src, variant["name"])
+            dst = public_path.joinpath(rel.with_name(name))
+            dst.parent.mkdir(parents=True, exist_ok=True)
+            publish_file(cached, dst)
+            # one source has several outputs, key the extras so none are orphaned
+            key = src.as_posix()
+            if dst.name != src.name:
+                key += f"#{variant['name']}"
+            outputs[key] = dst.as_posix()
+
+    return outputs
@@ -0,0 +1,51 @@
+import os
+import re
+import mmap
+from collections.abc import Iterator
+from pathlib import Path
+
+# a line whose first word is "#", as extract_title looks for
+_TITLE_RE = re.compile(rb"^[ \t]*#(?:[ \t]+([^\n]*))?[ \t\r]*$", re.MULTILINE)
+
+
+def iter_mmap_lines(path: Path, window: int = 1 << 20) -> Iterator[str]:
+    """Yield the lines of a file without reading it whole
+
+    The file is memory-mapped and cut into windows on the last blank line, or
+    failing that the last newline, found by a bulk search of the byte buffer. Only
+    one window is decoded at a time, so memory stays flat however big the file is.
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            size = len(mm)
+            start = 0
+            while start < size:
+                end = min(start + window, size)
+                if end < size:
+                    cut = mm.rfind(b"\n\n", start, end)
+                    if cut < 0:
+                        cut = mm.rfind(b"\n", start, end)
+                    if cut < 0:
+                        # one line longer than the window, take all of it
+                        cut = mm.find(b"\n", end)
+                    end = size if cut < 0 else cut + 1
+
+                yield from mm[start:end].decode().splitlines()
+                start = end
+
+
+def extract_title_mmap(path: Path) -> str:
+    """extract_title for a file too big to read, searching the mapped bytes"""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            raise ValueError("no title found in markdown")
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            match = _TITLE_RE.search(mm)
+            if not match:
+                raise ValueError("no title found in markdown")
+
+            return " ".join((match.group(1) or b"").decode().split())
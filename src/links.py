@@ -0,0 +1,136 @@
+import re
+import bisect
+import logging
+import posixpath
+from collections.abc import Iterable
+from pathlib import Path
+from typing import TypedDict
+from urllib.parse import unquote
+
+from blocks import Block, BlockType, read_blocks
+from manifest import PageEntry, load_json_state, save_json_state
+from textnode import iter_references
+
+logger = logging.getLogger(__name__)
+
+# bump when references are collected differently, so every page is scanned again
+LINKS_VERSION = 2
+# http:, mailto: and the like point off the site, so they aren't checked
+_SCHEME_RE = re.compile(r"[a-zA-Z][a-zA-Z0-9+.-]*:")
+
+
+class ScannedPage(TypedDict):
+    hash: str
+    # [line, "link" or "image", url]
+    references: list[tuple[int, str, str]]
+
+
+class BrokenReference(TypedDict):
+    source: str
+    line: int
+    kind: str
+    url: str
+
+
+def page_references(blocks: Iterable[Block]) -> list[tuple[int, str, str]]:
+    """(line, "link" or "image", URL) of each reference rendered from blocks
+
+    Quotes and code are rendered as written, so anything that looks like a link
+    in them is not one. Paragraphs are scanned joined, as they are rendered, so a
+    link wrapped over lines is found and reported by the line it starts on.
+    """
+    references: list[tuple[int, str, str]] = []
+    for block in blocks:
+        match block.block_type:
+            case BlockType.CODE | BlockType.QUOTE:
+                continue
+            case BlockType.HEADING:
+                # a heading is folded onto one line, so it is reported by its first
+                runs = [(block.line, [block.lines[0]])]
+            case BlockType.PARAGRAPH:
+                runs = [(block.line, block.lines)]
+            case _:
+                # each list item is rendered on its own
+                runs = [
+                    (number, [line])
+                    for number, line in enumerate(block.lines, block.line)
+                ]
+
+        for first, lines in runs:
+            folded = [line.strip() for line in lines]
+            # where each line starts once joined, as block_to_text_nodes joins them
+            starts = [0]
+            for line in folded[:-1]:
+                starts.append(starts[-1] + len(line) + 1)
+            for offset, node in iter_references(" ".join(folded)):
+                number = first + bisect.bisect_right(starts, offset) - 1
+                references.append((number, node.text_type.value, node.url or ""))
+
+    return references
+
+
+def output_urls(outputs: Iterable[str], public_path: Path) -> set[str]:
+    """Every site-relative URL the outputs are served at, e.g. /blog/ and /blog"""
+    urls: set[str] = set()
+    for output in outputs:
+        url = "/" + Path(output).relative_to(public_path).as_posix()
+        urls.add(url)
+        if url.endswith("/index.html"):
+            urls.add(posixpath.dirname(url))
+
+    return urls
+
+
+def resolve_reference(url: str, page_url: str) -> str | None:
+    """The normalised site path url points at from page_url, None if off the site"""
+    if not url or url.startswith(("#", "//")) or _SCHEME_RE.match(url):
+        return None
+
+    path = unquote(url.split("#", 1)[0].split("?", 1)[0])
+    if not path:
+        return None
+    return posixpath.normpath(posixpath.join(page_url, path))
+
+
+def check_references(
+    pages: dict[str, PageEntry],
+    targets: set[str],
+    public_path: Path,
+    state_path: Path,
+    large_file_threshold: int,
+) -> list[BrokenReference]:
+    """Log and return the references in pages that no URL in targets answers
+
+    References are collected once per page and kept in state_path until the page
+    source hash changes, so a build only scans the pages it rendered.
+    """
+    state = load_json_state(state_path)
+    known = state["pages"] if state.get("version") == LINKS_VERSION else {}
+
+    scanned: dict[str, ScannedPage] = {}
+    broken: list[BrokenReference] = []
+    for src, entry in sorted(pages.items()):
+        page = known.get(src)
+        if page is None or page["hash"] != entry["hash"]:
+            blocks = read_blocks(Path(src), large_file_threshold)
+            page = {"hash": entry["hash"], "references": page_references(blocks)}
+        scanned[src] = page
+
+        page_dir = Path(entry["output"]).parent.relative_to(public_path).as_posix()
+        page_url = "/" if page_dir == "." else f"/{page_dir}/"
+        for line, kind, url in page["references"]:
+            path = resolve_reference(url, page_url)
+            if path is not None and path not in targets:
+                broken.append({"source": src, "line": line, "kind": kind, "url": url})
+
+    for ref in broken:
+        source, line, kind, url = ref["source"], ref["line"], ref["kind"], ref["url"]
+        logger.warning("%s:%d: broken %s to %s", source, line, kind, url)
+    logger.info(
+        "checked %d links and images in %d pages, %d broken",
+        sum(len(page["references"]) for page in scanned.values()),
+        len(scanned),
+        len(broken),
+    )
+    save_json_state(state_path, {"version": LINKS_VERSION, "pages": scanned})
+    return broken
@@ -1,20 +1,49 @@
+from __future__ import annotations
 import os
 import sys
+import argparse
 from pathlib import Path
-import shutil
 import logging
+from collections.abc import Collection, Iterable, Iterator
+from itertools import chain, islice
+from typing import TYPE_CHECKING
 
 import config as cfg
-from md_converter import md_to_html_node
+from blocks import lex_lines
+from highlight import HIGHLIGHT_VERSION
+from largefile import extract_title_mmap, iter_mmap_lines
+from manifest import BuildManifest, settings_fingerprint
+from minify import HTMLMinifier, minify_html_chunks
+from pipeline import run_pipeline
+from md_converter import blocks_to_html_chunks, md_to_html_cached, md_to_html_node
+from render_cache import RenderCache
+from shards import SHARD_MANIFEST, Shard, in_shard, parse_shard, shard_path
+from sync import sync_static, walk_files
+from template import ImageVariants, Layouts, Template, load_layouts
+from timings import Timings, stage
+
+# modules only some commands and flags need are imported where they are used,
+# so startup stays fast, see bench/bench_startup.py
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+
+    from images import ImageEntry
 
 
 logger = logging.getLogger(__name__)
-logging.basicConfig(
-    level=cfg.get_logging_level(),
-)
 
 
-def get_static_content(public_path: Path, static_path: Path):
+def get_static_content(
+    public_path: Path,
+    static_path: Path,
+    clean: bool = True,
+    manifest: BuildManifest | None = None,
+    checksum: bool = False,
+    link: bool = False,
+    jobs: int = 1,
+    minify: bool = False,
+    exclude: Collection[Path] = (),
+):
     def _delete_recursive(curr_dir: Path):
         contents = os.listdir(curr_dir)
 
@@ -27,43 +56,246 @@ def get_static_content(public_path: Path, static_path: Path):
 
             os.remove(curr_elem)
 
-    def _copy_recursive(curr_dir: Path):
-        contents = os.listdir(curr_dir)
-
-        for elem in contents:
-            curr_elem = curr_dir.joinpath(elem)
-            if not os.path.isfile(curr_elem):
-                _copy_recursive(curr_elem)
-                continue
-
-            # replace static element of path with public
-            dst = public_path.joinpath(*curr_elem.parts[1:])
-            dst.parent.mkdir(parents=True, exist_ok=True)  # Create missing directories
-
-            copied = shutil.copyfile(curr_elem, dst)
-            logger.info(f"copied {curr_elem} to {copied}")
-
     if not os.path.exists(public_path):
         os.mkdir(public_path)
-    else:
+    elif clean:
         _delete_recursive(public_path)
         logger.info("cleared %s", public_path)
 
-    _copy_recursive(static_path)
+    synced = sync_static(
+        static_path, public_path, checksum, link, jobs, minify=minify, exclude=exclude
+    )
+    if manifest:
+        manifest.static = synced
 
 
 def get_web_content(
-    public_path: Path, content_path: Path, template_path: Path, base_path: str
-):
-    content = os.listdir(content_path)
-    for item in content:
-        item_path: Path = content_path.joinpath(item)
-        if os.path.isfile(item_path):
-            generate_page(item_path, template_path, public_path, base_path)
+    public_path: Path,
+    content_path: Path,
+    template_path: Path,
+    base_path: str,
+    manifest: BuildManifest | None = None,
+    jobs: int = 1,
+    timings: Timings | None = None,
+    cache: RenderCache | None = None,
+    minify: bool = False,
+    image_variants: ImageVariants | None = None,
+    assets: dict[str, str] | None = None,
+    highlighted: bool = False,
+    shard: Shard | None = None,
+) -> Layouts:
+    """Render the pages under content_path that changed, returning the layouts used"""
+    with stage(timings, "compile_templates"):
+        layouts = load_layouts(
+            content_path,
+            template_path,
+            cfg.get_layouts_path(),
+            cfg.get_partials_path(),
+            base_path,
+            image_variants,
+            cfg.get_image_sizes(),
+            assets,
+        )
+
+    def _pending() -> Iterator[tuple[Path, Path]]:
+        for src, dst in _walk_content(public_path, content_path):
+            if shard and not in_shard(src, content_path, shard):
+                continue  # another shard renders it
+            output = dst.joinpath("index.html")
+            if manifest and not manifest.needs_render(src, output):
+                logger.debug("%s unchanged, skipping", src)
+                continue
+            yield src, dst
+
+    # pages are rendered as the walk finds them, rather than listed up front
+    pages = _timed(_pending(), timings, "walk")
+    render_pages(pages, layouts, jobs, timings, cache, minify, highlighted)
+    return layouts
+
+
+def _walk_content(
+    public_path: Path, content_path: Path
+) -> Iterator[tuple[Path, Path]]:
+    """Yield (source, output dir) pairs in sorted order, creating output dirs as it goes
+
+    The walk keeps one sorted listing per open directory instead of recursing, and
+    reads entry types from the listing, so deep or huge trees cost no extra stats.
+    """
+    public_path.mkdir(parents=True, exist_ok=True)
+    stack = [(_sorted_entries(content_path), public_path)]
+    while stack:
+        entries, dst = stack[-1]
+        entry = next(entries, None)
+        if entry is None:
+            _ = stack.pop()
+        elif entry.is_dir():
+            new_public_path = dst.joinpath(entry.name)
+            new_public_path.mkdir(exist_ok=True)
+            stack.append((_sorted_entries(Path(entry.path)), new_public_path))
         else:
-            new_public_path = public_path.joinpath(item)
-            os.mkdir(new_public_path)
-            get_web_content(new_public_path, item_path, template_path, base_path)
+            yield Path(entry.path), dst
+
+
+def _sorted_entries(path: Path) -> Iterator[os.DirEntry[str]]:
+    with os.scandir(path) as entries:
+        return iter(sorted(entries, key=lambda entry: entry.name))
+
+
+def _timed(
+    items: Iterable[tuple[Path, Path]], timings: Timings | None, name: str
+) -> Iterator[tuple[Path, Path]]:
+    """items, with the time spent producing each one added to the stage name"""
+    iterator = iter(items)
+    while True:
+        with stage(timings, name):
+            item = next(iterator, None)
+        if item is None:
+            return
+        yield item
+
+
+def render_pages(
+    pages: Iterable[tuple[Path, Path]],
+    layouts: Layouts,
+    jobs: int = 1,
+    timings: Timings | None = None,
+    cache: RenderCache | None = None,
+    minify: bool = False,
+    highlighted: bool = False,
+):
+    """Render pages as they are produced, holding only a bounded number in flight"""
+    if jobs <= 1:
+        results = _render_pipelined(
+            pages, layouts, timings, cache, minify, highlighted
+        )
+        _report_errors(results)
+        return
+
+    # a site that fits the lookahead is split evenly, as if listed up front
+    max_batch = cfg.get_render_batch_max_pages()
+    pages = iter(pages)
+    lookahead = list(islice(pages, jobs * 4 * max_batch))
+    if len(lookahead) <= 1:
+        _report_errors(
+            _render_pipelined(lookahead, layouts, timings, cache, minify, highlighted)
+        )
+        return
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor
+    from concurrent.futures import as_completed, wait
+
+    # batch pages so each worker round trip amortises the pickling overhead
+    batch_size = min(max_batch, max(1, len(lookahead) // (jobs * 4)))
+    batches = _batched(chain(lookahead, pages), batch_size)
+
+    errors: list[tuple[int, list[tuple[Path, Exception | None]]]] = []
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        pending: dict[Future, int] = {}
+        for idx, batch in enumerate(batches):
+            if len(pending) >= jobs * 2:
+                # backpressure: the walk waits for a worker instead of queueing more
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    _collect(future, pending.pop(future), errors, timings, cache)
+            future = pool.submit(
+                _render_batch,
+                batch,
+                layouts,
+                timings is not None,
+                cache,
+                minify,
+                highlighted,
+            )
+            pending[future] = idx
+        for future in as_completed(pending):
+            _collect(future, pending[future], errors, timings, cache)
+
+    errors.sort(key=lambda batch: batch[0])
+    _report_errors([result for _, results in errors for result in results])
+
+
+def _batched(
+    pages: Iterable[tuple[Path, Path]], size: int
+) -> Iterator[list[tuple[Path, Path]]]:
+    iterator = iter(pages)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def _collect(
+    future: Future,
+    idx: int,
+    errors: list[tuple[int, list[tuple[Path, Exception | None]]]],
+    timings: Timings | None,
+    cache: RenderCache | None,
+):
+    # only failures are kept, so memory doesn't grow with the number of pages
+    batch_results, batch_timings, cache_counts = future.result()
+    failed = [(src, err) for src, err in batch_results if err is not None]
+    if failed:
+        errors.append((idx, failed))
+    if timings and batch_timings:
+        timings.merge(batch_timings)
+    if cache:
+        cache.hits += cache_counts[0]
+        cache.misses += cache_counts[1]
+
+
+def _report_errors(results: list[tuple[Path, Exception | None]]):
+    # report failures in source order, whichever worker finished first
+    errors = [(src, err) for src, err in results if err is not None]
+    for src, err in errors:
+        logger.error("failed to generate page from %s: %s", src, err)
+    if errors:
+        raise errors[0][1]
+
+
+def _render_batch(
+    batch: list[tuple[Path, Path]],
+    layouts: Layouts,
+    timed: bool = False,
+    cache: RenderCache | None = None,
+    minify: bool = False,
+    highlighted: bool = False,
+) -> tuple[list[tuple[Path, Exception | None]], Timings | None, tuple[int, int]]:
+    timings = Timings() if timed else None
+    results = _render_pipelined(batch, layouts, timings, cache, minify, highlighted)
+
+    # the cache was pickled over, so hand its counts back to the parent
+    counts = (cache.hits, cache.misses) if cache else (0, 0)
+    if cache:
+        cache.close()
+    return results, timings, counts
+
+
+def _render_pipelined(
+    pages: Iterable[tuple[Path, Path]],
+    layouts: Layouts,
+    timings: Timings | None = None,
+    cache: RenderCache | None = None,
+    minify: bool = False,
+    highlighted: bool = False,
+) -> list[tuple[Path, Exception | None]]:
+    """Prefetch sources and write pages on their own threads while rendering
+
+    Only the pages that failed are returned.
+    """
+    results = run_pipeline(
+        pages,
+        lambda page: read_page(page[0], timings),
+        lambda page, md: render_page(
+            page[0],
+            md,
+            layouts.for_page(page[0]),
+            page[1],
+            timings,
+            cache,
+            highlighted,
+        ),
+        lambda page, chunks: write_page(page[0], page[1], chunks, timings, minify),
+        depth=cfg.get_pipeline_depth(),
+        failures_only=True,
+    )
+    return [(src, err) for (src, _), err in results]
 
 
 def extract_title(markdown: str):
@@ -78,43 +310,611 @@ def extract_title(markdown: str):
     raise ValueError("no title found in markdown")
 
 
-def generate_page(src: Path, template_path: Path, dst: Path, base_path: str):
-    logger.info(f"Generating page from {src} to {dst} using template {template_path}")
+def generate_page(
+    src: Path,
+    template: Template,
+    dst: Path,
+    timings: Timings | None = None,
+    cache: RenderCache | None = None,
+    minify: bool = False,
+    highlighted: bool = False,
+):
+    md = read_page(src, timings)
+    chunks = render_page(src, md, template, dst, timings, cache, highlighted)
+    write_page(src, dst, chunks, timings, minify)
+
+
+def read_page(src: Path, timings: Timings | None = None) -> str | None:
+    """The page source, or None when it is big enough to be streamed instead"""
+    if os.stat(src).st_size >= cfg.get_large_file_threshold():
+        return None
+
+    with stage(timings, "read", src.as_posix()):
+        with open(src, "r") as f:
+            return f.read()
+
+
+def render_page(
+    src: Path,
+    md: str | None,
+    template: Template,
+    dst: Path,
+    timings: Timings | None = None,
+    cache: RenderCache | None = None,
+    highlighted: bool = False,
+) -> Iterable[str]:
+    logger.info(f"Generating page from {src} to {dst} using template {template.name}")
+    page = src.as_posix()
+
+    if md is None:
+        # stream blocks from a memory map, so memory stays flat however big the page
+        logger.info(f"{src} is large, rendering it block by block")
+        with stage(timings, "extract_title", page):
+            title = extract_title_mmap(src)
+        content_html = blocks_to_html_chunks(
+            lex_lines(iter_mmap_lines(src)), highlighted
+        )
+        return template.render_chunks({"Title": title, "Content": content_html})
+
+    with stage(timings, "extract_title", page):
+        title = extract_title(md)
+    if cache:
+        with stage(timings, "md_to_html_cached", page):
+            content_html = md_to_html_cached(md, cache, highlighted)
+    else:
+        with stage(timings, "md_to_html_node", page):
+            content_html = md_to_html_node(md, highlighted).iter_html()
 
-    with open(src, "r") as f:
-        md = f.read()
+    # render fully here, so only the write is left to the writer stage
+    with stage(timings, "to_html", page):
+        return list(template.render_chunks({"Title": title, "Content": content_html}))
 
-    with open(template_path, "r") as f:
-        template = f.read()
 
-    title = extract_title(md)
-    content_html = md_to_html_node(md).to_html()
+def write_page(
+    src: Path,
+    dst: Path,
+    chunks: Iterable[str],
+    timings: Timings | None = None,
+    minify: bool = False,
+):
+    output = dst.joinpath("index.html")
+    minifier = HTMLMinifier() if minify else None
+    if minifier:
+        chunks = minify_html_chunks(chunks, minifier)
+    try:
+        with stage(timings, "write", src.as_posix()), open(output, "w") as f:
+            f.writelines(chunks)
+    except Exception:
+        # don't leave a half written page behind
+        output.unlink(missing_ok=True)
+        raise
+
+    if minifier:
+        # only whitespace is removed, so characters saved are bytes saved
+        saved = minifier.bytes_in - minifier.bytes_out
+        logger.info("minified %s, saved %d bytes", output, saved)
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Generate the static site")
+    _ = parser.add_argument("base_path", nargs="?", default="/")
+    _ = parser.add_argument(
+        "--full",
+        action="store_true",
+        help="ignore the build manifest and rebuild every page",
+    )
+    _ = parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="render pages in N worker processes, 0 uses every core",
+    )
+    _ = parser.add_argument(
+        "--checksum",
+        action="store_true",
+        help="compare static files by content hash instead of size and mtime",
+    )
+    _ = parser.add_argument(
+        "--link",
+        action="store_true",
+        help="hardlink static files into the output instead of copying them",
+    )
+    _ = parser.add_argument(
+        "--minify",
+        action="store_true",
+        help="strip needless whitespace from pages and comments from static CSS",
+    )
+    _ = parser.add_argument(
+        "--images",
+        action="store_true",
+        help="write resized and WebP variants of static images, with srcset (Pillow)",
+    )
+    _ = parser.add_argument(
+        "--fingerprint",
+        action="store_true",
+        help="link static files under content-hashed names and reference those",
+    )
+    _ = parser.add_argument(
+        "--search",
+        action="store_true",
+        help="write a full-text search index of the pages, sharded by term prefix",
+    )
+    _ = parser.add_argument(
+        "--highlight",
+        action="store_true",
+        help="highlight fenced code with a known language as <span> classes",
+    )
+    _ = parser.add_argument(
+        "--check-links",
+        action="store_true",
+        help="warn about links and images pointing at nothing the build wrote",
+    )
+    _ = parser.add_argument(
+        "--strict",
+        action="store_true",
+        help="fail the build on broken links or images, implies --check-links",
+    )
+    _ = parser.add_argument(
+        "--compress",
+        action="store_true",
+        help="write .gz (and .br with brotli installed) next to HTML, CSS and SVG",
+    )
+    _ = parser.add_argument(
+        "--shard",
+        type=parse_shard,
+        metavar="I/N",
+        help="render only shard I of N of the pages, into public.shard-I-of-N/ "
+        "for `main.py merge` to combine",
+    )
+    _ = parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="render every block instead of reusing the block render cache",
+    )
+    _ = parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="serve the site, rebuilding and reloading the browser on changes",
+    )
+    _ = parser.add_argument(
+        "--port", type=int, default=8888, help="port to serve on with --watch"
+    )
+    _ = parser.add_argument(
+        "--timings",
+        nargs="?",
+        type=Path,
+        const=cfg.get_cache_path().joinpath("timings.json"),
+        help="record per-stage and per-page times, writing a JSON report",
+    )
+    _ = parser.add_argument(
+        "--profile",
+        nargs="?",
+        type=Path,
+        const=cfg.get_cache_path().joinpath("build.prof"),
+        help="write a cProfile dump of the build, e.g. for snakeviz",
+    )
+    args = parser.parse_args(argv)
+
+    if args.shard and (args.watch or args.search or args.check_links or args.strict):
+        # each of these needs every page, which only the merged build has
+        parser.error("--shard can't be combined with --watch, --search or links checks")
+    return args
+
 
-    index_html = (
-        template.replace("{{ Title }}", title)
-        .replace("{{ Content }}", content_html)
-        .replace('href="/', f'href="{base_path}')
-        .replace('src="/', f'src="{base_path}')
+def public_path_for(base_path: str) -> Path:
+    return cfg.get_public_path() if base_path == "/" else Path("docs")
+
+
+def open_render_cache(variant: str = "") -> RenderCache:
+    return RenderCache(
+        cfg.get_render_cache_path(),
+        cfg.get_render_cache_max_bytes(),
+        cfg.get_renderer_version(),
+        variant,
     )
 
-    with open(dst.joinpath("index.html"), "w") as f:
-        _ = f.write(index_html)
 
+def cache_command(argv: list[str]):
+    """`main.py cache stats` and `main.py cache clear`"""
+    parser = argparse.ArgumentParser(
+        prog="main.py cache", description="Inspect or empty the block render cache"
+    )
+    _ = parser.add_argument("action", choices=["stats", "clear"])
+    args = parser.parse_args(argv)
+
+    cache = open_render_cache()
+    if args.action == "stats":
+        stats = cache.stats()
+        print(f"path:      {cache.path}")
+        print(f"entries:   {stats['entries']}")
+        print(f"size:      {stats['bytes'] / 1024:.1f} KiB")
+        print(f"max size:  {stats['max_bytes'] / 1024:.1f} KiB")
+    else:
+        print(f"removed {cache.clear()} cached blocks from {cache.path}")
+    cache.close()
 
-def main():
-    args = sys.argv
-    base_path = args[1] if len(args) > 1 else "/"
-    public_path = cfg.get_public_path() if base_path == "/" else Path("docs")
 
-    static_path, content_path, template_path = (
-        cfg.get_static_path(),
-        cfg.get_content_path(),
-        cfg.get_template_path(),
+def serve_command(argv: list[str]):
+    """`main.py serve`, serving an already built site without rebuilding it"""
+    parser = argparse.ArgumentParser(
+        prog="main.py serve", description="Serve a built site over HTTP"
+    )
+    _ = parser.add_argument(
+        "root",
+        nargs="?",
+        type=Path,
+        default=cfg.get_public_path(),
+        help="directory to serve, public/ by default",
+    )
+    _ = parser.add_argument("--port", type=int, default=8888)
+    _ = parser.add_argument(
+        "--host", default="", help="address to bind, all of them by default"
     )
+    args = parser.parse_args(argv)
+
+    if not args.root.is_dir():
+        parser.error(f"{args.root} is not a directory, build the site first")
+
+    import asyncio
+
+    from server import serve
+
+    try:
+        asyncio.run(
+            serve(
+                args.root,
+                args.port,
+                args.host,
+                cfg.get_serve_cache_max_bytes(),
+                cfg.get_serve_cache_max_file_bytes(),
+            )
+        )
+    except KeyboardInterrupt:
+        pass
+
+
+def merge_command(argv: list[str]):
+    """`main.py merge`, combining the outputs of `main.py --shard i/N` builds"""
+    parser = argparse.ArgumentParser(
+        prog="main.py merge",
+        description="Combine shard outputs and manifests into the final site",
+    )
+    _ = parser.add_argument("base_path", nargs="?", default="/")
+    _ = parser.add_argument(
+        "--shards",
+        nargs="+",
+        type=Path,
+        help="shard output directories, every public.shard-I-of-N/ by default",
+    )
+    args = parser.parse_args(argv)
+
+    public_path = public_path_for(args.base_path)
+    from shards import find_shards, merge_shards
+
+    shard_dirs = args.shards or find_shards(public_path)
+    _ = merge_shards(shard_dirs, public_path, cfg.get_manifest_path(public_path))
+
+
+class SiteBuilder:
+    """Holds the build settings, so watch mode can rebuild without starting over"""
+
+    def __init__(self, args: argparse.Namespace):
+        self.args: argparse.Namespace = args
+        self.base_path: str = args.base_path
+        self.shard: Shard | None = args.shard
+        self.public_path: Path = public_path_for(self.base_path)
+        if self.shard:
+            self.public_path = shard_path(self.public_path, self.shard)
+        self.static_path: Path = cfg.get_static_path()
+        self.content_path: Path = cfg.get_content_path()
+        self.template_path: Path = cfg.get_template_path()
+        self.jobs: int = args.jobs or os.cpu_count() or 1
+        self.manifest: BuildManifest | None = None
+        self.layouts: Layouts | None = None
+        self.timings: Timings | None = Timings() if args.timings else None
+        # highlighted code blocks render differently, so they are cached apart
+        variant = f"highlight-{HIGHLIGHT_VERSION}" if args.highlight else ""
+        self.cache: RenderCache | None = (
+            None if args.no_cache else open_render_cache(variant)
+        )
+
+    def build(self, full: bool = False):
+        prepared: dict[Path, ImageEntry] = {}
+        if self.args.images:
+            with stage(self.timings, "images"):
+                prepared = self.prepare_images()
+        image_variants: ImageVariants | None = None
+        if prepared:
+            from images import image_srcsets
+
+            image_variants = image_srcsets(prepared, self.static_path)
+        assets: dict[str, str] | None = None
+        if self.args.fingerprint:
+            from assets import fingerprint_assets
+
+            with stage(self.timings, "fingerprint"):
+                sources = walk_files(self.static_path)
+                assets = fingerprint_assets(
+                    (src for src in sources if src not in prepared),
+                    self.static_path,
+                    cfg.get_assets_index_path(),
+                    self.args.minify,
+                    self.jobs,
+                )
+
+        with stage(self.timings, "manifest"):
+            manifest = BuildManifest.load(
+                self.manifest_path(),
+                settings_fingerprint(
+                    self.template_path,
+                    self.base_path,
+                    self.args.minify,
+                    image_variants,
+                    assets,
+                    self.args.highlight,
+                ),
+                full=full,
+            )
+            if self.shard:
+                manifest.shard = "{}/{}".format(*self.shard)
+
+        # static files are the same for every shard, so only the first writes them
+        owns_static = self.shard is None or self.shard[0] == 1
+        static_files = set() if owns_static else set(walk_files(self.static_path))
+        with stage(self.timings, "static"):
+            get_static_content(
+                self.public_path,
+                self.static_path,
+                clean=full or manifest.fresh,
+                manifest=manifest,
+                checksum=self.args.checksum,
+                link=self.args.link,
+                jobs=self.jobs,
+                minify=self.args.minify,
+                exclude=static_files or prepared.keys(),
+            )
+            if prepared and owns_static:
+                from images import publish_images
+
+                manifest.static.update(
+                    publish_images(prepared, self.static_path, self.public_path)
+                )
+            if assets and owns_static:
+                from assets import link_fingerprinted
+
+                manifest.static.update(link_fingerprinted(assets, self.public_path))
+        self.layouts = get_web_content(
+            self.public_path,
+            self.content_path,
+            self.template_path,
+            self.base_path,
+            manifest,
+            self.jobs,
+            self.timings,
+            self.cache,
+            self.args.minify,
+            image_variants,
+            assets,
+            self.args.highlight,
+            self.shard,
+        )
+        if self.args.search:
+            with stage(self.timings, "search"):
+                self.index_search(manifest)
+        if self.args.compress:
+            with stage(self.timings, "compress"):
+                self.compress(manifest)
+        with stage(self.timings, "orphans_and_save"):
+            _ = manifest.remove_orphans(self.public_path)
+            manifest.save()
+        if self.cache:
+            logger.info(
+                "render cache: %d blocks reused, %d rendered",
+                self.cache.hits,
+                self.cache.misses,
+            )
+            self.cache.hits = self.cache.misses = 0
+            with stage(self.timings, "cache_prune"):
+                _ = self.cache.prune()
+
+        self.manifest = manifest
+        if self.args.check_links or self.args.strict:
+            with stage(self.timings, "check_links"):
+                self.check_links(manifest)
+        logger.info("Website generated")
+
+    def manifest_path(self) -> Path:
+        if self.shard:
+            # kept with the shard's pages, so it travels with them to the merge
+            return self.public_path.joinpath(SHARD_MANIFEST)
+        return cfg.get_manifest_path(self.public_path)
+
+    def prepare_images(self) -> dict[Path, ImageEntry]:
+        import images
+
+        if not images.available():
+            logger.warning("--images needs Pillow, copying images unchanged")
+            return {}
+
+        return images.prepare_images(
+            images.image_sources(cfg.get_images_path()),
+            cfg.get_images_cache_path(),
+            self.jobs,
+            cfg.get_image_widths(),
+            cfg.get_image_quality(),
+        )
+
+    def index_search(self, manifest: BuildManifest):
+        from search import SEARCH_KEY, update_search_index
+
+        outputs = update_search_index(
+            manifest.pages,
+            self.public_path,
+            self.base_path,
+            cfg.get_search_path(self.public_path),
+            cfg.get_search_state_path(self.public_path),
+            cfg.get_large_file_threshold(),
+            cfg.get_search_prefix_length(),
+            cfg.get_search_heading_weight(),
+        )
+        # shards no longer written are deleted by the index, so drop them here too
+        manifest.static = {
+            key: output
+            for key, output in manifest.static.items()
+            if not key.startswith(SEARCH_KEY)
+        }
+        manifest.static.update(outputs)
+
+    def check_links(self, manifest: BuildManifest):
+        from links import check_references, output_urls
+
+        outputs = [entry["output"] for entry in manifest.pages.values()]
+        outputs.extend(manifest.static.values())
+        broken = check_references(
+            manifest.pages,
+            output_urls(outputs, self.public_path),
+            self.public_path,
+            cfg.get_links_state_path(self.public_path),
+            cfg.get_large_file_threshold(),
+        )
+        if broken and self.args.strict:
+            raise ValueError(f"{len(broken)} broken links or images, see above")
+
+    def compress(self, manifest: BuildManifest):
+        from compress import compress_outputs
+
+        outputs = [Path(entry["output"]) for entry in manifest.pages.values()]
+        outputs.extend(Path(output) for output in manifest.static.values())
+        manifest.compressed = compress_outputs(
+            outputs,
+            manifest.previous_compressed | manifest.compressed,
+            self.jobs,
+            cfg.get_compress_min_bytes(),
+            cfg.get_compress_max_ratio(),
+        )
+
+    def watched_paths(self) -> list[Path]:
+        return [
+            self.content_path,
+            self.static_path,
+            self.template_path,
+            cfg.get_layouts_path(),
+            cfg.get_partials_path(),
+        ]
+
+    def apply_changes(self, changes: set[Path]):
+        """Re-render changed pages and copy changed assets, else do a full build"""
+        if self.manifest is None or self.layouts is None:
+            return self.build()
+
+        from images import IMAGE_SUFFIXES
+
+        pages: list[Path] = []
+        assets: list[Path] = []
+        for path in sorted(changes):
+            if path.name.startswith("."):
+                continue  # editor swap and backup files
+            if not path.is_file():
+                # deletions, directories and renames go through the manifest
+                return self.build()
+            if path.is_relative_to(self.content_path):
+                pages.append(path)
+            elif (
+                self.args.images
+                and path.is_relative_to(cfg.get_images_path())
+                and path.suffix.lower() in IMAGE_SUFFIXES
+            ):
+                return self.build()  # variants and every srcset may change
+            elif self.args.fingerprint and path.is_relative_to(self.static_path):
+                return self.build()  # its fingerprinted URL changes in every page
+            elif path.is_relative_to(self.static_path):
+                assets.append(path)
+            else:
+                return self.build()  # template, layout or partial changed
+
+        if assets:
+            synced = sync_static(
+                self.static_path,
+                self.public_path,
+                link=self.args.link,
+                sources=assets,
+                minify=self.args.minify,
+            )
+            self.manifest.static.update(synced)
+
+        for src in pages:
+            dst = self.public_path.joinpath(src.parent.relative_to(self.content_path))
+            dst.mkdir(parents=True, exist_ok=True)
+            key = src.as_posix()
+            previous = self.manifest.pages.get(key)
+            if not self.manifest.update_page(src, dst.joinpath("index.html")):
+                continue
+            try:
+                generate_page(
+                    src,
+                    self.layouts.for_page(src),
+                    dst,
+                    cache=self.cache,
+                    minify=self.args.minify,
+                    highlighted=self.args.highlight,
+                )
+            except Exception:
+                # not rendered, so the next build must still see it as changed
+                if previous is None:
+                    _ = self.manifest.pages.pop(key)
+                else:
+                    self.manifest.pages[key] = previous
+                raise
+
+        if self.args.search:
+            self.index_search(self.manifest)
+        if self.args.compress:
+            self.compress(self.manifest)
+        self.manifest.save()
+        if self.args.check_links or self.args.strict:
+            self.check_links(self.manifest)
 
-    get_static_content(public_path, static_path)
-    get_web_content(public_path, content_path, template_path, base_path)
-    logger.info("Website generated")
+
+def main():
+    logging.basicConfig(level=cfg.get_logging_level())
+    if sys.argv[1:2] == ["cache"]:
+        return cache_command(sys.argv[2:])
+    if sys.argv[1:2] == ["serve"]:
+        return serve_command(sys.argv[2:])
+    if sys.argv[1:2] == ["merge"]:
+        return merge_command(sys.argv[2:])
+
+    args = parse_args(sys.argv[1:])
+    builder = SiteBuilder(args)
+
+    if args.profile:
+        if builder.jobs > 1:
+            logger.warning("--profile only sees the main process, use --jobs 1")
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.runcall(builder.build, full=args.full)
+        args.profile.parent.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(args.profile)
+        logger.info("wrote profile to %s", args.profile)
+    else:
+        builder.build(full=args.full)
+
+    if builder.timings:
+        builder.timings.log_summary()
+        builder.timings.save(args.timings)
+        logger.info("wrote timings to %s", args.timings)
+
+    if args.watch:
+        from watch import watch_and_serve
+
+        watch_and_serve(
+            builder.public_path,
+            builder.watched_paths(),
+            builder.apply_changes,
+            port=args.port,
+        )
 
 
 if __name__ == "__main__":
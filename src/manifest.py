@@ -0,0 +1,229 @@
+from __future__ import annotations
+import hashlib
+import json
+import logging
+import os
+from collections.abc import Callable, Mapping
+from pathlib import Path
+from typing import Any, TypedDict
+
+import config as cfg
+from highlight import HIGHLIGHT_VERSION
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 2
+
+
+class PageEntry(TypedDict):
+    hash: str
+    output: str
+    size: int
+    mtime_ns: int
+
+
+class CompressedEntry(TypedDict):
+    hash: str
+    size: int
+    mtime_ns: int
+    variants: list[str]
+
+
+def hash_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(path: Path) -> str:
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def hash_if_changed(
+    path: Path,
+    known: Mapping[str, Any] | None,
+    digest: Callable[[Path], str] = hash_file,
+) -> tuple[str, os.stat_result]:
+    """The digest and stat of path, reusing known["hash"] while size and mtime match"""
+    stat = os.stat(path)
+    if (
+        known is not None
+        and known["size"] == stat.st_size
+        and known["mtime_ns"] == stat.st_mtime_ns
+    ):
+        # same size and mtime, trust the recorded hash instead of reading the file
+        return str(known["hash"]), stat
+    return digest(path), stat
+
+
+def load_json_state(path: Path) -> dict[str, Any]:
+    """State a stage keeps between builds, empty when missing or unreadable"""
+    try:
+        with open(path, "r") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return state if isinstance(state, dict) else {}
+
+
+def save_json_state(path: Path, state: Mapping[str, Any], indent: int | None = None):
+    # replaced whole, so builds running side by side never read a torn file
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "w") as f:
+        json.dump(state, f, indent=indent, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def settings_fingerprint(
+    template_path: Path,
+    base_path: str,
+    minify: bool = False,
+    images: dict[str, list[tuple[str, int, str]]] | None = None,
+    assets: dict[str, str] | None = None,
+    highlight: bool = False,
+) -> str:
+    """Hash every input shared by all pages, so a change to any of them rebuilds the site"""
+    digest = hashlib.sha256()
+    digest.update(template_path.read_bytes())
+    for template_dir in (cfg.get_layouts_path(), cfg.get_partials_path()):
+        for path in sorted(template_dir.rglob("*.html")):
+            digest.update(path.as_posix().encode())
+            digest.update(path.read_bytes())
+    digest.update(json.dumps(cfg.get_languages()).encode())
+    digest.update(base_path.encode())
+    digest.update(b"minify" if minify else b"")
+    # image variants change the srcset written into pages
+    digest.update(json.dumps(images, sort_keys=True).encode())
+    # as do fingerprinted asset URLs
+    digest.update(json.dumps(assets, sort_keys=True).encode())
+    # and highlighting, every code block with a language
+    digest.update(f"highlight-{HIGHLIGHT_VERSION}".encode() if highlight else b"")
+    return digest.hexdigest()
+
+
+class BuildManifest:
+    def __init__(self, path: Path, settings: str, rebuild_all: bool = False):
+        self.path: Path = path
+        self.settings: str = settings
+        self.rebuild_all: bool = rebuild_all
+        self.previous: dict[str, PageEntry] = {}
+        self.pages: dict[str, PageEntry] = {}
+        # static files map source -> output, and are tracked only for orphan removal
+        self.previous_static: dict[str, str] = {}
+        self.static: dict[str, str] = {}
+        # outputs -> their .gz/.br copies, written by the optional compress stage
+        self.previous_compressed: dict[str, CompressedEntry] = {}
+        self.compressed: dict[str, CompressedEntry] = {}
+        # "i/N" when only shard i of N was built here, see shards.py
+        self.shard: str | None = None
+        self.fresh: bool = True
+
+    @classmethod
+    def load(cls, path: Path, settings: str, full: bool = False) -> BuildManifest:
+        manifest = cls(path, settings, rebuild_all=full)
+        if not path.exists():
+            logger.info("no build manifest at %s, rebuilding every page", path)
+            manifest.rebuild_all = True
+            return manifest
+
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            logger.warning(
+                "unreadable build manifest at %s, rebuilding every page", path
+            )
+            manifest.rebuild_all = True
+            return manifest
+
+        if data.get("version") != MANIFEST_VERSION:
+            manifest.rebuild_all = True
+            return manifest
+
+        # keep previous pages when settings change, so orphans can still be removed
+        manifest.previous = data.get("pages", {})
+        manifest.previous_static = data.get("static", {})
+        manifest.previous_compressed = data.get("compressed", {})
+        manifest.fresh = False
+        if data.get("settings") != settings:
+            logger.info("template, config or base path changed, rebuilding every page")
+            manifest.rebuild_all = True
+
+        return manifest
+
+    def needs_render(self, src: Path, output: Path) -> bool:
+        key = src.as_posix()
+        previous = self.previous.get(key)
+        entry = self._entry(src, output, previous)
+        self.pages[key] = entry
+
+        if self.rebuild_all or not output.exists():
+            return True
+
+        return previous is None or previous["hash"] != entry["hash"]
+
+    def update_page(self, src: Path, output: Path) -> bool:
+        """Record a page changed since this manifest was built, e.g. while watching"""
+        key = src.as_posix()
+        current = self.pages.get(key)
+        entry = self._entry(src, output, current)
+        self.pages[key] = entry
+
+        return current is None or current["hash"] != entry["hash"]
+
+    def _entry(self, src: Path, output: Path, known: PageEntry | None) -> PageEntry:
+        digest, stat = hash_if_changed(src, known)
+        return {
+            "hash": digest,
+            "output": output.as_posix(),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+        }
+
+    def remove_orphans(self, public_path: Path) -> list[Path]:
+        """Delete outputs whose source no longer exists, pruning directories left empty"""
+        current_outputs = {entry["output"] for entry in self.pages.values()}
+        current_outputs.update(self.static.values())
+        for output, entry in self.compressed.items():
+            current_outputs.update(output + suffix for suffix in entry["variants"])
+        previous_outputs = [(k, entry["output"]) for k, entry in self.previous.items()]
+        previous_outputs.extend(self.previous_static.items())
+        previous_outputs.extend(
+            (output, output + suffix)
+            for output, entry in self.previous_compressed.items()
+            for suffix in entry["variants"]
+        )
+        removed: list[Path] = []
+
+        for key, previous_output in previous_outputs:
+            if previous_output in current_outputs:
+                continue
+
+            output = Path(previous_output)
+            if output.exists():
+                os.remove(output)
+                removed.append(output)
+                logger.info("removed %s, it is no longer built from %s", output, key)
+
+            parent = output.parent
+            while parent != public_path and parent.is_relative_to(public_path):
+                try:
+                    os.rmdir(parent)
+                except OSError:
+                    break  # directory still has content
+                parent = parent.parent
+
+        return removed
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            "version": MANIFEST_VERSION,
+            "settings": self.settings,
+            "pages": self.pages,
+            "static": self.static,
+            "compressed": self.compressed,
+            "shard": self.shard,
+        }
+        with open(self.path, "w") as f:
+            json.dump(data, f, indent=2, sort_keys=True)
@@ -1,83 +1,96 @@
-from blocks import BlockType, get_block_type, markdown_to_blocks
+from collections.abc import Iterable, Iterator
+from functools import partial
+
+from blocks import Block, BlockType, lex_blocks
+from highlight import highlight
 from textnode import TextType, TextNode, block_to_text_nodes
 from htmlnode import HTMLNode, LeafNode, ParentNode
-import config as cfg
+from render_cache import RenderCache
 
 import logging
 
 logger = logging.getLogger(__name__)
-logging.basicConfig(
-    level=cfg.get_logging_level(),
-)
-
 
-def md_to_html_node(markdown: str) -> HTMLNode:
-    def _remove_marks_lines(block: str) -> str:
-        space_idx = block.find(" ")
-        return "".join(line[space_idx + 1 :] + "\n" for line in block.splitlines())
-
-    children: list[HTMLNode] = []
-    blocks: list[str] = markdown_to_blocks(markdown)
 
-    for block in blocks:
-        if not block:
-            continue
-        node: HTMLNode = HTMLNode()
-
-        logger.debug("Block: %s Block type: %s", block, get_block_type(block))
-
-        match get_block_type(block):
-            case BlockType.PARAGRAPH:
-                text_nodes = block_to_text_nodes(block)
-                node = _text_nodes_to_html_parent("p", text_nodes)
-            case BlockType.HEADING:
-                parts = block.split()
-                heading_number = "h" + str(len(parts[0]))
-                heading = " ".join(parts[1:])
-                text_nodes = block_to_text_nodes(heading)
-                node = _text_nodes_to_html_parent(heading_number, text_nodes)
-            case BlockType.CODE:
-                backticks_removed = block.strip()[3:-3]
-                # also remove leading new lines and empty space
-                backticks_removed = backticks_removed.strip()
-
-                language = backticks_removed.splitlines()[0]
-                if language.lower() in cfg.get_languages():
-                    code_node = LeafNode("code", backticks_removed[len(language) + 1 :])
-                else:
-                    code_node = LeafNode("code", backticks_removed)
-
-                node = ParentNode("pre", [code_node])
-            case BlockType.QUOTE:
-                quotemark_removed = _remove_marks_lines(block)
-                node = LeafNode("blockquote", quotemark_removed)
-            case BlockType.UNORDERED_LIST:
-                bullets_removed = _remove_marks_lines(block)
-                text_nodes = [
-                    block_to_text_nodes(line) for line in bullets_removed.splitlines()
-                ]
-                unordered_list_nodes: list[ParentNode] = [
-                    _text_nodes_to_html_parent("li", line_nodes)
-                    for line_nodes in text_nodes
-                ]
-                node = ParentNode("ul", unordered_list_nodes)
-            case BlockType.ORDERED_LIST:
-                numbers_removed = _remove_marks_lines(block)
-                text_nodes = [
-                    block_to_text_nodes(line) for line in numbers_removed.splitlines()
-                ]
-                ordered_list_nodes: list[ParentNode] = [
-                    _text_nodes_to_html_parent("li", line_nodes)
-                    for line_nodes in text_nodes
-                ]
-                node = ParentNode("ol", ordered_list_nodes)
-
-        children.append(node)
+def md_to_html_node(markdown: str, highlighted: bool = False) -> HTMLNode:
+    children: list[HTMLNode] = [
+        _block_to_html_node(b, highlighted) for b in lex_blocks(markdown)
+    ]
 
     final_parent = ParentNode("div", children)
     return final_parent
 
 
+def md_to_html_cached(
+    markdown: str, cache: RenderCache, highlighted: bool = False
+) -> str:
+    """The HTML of md_to_html_node, reusing blocks rendered by earlier builds"""
+    blocks = list(lex_blocks(markdown))
+    if not blocks:
+        raise ValueError("Parent node mising children")
+
+    render = partial(block_to_html, highlighted=highlighted)
+    return "<div>" + "".join(cache.render(blocks, render)) + "</div>"
+
+
+def block_to_html(block: Block, highlighted: bool = False) -> str:
+    return _block_to_html_node(block, highlighted).to_html()
+
+
+def blocks_to_html_chunks(
+    blocks: Iterable[Block], highlighted: bool = False
+) -> Iterator[str]:
+    """Render blocks as the same div md_to_html_node would, one block at a time"""
+    yield "<div>"
+
+    empty = True
+    for block in blocks:
+        empty = False
+        yield from _block_to_html_node(block, highlighted).iter_html()
+
+    if empty:
+        raise ValueError("Parent node mising children")
+    yield "</div>"
+
+
+def _block_to_html_node(block: Block, highlighted: bool = False) -> HTMLNode:
+    logger.debug("Block: %s", block)
+
+    match block.block_type:
+        case BlockType.PARAGRAPH:
+            text_nodes = block_to_text_nodes("\n".join(block.lines))
+            return _text_nodes_to_html_parent("p", text_nodes)
+        case BlockType.HEADING:
+            text_nodes = block_to_text_nodes(block.lines[0])
+            return _text_nodes_to_html_parent(f"h{block.level}", text_nodes)
+        case BlockType.CODE:
+            code = "\n".join(block.lines)
+            if highlighted and block.language:
+                code_node = LeafNode(
+                    "code",
+                    highlight(code, block.language),
+                    {"class": f"language-{block.language.lower()}"},
+                )
+            else:
+                code_node = LeafNode("code", code)
+            return ParentNode("pre", [code_node])
+        case BlockType.QUOTE:
+            quotemark_removed = "".join(line + "\n" for line in block.lines)
+            return LeafNode("blockquote", quotemark_removed)
+        case BlockType.UNORDERED_LIST:
+            unordered_list_nodes: list[ParentNode] = [
+                _text_nodes_to_html_parent("li", block_to_text_nodes(line))
+                for line in block.lines
+            ]
+            return ParentNode("ul", unordered_list_nodes)
+        case BlockType.ORDERED_LIST:
+            ordered_list_nodes: list[ParentNode] = [
+                _text_nodes_to_html_parent("li", block_to_text_nodes(line))
+                for line in block.lines
+            ]
+            return ParentNode("ol", ordered_list_nodes)
+
+
 def _text_node_to_html_node(text_node: TextNode):
     match text_node.text_type:
         case TextType.TEXT:
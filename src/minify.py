@@ -0,0 +1,148 @@
+import re
+import logging
+from collections.abc import Iterable, Iterator
+
+logger = logging.getLogger(__name__)
+
+_HTML_TOKEN_RE = re.compile(r"<!--.*?-->|<[^<>]*>|[^<]+|<", re.DOTALL)
+_TAG_NAME_RE = re.compile(r"<(/?)([a-zA-Z][\w-]*)")
+# HTML and CSS whitespace, unlike \s this leaves non-breaking spaces alone
+_SPACE_RE = re.compile(r"[ \t\n\r\f]+")
+# whitespace next to these never renders, so it can be dropped rather than collapsed
+_BLOCK_TAGS = frozenset(
+    (
+        "html head body title meta link base style script noscript template "
+        "div p pre blockquote ul ol li dl dt dd h1 h2 h3 h4 h5 h6 hr br "
+        "header footer nav main section article aside figure figcaption "
+        "table thead tbody tfoot tr th td caption form fieldset"
+    ).split()
+)
+# content of these is emitted exactly as written
+_PRESERVE_TAGS = frozenset(("pre", "code", "textarea", "script", "style"))
+
+# comments and strings, matched together so a quote in a comment or a /* in a
+# string is never taken for the start of the other
+_CSS_TOKEN_RE = re.compile(
+    r"""(/\*.*?\*/|"(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')""", re.DOTALL
+)
+_CSS_PUNCT_RE = re.compile(r" ?([{};,]) ?")
+# a property name straight after { or ;, where a space after the colon never matters
+_CSS_PROPERTY_RE = re.compile(r"(?<=[{;])([\w-]+): ")
+
+
+class HTMLMinifier:
+    """Collapses whitespace in HTML fed to it in chunks, without joining them
+
+    Only an unfinished tag or comment is carried over to the next chunk, so memory
+    stays proportional to the chunk size.
+    """
+
+    def __init__(self):
+        self.carry: str = ""
+        self.pending_space: bool = False
+        self.after_block: bool = True
+        self.preserve_depth: int = 0
+        self.bytes_in: int = 0
+        self.bytes_out: int = 0
+
+    def feed(self, chunk: str) -> Iterator[str]:
+        self.bytes_in += len(chunk)
+        text = self.carry + chunk
+        cut = len(text)
+        comment = text.rfind("<!--")
+        if comment > text.rfind("-->"):
+            cut = comment
+        tag = text.rfind("<", 0, cut)
+        if tag >= 0 and text.find(">", tag, cut) < 0:
+            cut = tag
+        self.carry = text[cut:]
+
+        yield from self._minify(text[:cut])
+
+    def close(self) -> Iterator[str]:
+        text, self.carry = self.carry, ""
+        yield from self._minify(text)
+
+    def _minify(self, text: str) -> Iterator[str]:
+        for match in _HTML_TOKEN_RE.finditer(text):
+            token = match.group(0)
+            if token[0] == "<" and len(token) > 1:
+                out = self._tag(token)
+            else:
+                out = self._text(token)
+            if out:
+                self.bytes_out += len(out)
+                yield out
+
+    def _text(self, token: str) -> str:
+        if self.preserve_depth:
+            return token
+
+        collapsed = _SPACE_RE.sub(" ", token)
+        out = collapsed.strip(" ")
+        if not out:
+            self.pending_space = True
+            return ""
+
+        if (self.pending_space or collapsed[0] == " ") and not self.after_block:
+            out = " " + out
+        self.pending_space = collapsed[-1] == " "
+        self.after_block = False
+        return out
+
+    def _tag(self, token: str) -> str:
+        match = _TAG_NAME_RE.match(token)
+        closing, name = (match.group(1), match.group(2).lower()) if match else ("", "")
+
+        if self.preserve_depth:
+            if closing and name in _PRESERVE_TAGS:
+                self.preserve_depth -= 1
+                self.after_block = name in _BLOCK_TAGS
+            elif not closing and name in _PRESERVE_TAGS:
+                self.preserve_depth += 1
+            return token
+
+        # comments and doctypes are no more inline than block tags
+        block = name in _BLOCK_TAGS or not match
+        out = token
+        if self.pending_space and not (self.after_block or block):
+            out = " " + token
+        self.pending_space = False
+        self.after_block = block
+        if not closing and name in _PRESERVE_TAGS and not token.endswith("/>"):
+            self.preserve_depth += 1
+        return out
+
+
+def minify_html_chunks(
+    chunks: Iterable[str], minifier: HTMLMinifier
+) -> Iterator[str]:
+    for chunk in chunks:
+        yield from minifier.feed(chunk)
+    yield from minifier.close()
+
+
+def minify_css(css: str) -> str:
+    """Drop comments and needless whitespace, leaving strings and /*! notices alone"""
+    out: list[str] = []
+    code: list[str] = []
+    # odd parts are the comments and strings captured by the split, in source order
+    for idx, part in enumerate(_CSS_TOKEN_RE.split(css)):
+        if idx % 2 == 0:
+            code.append(part)
+        elif part.startswith("/*") and not part.startswith("/*!"):
+            continue  # dropped, so the code on either side is minified as one
+        else:
+            out.append(_minify_css_code("".join(code)))
+            out.append(part)
+            code.clear()
+    out.append(_minify_css_code("".join(code)))
+
+    return "".join(out).strip()
+
+
+def _minify_css_code(code: str) -> str:
+    code = _SPACE_RE.sub(" ", code)
+    code = _CSS_PUNCT_RE.sub(r"\1", code)
+    code = _CSS_PROPERTY_RE.sub(r"\1:", code)
+    return code.replace(";}", "}")
@@ -0,0 +1,93 @@
+import queue
+import logging
+import threading
+from collections.abc import Callable, Iterable
+from typing import TypeVar
+
+logger = logging.getLogger(__name__)
+
+Item = TypeVar("Item")
+Loaded = TypeVar("Loaded")
+Rendered = TypeVar("Rendered")
+
+_DONE = object()
+
+
+def run_pipeline(
+    items: Iterable[Item],
+    read: Callable[[Item], Loaded],
+    process: Callable[[Item, Loaded], Rendered],
+    write: Callable[[Item, Rendered], None],
+    depth: int = 8,
+    failures_only: bool = False,
+) -> list[tuple[Item, Exception | None]]:
+    """Run read, process and write over items as three overlapping stages
+
+    read runs ahead on a reader thread and write drains behind on a writer thread,
+    each at most depth items away from process on the calling thread, so blocking
+    I/O overlaps with the CPU work instead of adding to it. Returns (item, error)
+    in input order; an item that fails one stage skips the ones after it.
+
+    items may be a lazy generator, such as a directory walk, and is consumed on the
+    reader thread; if producing the items fails, that error is raised here. With
+    failures_only, items that succeed aren't kept, so memory stays flat however
+    many there are.
+    """
+    loaded: queue.Queue[object] = queue.Queue(maxsize=depth)
+    rendered: queue.Queue[object] = queue.Queue(maxsize=depth)
+    results: dict[int, tuple[Item, Exception | None]] = {}
+    failures: list[Exception] = []
+    stop = threading.Event()
+
+    def _reader():
+        try:
+            for idx, item in enumerate(items):
+                if stop.is_set():
+                    break
+                try:
+                    loaded.put((idx, item, read(item), None))
+                except Exception as err:
+                    loaded.put((idx, item, None, err))
+        except Exception as err:
+            failures.append(err)  # the items themselves failed, not a read
+        finally:
+            loaded.put(_DONE)
+
+    def _writer():
+        while (job := rendered.get()) is not _DONE:
+            idx, item, data = job
+            try:
+                write(item, data)
+            except Exception as err:
+                results[idx] = (item, err)
+
+    reader = threading.Thread(target=_reader, name="pipeline-reader", daemon=True)
+    writer = threading.Thread(target=_writer, name="pipeline-writer", daemon=True)
+    reader.start()
+    writer.start()
+
+    try:
+        while (job := loaded.get()) is not _DONE:
+            idx, item, data, err = job
+            if err is not None or not failures_only:
+                results[idx] = (item, err)
+            if err is not None:
+                continue
+            try:
+                rendered.put((idx, item, process(item, data)))
+            except Exception as err:
+                results[idx] = (item, err)
+    finally:
+        # on KeyboardInterrupt, unblock the reader and let the writer finish its queue
+        stop.set()
+        while reader.is_alive():
+            try:
+                _ = loaded.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        rendered.put(_DONE)
+        writer.join()
+
+    if failures:
+        raise failures[0]
+    return [results[idx] for idx in sorted(results)]
@@ -0,0 +1,150 @@
+from __future__ import annotations
+import time
+import hashlib
+import logging
+import sqlite3
+from collections.abc import Callable
+from pathlib import Path
+
+from blocks import Block
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS blocks (
+    key TEXT PRIMARY KEY,
+    html TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL
+)
+"""
+# keep IN (...) lists well under sqlite's bound parameter limit
+_QUERY_BATCH = 500
+# eviction only needs a rough order, so hits refresh last_used at most this often
+_TOUCH_INTERVAL = 3600.0
+
+
+class RenderCache:
+    """Rendered HTML per block in sqlite, keyed by a hash of the block and renderer
+
+    variant tells apart renders of the same blocks with different options, such as
+    highlighting. Entries are evicted least recently used first once the cache
+    outgrows max_bytes. Instances pickle without their connection, so worker
+    processes open their own.
+    """
+
+    def __init__(self, path: Path, max_bytes: int, version: int, variant: str = ""):
+        self.path: Path = path
+        self.max_bytes: int = max_bytes
+        self.version: int = version
+        self.variant: str = variant
+        self.hits: int = 0
+        self.misses: int = 0
+        self._db: sqlite3.Connection | None = None
+
+    def __getstate__(self) -> dict[str, object]:
+        state = self.__dict__.copy()
+        state["_db"] = None
+        return state
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(self.path, timeout=30)
+            # WAL lets worker processes read while another one writes
+            _ = self._db.execute("PRAGMA journal_mode=WAL")
+            _ = self._db.execute("PRAGMA synchronous=NORMAL")
+            _ = self._db.execute(_SCHEMA)
+        return self._db
+
+    def key(self, block: Block) -> str:
+        header = (
+            self.version,
+            self.variant,
+            block.block_type.value,
+            block.level,
+            block.language,
+        )
+        digest = hashlib.sha256("\0".join(map(str, header)).encode())
+        digest.update(b"\0")
+        digest.update("\n".join(block.lines).encode())
+        return digest.hexdigest()
+
+    def render(
+        self, blocks: list[Block], render_block: Callable[[Block], str]
+    ) -> list[str]:
+        """HTML for each block, rendering and storing only the ones not cached yet"""
+        keys = [self.key(block) for block in blocks]
+        unique = list(dict.fromkeys(keys))
+        now = time.time()
+        found: dict[str, str] = {}
+        stale: list[tuple[float, str]] = []
+        for i in range(0, len(unique), _QUERY_BATCH):
+            batch = unique[i : i + _QUERY_BATCH]
+            params = ",".join("?" * len(batch))
+            rows = self.db.execute(
+                f"SELECT key, html, last_used FROM blocks WHERE key IN ({params})",
+                batch,
+            )
+            for key, html, last_used in rows:
+                found[key] = html
+                if now - last_used > _TOUCH_INTERVAL:
+                    stale.append((now, key))
+
+        rendered: dict[str, str] = {}
+        for key, block in zip(keys, blocks):
+            if key not in found and key not in rendered:
+                rendered[key] = render_block(block)
+        self.hits += len(found)
+        self.misses += len(rendered)
+
+        if not (stale or rendered):
+            return [found[key] for key in keys]
+
+        with self.db:
+            _ = self.db.executemany(
+                "UPDATE blocks SET last_used = ? WHERE key = ?", stale
+            )
+            _ = self.db.executemany(
+                "INSERT OR REPLACE INTO blocks VALUES (?, ?, ?, ?)",
+                [(key, html, len(html), now) for key, html in rendered.items()],
+            )
+
+        return [found[key] if key in found else rendered[key] for key in keys]
+
+    def stats(self) -> dict[str, int]:
+        entries, size = self.db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blocks"
+        ).fetchone()
+        return {"entries": entries, "bytes": size, "max_bytes": self.max_bytes}
+
+    def prune(self) -> int:
+        """Evict least recently used entries until the cache fits in max_bytes"""
+        with self.db:
+            removed = self.db.execute(
+                """
+                DELETE FROM blocks WHERE key IN (
+                    SELECT key FROM (
+                        SELECT key, SUM(size) OVER (
+                            ORDER BY last_used DESC, key
+                        ) AS running FROM blocks
+                    ) WHERE running > ?
+                )
+                """,
+                (self.max_bytes,),
+            ).rowcount
+        if removed:
+            logger.info("evicted %d blocks from the render cache", removed)
+        return removed
+
+    def clear(self) -> int:
+        with self.db:
+            removed = self.db.execute("DELETE FROM blocks").rowcount
+        _ = self.db.execute("VACUUM")
+        return removed
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
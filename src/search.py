@@ -0,0 +1,175 @@
+import os
+import re
+import json
+import logging
+from collections.abc import Iterable
+from pathlib import Path
+from typing import TypedDict
+
+from blocks import Block, BlockType, read_blocks
+from manifest import PageEntry, hash_bytes, load_json_state, save_json_state
+from textnode import block_to_text_nodes
+
+logger = logging.getLogger(__name__)
+
+# bump when terms are extracted or weighted differently, so every page is reindexed
+INDEX_VERSION = 1
+# manifest keys of the index files, so they are removed once no longer written
+SEARCH_KEY = "search#"
+PAGES_FILE = "pages.json"
+# letters and digits only, so shard names built from them are safe file names
+_TOKEN_RE = re.compile(r"[^\W_]{2,}")
+_PLAIN_SHARD_RE = re.compile(r"[a-z0-9]+")
+
+
+class IndexedPage(TypedDict):
+    hash: str
+    title: str
+    terms: dict[str, int]
+
+
+class IndexState(TypedDict):
+    version: int
+    pages: dict[str, IndexedPage]
+    ids: dict[str, int]
+    shards: dict[str, str]
+
+
+def page_terms(
+    blocks: Iterable[Block], heading_weight: int = 3
+) -> tuple[str, dict[str, int]]:
+    """The page title and {term: weight} of its text, headings counting heading_weight
+
+    Text comes from the same TextNodes the renderer builds, so link text and image
+    alt text are searchable but URLs and code blocks are not.
+    """
+    title = ""
+    terms: dict[str, int] = {}
+    for block in blocks:
+        weight = 1
+        match block.block_type:
+            case BlockType.CODE:
+                continue
+            case BlockType.HEADING:
+                weight = heading_weight
+                texts = _inline_texts(block.lines[0])
+                if block.level == 1 and not title:
+                    title = "".join(texts).strip()
+            case BlockType.QUOTE:
+                texts = block.lines
+            case BlockType.PARAGRAPH:
+                texts = _inline_texts("\n".join(block.lines))
+            case BlockType.UNORDERED_LIST | BlockType.ORDERED_LIST:
+                texts = [text for line in block.lines for text in _inline_texts(line)]
+
+        for text in texts:
+            for term in _TOKEN_RE.findall(text.lower()):
+                terms[term] = terms.get(term, 0) + weight
+
+    return title, terms
+
+
+def _inline_texts(text: str) -> list[str]:
+    return [node.text for node in block_to_text_nodes(text)]
+
+
+def shard_name(term: str, prefix_length: int) -> str:
+    """The shard holding term, its prefix or _ and the prefix as UTF-8 hex"""
+    prefix = term[:prefix_length]
+    if _PLAIN_SHARD_RE.fullmatch(prefix):
+        return prefix
+    return "_" + prefix.encode().hex()
+
+
+def update_search_index(
+    pages: dict[str, PageEntry],
+    public_path: Path,
+    base_path: str,
+    output_path: Path,
+    state_path: Path,
+    large_file_threshold: int,
+    prefix_length: int = 2,
+    heading_weight: int = 3,
+) -> dict[str, str]:
+    """Write the inverted index of pages into output_path, returning {key: output}
+
+    pages.json lists [url, title] by page ID, and each shard maps the terms sharing
+    a prefix to flat [page ID, weight, ...] lists, so a client loads pages.json and
+    only the shards of the terms it looks up. Pages are only indexed again when
+    their source hash changes, IDs stay put as pages come and go, and a shard is
+    only rewritten when its contents change.
+    """
+    empty: IndexState = {"version": INDEX_VERSION, "pages": {}, "ids": {}, "shards": {}}
+    state = empty | load_json_state(state_path)
+    known = state["pages"] if state.get("version") == INDEX_VERSION else {}
+
+    indexed: dict[str, IndexedPage] = {}
+    for src, entry in sorted(pages.items()):
+        page = known.get(src)
+        if page is None or page["hash"] != entry["hash"]:
+            title, terms = page_terms(
+                read_blocks(Path(src), large_file_threshold), heading_weight
+            )
+            page = {"hash": entry["hash"], "title": title, "terms": terms}
+            logger.debug("indexed %s", src)
+        indexed[src] = page
+
+    ids = {src: idx for src, idx in state["ids"].items() if src in indexed}
+    free = sorted(set(range(len(indexed))) - set(ids.values()))
+    for src in indexed:
+        if src not in ids:
+            ids[src] = free.pop(0)
+
+    docs: list[list[str] | None] = [None] * (max(ids.values(), default=-1) + 1)
+    shards: dict[str, dict[str, list[int]]] = {}
+    for src, idx in sorted(ids.items(), key=lambda item: item[1]):
+        page = indexed[src]
+        url = _page_url(pages[src]["output"], public_path, base_path)
+        docs[idx] = [url, page["title"]]
+        for term, weight in page["terms"].items():
+            postings = shards.setdefault(shard_name(term, prefix_length), {})
+            postings.setdefault(term, []).extend((idx, weight))
+
+    files = {PAGES_FILE: {"prefix": prefix_length, "pages": docs}}
+    files.update((f"{name}.json", postings) for name, postings in shards.items())
+    output_path.mkdir(parents=True, exist_ok=True)
+    written: dict[str, str] = {}
+    outputs: dict[str, str] = {}
+    rewritten = 0
+    for name, content in files.items():
+        data = json.dumps(
+            content, ensure_ascii=False, separators=(",", ":"), sort_keys=True
+        ).encode()
+        digest = hash_bytes(data)
+        output = output_path.joinpath(name)
+        if state["shards"].get(name) != digest or not output.exists():
+            tmp = output.with_name(f".{name}.tmp")
+            _ = tmp.write_bytes(data)
+            os.replace(tmp, output)
+            rewritten += 1
+            logger.debug("wrote %s", output)
+        written[name] = digest
+        outputs[SEARCH_KEY + name] = output.as_posix()
+
+    for name in state["shards"].keys() - written.keys():
+        output_path.joinpath(name).unlink(missing_ok=True)
+
+    reindexed = sum(known.get(src) is not page for src, page in indexed.items())
+    logger.info(
+        "search index: %d pages, %d reindexed, %d of %d files rewritten",
+        len(indexed),
+        reindexed,
+        rewritten,
+        len(written),
+    )
+    save_json_state(
+        state_path,
+        {"version": INDEX_VERSION, "pages": indexed, "ids": ids, "shards": written},
+    )
+    return outputs
+
+
+def _page_url(output: str, public_path: Path, base_path: str) -> str:
+    rel = Path(output).parent.relative_to(public_path).as_posix()
+    url = base_path.rstrip("/") + "/"
+    return url if rel == "." else f"{url}{rel}/"
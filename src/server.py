@@ -0,0 +1,312 @@
+from __future__ import annotations
+import os
+import re
+import asyncio
+import logging
+import mimetypes
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from urllib.parse import quote, unquote
+
+from assets import FINGERPRINT_LENGTH
+
+logger = logging.getLogger(__name__)
+
+_FINGERPRINTED_RE = re.compile(rf"\.[0-9a-f]{{{FINGERPRINT_LENGTH}}}\.[^./]+$")
+# preferred first, matched against the .br/.gz files written by --compress
+_ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+_MAX_HEADER_BYTES = 16 * 1024
+_REASONS = {
+    200: "OK",
+    301: "Moved Permanently",
+    304: "Not Modified",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+}
+
+
+class HotCache:
+    """Least recently used file contents, bounded by their total size"""
+
+    def __init__(self, max_bytes: int, max_file_bytes: int):
+        self.max_bytes: int = max_bytes
+        self.max_file_bytes: int = max_file_bytes
+        self.size: int = 0
+        self.entries: OrderedDict[Path, tuple[tuple[int, int], bytes]] = OrderedDict()
+
+    def get(self, path: Path, version: tuple[int, int]) -> bytes | None:
+        entry = self.entries.get(path)
+        if entry is None:
+            return None
+        if entry[0] != version:
+            self._remove(path)  # changed on disk since it was cached
+            return None
+
+        self.entries.move_to_end(path)
+        return entry[1]
+
+    def put(self, path: Path, version: tuple[int, int], data: bytes):
+        if len(data) > self.max_file_bytes:
+            return
+        if path in self.entries:
+            self._remove(path)
+
+        self.entries[path] = (version, data)
+        self.size += len(data)
+        while self.size > self.max_bytes:
+            self._remove(next(iter(self.entries)))
+
+    def _remove(self, path: Path):
+        _, data = self.entries.pop(path)
+        self.size -= len(data)
+
+
+class StaticServer:
+    """Serves a built site over HTTP/1.1 with keep-alive on asyncio
+
+    Responses carry an ETag and Last-Modified for conditional requests, prefer the
+    .br or .gz copy of a file when the client accepts it, and come from a hot
+    cache for small files or sendfile for the rest.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        cache: HotCache,
+        keep_alive: float = 15.0,
+    ):
+        self.root: Path = root.resolve()
+        self.cache: HotCache = cache
+        self.keep_alive: float = keep_alive
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(
+                        reader.readuntil(b"\r\n\r\n"), self.keep_alive
+                    )
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError):
+                    break
+                except asyncio.LimitOverrunError:
+                    await self._send_error(writer, 400, close=True)
+                    break
+
+                if not await self._respond(head, writer):
+                    break
+        except (ConnectionError, OSError) as err:
+            logger.debug("connection dropped: %s", err)
+        finally:
+            writer.close()
+
+    async def _respond(self, head: bytes, writer: asyncio.StreamWriter) -> bool:
+        """Answer one request, returning whether to keep the connection open"""
+        try:
+            request_line, *header_lines = head.decode("latin-1").split("\r\n")
+            method, target, version = request_line.split(" ")
+        except ValueError:
+            await self._send_error(writer, 400, close=True)
+            return False
+
+        headers: dict[str, str] = {}
+        for line in header_lines:
+            name, _, value = line.partition(":")
+            if name:
+                headers[name.strip().lower()] = value.strip()
+
+        connection = headers.get("connection", "").lower()
+        keep_alive = (
+            connection != "close"
+            if version == "HTTP/1.1"
+            else connection == "keep-alive"
+        )
+        # bodies are never read, so the bytes after one can't be taken as a request
+        if "transfer-encoding" in headers or headers.get("content-length", "0") != "0":
+            keep_alive = False
+        head_only = method == "HEAD"
+        logger.debug("%s %s", method, target)
+
+        if method not in ("GET", "HEAD"):
+            await self._send_error(writer, 405, keep_alive, {"Allow": "GET, HEAD"})
+            return keep_alive
+
+        url_path = unquote(target.split("?", 1)[0].split("#", 1)[0])
+        path = self._resolve(url_path)
+        if path is None:
+            await self._send_error(writer, 404, keep_alive, head_only=head_only)
+            return keep_alive
+        if path.is_dir():
+            if not url_path.endswith("/"):
+                await self._send(
+                    writer, 301, {"Location": quote(url_path) + "/"}, b"", keep_alive
+                )
+                return keep_alive
+            path = path.joinpath("index.html")
+
+        await self._send_file(writer, path, headers, head_only, keep_alive)
+        return keep_alive
+
+    def _resolve(self, url_path: str) -> Path | None:
+        try:
+            path = self.root.joinpath(url_path.lstrip("/")).resolve()
+            if not path.is_relative_to(self.root) or not path.exists():
+                return None
+        except (OSError, ValueError):
+            return None  # e.g. a null byte or a name too long for the OS
+        return path
+
+    async def _send_file(
+        self,
+        writer: asyncio.StreamWriter,
+        path: Path,
+        request: dict[str, str],
+        head_only: bool,
+        keep_alive: bool,
+    ):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return await self._send_error(writer, 404, keep_alive, head_only=head_only)
+
+        content_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+        if content_type.startswith("text/") or content_type.endswith(("+xml", "json")):
+            content_type += "; charset=utf-8"
+        headers = {
+            "Content-Type": content_type,
+            "Last-Modified": formatdate(stat.st_mtime, usegmt=True),
+            "Cache-Control": (
+                "public, max-age=31536000, immutable"
+                if _FINGERPRINTED_RE.search(path.name)
+                else "no-cache"
+            ),
+            "Vary": "Accept-Encoding",
+        }
+
+        accepted = _accepted_encodings(request.get("accept-encoding", ""))
+        encoding = ""
+        for name, suffix in _ENCODINGS:
+            if name not in accepted:
+                continue
+            variant = path.with_name(path.name + suffix)
+            try:
+                variant_stat = os.stat(variant)
+            except OSError:
+                continue
+            path, stat, encoding = variant, variant_stat, name
+            headers["Content-Encoding"] = name
+            break
+
+        # each encoding is a different representation, so it needs its own tag
+        tag = f"{stat.st_size:x}-{stat.st_mtime_ns:x}"
+        etag = f'"{tag}-{encoding}"' if encoding else f'"{tag}"'
+        headers["ETag"] = etag
+        if self._not_modified(request, etag, stat.st_mtime):
+            return await self._send(writer, 304, headers, b"", keep_alive)
+
+        headers["Content-Length"] = str(stat.st_size)
+        version = (stat.st_size, stat.st_mtime_ns)
+        if head_only:
+            return await self._send(writer, 200, headers, b"", keep_alive)
+
+        data = self.cache.get(path, version)
+        if data is None and stat.st_size <= self.cache.max_file_bytes:
+            data = await asyncio.to_thread(path.read_bytes)
+            self.cache.put(path, version, data)
+        if data is not None:
+            return await self._send(writer, 200, headers, data, keep_alive)
+
+        # too big to keep in memory, let the kernel copy it to the socket
+        await self._send(writer, 200, headers, b"", keep_alive)
+        with open(path, "rb") as f:
+            _ = await asyncio.get_running_loop().sendfile(
+                writer.transport, f, 0, stat.st_size
+            )
+
+    @staticmethod
+    def _not_modified(request: dict[str, str], etag: str, mtime: float) -> bool:
+        if_none_match = request.get("if-none-match")
+        if if_none_match is not None:
+            tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+            return etag in tags or "*" in tags
+
+        if_modified_since = request.get("if-modified-since")
+        if if_modified_since:
+            try:
+                since = parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+            return int(mtime) <= since
+
+        return False
+
+    async def _send(
+        self,
+        writer: asyncio.StreamWriter,
+        status: int,
+        headers: dict[str, str],
+        body: bytes,
+        keep_alive: bool,
+    ):
+        lines = [f"HTTP/1.1 {status} {_REASONS[status]}"]
+        lines.append(f"Date: {formatdate(usegmt=True)}")
+        if "Content-Length" not in headers and status != 304:
+            lines.append(f"Content-Length: {len(body)}")
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        lines.append(f"Connection: {'keep-alive' if keep_alive else 'close'}")
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+    async def _send_error(
+        self,
+        writer: asyncio.StreamWriter,
+        status: int,
+        keep_alive: bool = False,
+        headers: dict[str, str] | None = None,
+        close: bool = False,
+        head_only: bool = False,
+    ):
+        body = f"{status} {_REASONS[status]}\n".encode()
+        headers = {
+            "Content-Type": "text/plain; charset=utf-8",
+            "Content-Length": str(len(body)),
+            **(headers or {}),
+        }
+        if head_only:
+            body = b""  # the length of the body a GET would get, but no body
+        await self._send(writer, status, headers, body, keep_alive and not close)
+
+
+def _accepted_encodings(header: str) -> set[str]:
+    """Content codings in an Accept-Encoding header, without those given q=0"""
+    accepted: set[str] = set()
+    for token in header.split(","):
+        name, *params = (part.strip() for part in token.split(";"))
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if name and quality > 0:
+            accepted.add(name.lower())
+    return accepted
+
+
+async def serve(
+    root: Path,
+    port: int = 8888,
+    host: str = "",
+    cache_bytes: int = 64 * 1024 * 1024,
+    max_file_bytes: int = 1024 * 1024,
+):
+    server = StaticServer(root, HotCache(cache_bytes, max_file_bytes))
+    listener = await asyncio.start_server(
+        server.handle, host or None, port, limit=_MAX_HEADER_BYTES
+    )
+    logger.info("serving %s on http://localhost:%d", root, port)
+    async with listener:
+        await listener.serve_forever()
@@ -0,0 +1,183 @@
+import re
+import hashlib
+import argparse
+import logging
+from pathlib import Path
+
+from manifest import (
+    MANIFEST_VERSION,
+    BuildManifest,
+    CompressedEntry,
+    PageEntry,
+    load_json_state,
+)
+from sync import publish_file, same_contents, walk_files
+
+logger = logging.getLogger(__name__)
+
+# the partial manifest each shard writes next to its pages, for merge to combine
+SHARD_MANIFEST = ".manifest.json"
+_SPEC_RE = re.compile(r"(\d+)/(\d+)")
+_SHARD_DIR_RE = re.compile(r".+\.shard-(\d+)-of-(\d+)")
+
+Shard = tuple[int, int]
+
+
+def parse_shard(spec: str) -> Shard:
+    """(i, N) from "i/N", counting shards from 1"""
+    match = _SPEC_RE.fullmatch(spec)
+    if match is None:
+        raise argparse.ArgumentTypeError(f"expected i/N, e.g. 1/4, got {spec!r}")
+    index, count = int(match[1]), int(match[2])
+    if not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"shard {spec} is not between 1/N and N/N")
+    return index, count
+
+
+def in_shard(src: Path, content_path: Path, shard: Shard) -> bool:
+    """Whether shard renders src, decided by a hash of its path under content_path
+
+    The path is hashed rather than counted, so every machine agrees without listing
+    the whole tree, and adding a page doesn't move any other between shards.
+    """
+    key = src.relative_to(content_path).as_posix().encode()
+    digest = hashlib.sha256(key).digest()
+    return int.from_bytes(digest[:8], "big") % shard[1] == shard[0] - 1
+
+
+def shard_path(public_path: Path, shard: Shard) -> Path:
+    return public_path.with_name(f"{public_path.name}.shard-{shard[0]}-of-{shard[1]}")
+
+
+def find_shards(public_path: Path) -> list[Path]:
+    return sorted(public_path.parent.glob(f"{public_path.name}.shard-*-of-*"))
+
+
+def merge_shards(
+    shard_dirs: list[Path], public_path: Path, manifest_path: Path
+) -> BuildManifest:
+    """Combine shard outputs into public_path and their manifests into one
+
+    Nothing is written when the shards conflict: a shard is missing or repeated,
+    they were built with different settings, two of them built the same page, or
+    they wrote different bytes to the same output. Outputs are hardlinked where
+    possible, and outputs of the previous merge that no shard wrote are removed.
+    """
+    partials = [
+        (path, load_json_state(path.joinpath(SHARD_MANIFEST))) for path in shard_dirs
+    ]
+    conflicts = _check_shards(partials)
+
+    sources: dict[str, Path] = {}
+    outputs: dict[str, Path] = {}
+    pages: dict[str, PageEntry] = {}
+    static: dict[str, str] = {}
+    compressed: dict[str, CompressedEntry] = {}
+    for shard_dir, data in partials:
+        for src in data.get("pages", {}):
+            if src in sources:
+                conflicts.append(f"{src} was built by {sources[src]} and {shard_dir}")
+            sources[src] = shard_dir
+
+        shard = str(data.get("shard"))
+        try:
+            for src, entry in data.get("pages", {}).items():
+                entry["output"] = _rebase(entry["output"], shard, public_path)
+                pages[src] = entry
+            for src, output in data.get("static", {}).items():
+                static[src] = _rebase(output, shard, public_path)
+            for output, entry in data.get("compressed", {}).items():
+                compressed[_rebase(output, shard, public_path)] = entry
+        except (KeyError, TypeError, ValueError) as err:
+            conflicts.append(f"{shard_dir} has a corrupt shard manifest: {err}")
+
+        for path in walk_files(shard_dir):
+            rel = path.relative_to(shard_dir).as_posix()
+            if rel == SHARD_MANIFEST or rel.endswith(".tmp"):
+                continue
+            other = outputs.setdefault(rel, path)
+            if other != path and not same_contents(other, path):
+                conflicts.append(f"{rel} differs in {other} and {path}")
+
+    if conflicts:
+        for conflict in conflicts:
+            logger.error("merge conflict: %s", conflict)
+        raise ValueError(f"{len(conflicts)} conflicts merging shards, see above")
+
+    for rel, path in outputs.items():
+        dst = public_path.joinpath(rel)
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        publish_file(path, dst)
+
+    previous = load_json_state(manifest_path)
+    manifest = BuildManifest(manifest_path, partials[0][1]["settings"])
+    manifest.previous = previous.get("pages", {})
+    manifest.previous_static = previous.get("static", {})
+    manifest.previous_compressed = previous.get("compressed", {})
+    manifest.pages.update(pages)
+    manifest.static.update(static)
+    manifest.compressed.update(compressed)
+
+    _ = manifest.remove_orphans(public_path)
+    manifest.save()
+    logger.info(
+        "merged %d shards into %s: %d pages, %d files",
+        len(partials),
+        public_path,
+        len(manifest.pages),
+        len(outputs),
+    )
+    return manifest
+
+
+def _check_shards(partials: list[tuple[Path, dict]]) -> list[str]:
+    if not partials:
+        return ["no shards to merge"]
+
+    conflicts: list[str] = []
+    seen: dict[int, Path] = {}
+    counts: set[int] = set()
+    for shard_dir, data in partials:
+        if data.get("version") != MANIFEST_VERSION or not data.get("shard"):
+            conflicts.append(f"{shard_dir} has no shard manifest, was it built?")
+            continue
+
+        try:
+            index, count = parse_shard(str(data["shard"]))
+        except argparse.ArgumentTypeError as err:
+            conflicts.append(f"{shard_dir} has a corrupt shard manifest: {err}")
+            continue
+
+        counts.add(count)
+        if index in seen:
+            conflicts.append(f"{shard_dir} and {seen[index]} are both shard {index}")
+        seen[index] = shard_dir
+        settings = data.get("settings")
+        if not settings:
+            conflicts.append(f"{shard_dir} has no build settings in its manifest")
+        elif settings != partials[0][1].get("settings"):
+            conflicts.append(
+                f"{shard_dir} was built with other settings than {partials[0][0]}"
+            )
+
+    if len(counts) > 1:
+        conflicts.append(f"shards split the site in {sorted(counts)} ways")
+    elif counts:
+        missing = set(range(1, counts.pop() + 1)) - seen.keys()
+        conflicts.extend(f"shard {index} is missing" for index in sorted(missing))
+
+    return conflicts
+
+
+def _rebase(output: str, shard: str, public_path: Path) -> str:
+    """output moved from the dir its shard was built in to under public_path
+
+    The shard dir is found by its name in the recorded path, not where it is now,
+    so shards built on other machines merge wherever they were collected.
+    """
+    parts = Path(output).parts
+    for pos, part in enumerate(parts):
+        match = _SHARD_DIR_RE.fullmatch(part)
+        if match and f"{match[1]}/{match[2]}" == shard:
+            return public_path.joinpath(*parts[pos + 1 :]).as_posix()
+    raise ValueError(f"{output} is not in the dir of shard {shard}")
@@ -0,0 +1,208 @@
+import os
+import shutil
+import logging
+from collections.abc import Collection, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from manifest import hash_file
+from minify import minify_css
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# ioctl request to share extents between files on btrfs/xfs, from linux/fs.h
+_FICLONE = 0x40049409
+
+
+def sync_static(
+    static_path: Path,
+    public_path: Path,
+    checksum: bool = False,
+    link: bool = False,
+    jobs: int = 1,
+    sources: Iterable[Path] | None = None,
+    minify: bool = False,
+    exclude: Collection[Path] = (),
+) -> dict[str, str]:
+    """Copy only new or changed files from static_path, returning {source: output}
+
+    Files are unchanged when size and mtime match, or when their contents hash the
+    same with checksum. With checksum, identical sources are written once and the
+    duplicates hardlinked to it. With link, outputs are hardlinks to the sources.
+    Passing sources limits the sync to those files. With minify, CSS files are
+    written minified instead of copied. Files in exclude are left to other stages.
+    """
+    if sources is None:
+        sources = walk_files(static_path)
+    files = [
+        (src, public_path.joinpath(src.relative_to(static_path)))
+        for src in sources
+        if src not in exclude
+    ]
+    for directory in sorted({dst.parent for _, dst in files}):
+        directory.mkdir(parents=True, exist_ok=True)
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        digests: list[str | None] = [None] * len(files)
+        if checksum:
+            digests = list(pool.map(hash_file, [src for src, _ in files]))
+
+        primaries: list[tuple[Path, Path, str | None]] = []
+        duplicates: list[tuple[Path, Path]] = []
+        first_output: dict[str, Path] = {}
+        for (src, dst), digest in zip(files, digests):
+            if digest is not None and digest in first_output:
+                duplicates.append((first_output[digest], dst))
+                continue
+            if digest is not None:
+                first_output[digest] = dst
+            primaries.append((src, dst, digest))
+
+        copied = sum(
+            pool.map(lambda job: _sync_file(*job, link=link, minify=minify), primaries)
+        )
+        copied += sum(pool.map(lambda job: _link_duplicate(*job), duplicates))
+
+    logger.info(
+        "synced %s to %s: %d updated, %d unchanged",
+        static_path,
+        public_path,
+        copied,
+        len(files) - copied,
+    )
+    return {src.as_posix(): dst.as_posix() for src, dst in files}
+
+
+def walk_files(root: Path) -> Iterator[Path]:
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            yield Path(dirpath, filename)
+
+
+def _is_current(src: Path, dst: Path, digest: str | None) -> bool:
+    try:
+        dst_stat = os.stat(dst)
+    except FileNotFoundError:
+        return False
+
+    src_stat = os.stat(src)
+    if (dst_stat.st_dev, dst_stat.st_ino) == (src_stat.st_dev, src_stat.st_ino):
+        return True
+    if dst_stat.st_size != src_stat.st_size:
+        return False
+    if digest is not None:
+        return hash_file(dst) == digest
+
+    return dst_stat.st_mtime_ns == src_stat.st_mtime_ns
+
+
+def _sync_file(
+    src: Path, dst: Path, digest: str | None, link: bool = False, minify: bool = False
+) -> bool:
+    if minify and src.suffix == ".css":
+        return _sync_minified(src, dst)
+    if _is_current(src, dst, digest):
+        logger.debug("%s unchanged, skipping", src)
+        return False
+
+    # write next to the output and rename over it, so hardlinked copies never change
+    tmp = dst.with_name(f".{dst.name}.tmp")
+    tmp.unlink(missing_ok=True)
+    linked = False
+    if link:
+        try:
+            os.link(src, tmp)
+            linked = True
+        except OSError:
+            pass  # across devices, so copy instead
+    if not linked:
+        fast_copy(src, tmp)
+        # copies keep the source mtime, which _is_current compares next build
+        src_stat = os.stat(src)
+        os.utime(tmp, ns=(src_stat.st_atime_ns, src_stat.st_mtime_ns))
+
+    os.replace(tmp, dst)
+    logger.info("copied %s to %s", src, dst)
+    return True
+
+
+def _sync_minified(src: Path, dst: Path) -> bool:
+    # stylesheets are small, so compare contents rather than tracking minified stats
+    original = src.read_bytes()
+    minified = minify_css(original.decode()).encode()
+    if dst.exists() and dst.read_bytes() == minified:
+        logger.debug("%s unchanged, skipping", src)
+        return False
+
+    # a new file, never a link, as the output differs from the source
+    tmp = dst.with_name(f".{dst.name}.tmp")
+    _ = tmp.write_bytes(minified)
+    os.replace(tmp, dst)
+    logger.info(
+        "minified %s to %s, saved %d bytes", src, dst, len(original) - len(minified)
+    )
+    return True
+
+
+def _link_duplicate(original: Path, dst: Path) -> bool:
+    if dst.exists() and os.path.samefile(original, dst):
+        return False
+
+    publish_file(original, dst)
+    logger.info("linked duplicate %s to %s", dst, original)
+    return True
+
+
+def publish_file(src: Path, dst: Path):
+    """Put src at dst as a hardlink, or a copy across devices, replacing dst whole"""
+    if dst.exists() and os.path.samefile(src, dst):
+        return
+
+    tmp = dst.with_name(f".{dst.name}.tmp")
+    tmp.unlink(missing_ok=True)
+    try:
+        os.link(src, tmp)
+    except OSError:
+        fast_copy(src, tmp)
+    os.replace(tmp, dst)
+    logger.debug("published %s to %s", src, dst)
+
+
+def same_contents(a: Path, b: Path) -> bool:
+    """Whether a and b hold the same bytes, without reading them when linked"""
+    if os.path.samefile(a, b):
+        return True
+    return os.path.getsize(a) == os.path.getsize(b) and hash_file(a) == hash_file(b)
+
+
+def fast_copy(src: Path, dst: Path):
+    """Copy using a reflink or copy_file_range where the filesystem allows it"""
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        if fcntl is not None:
+            try:
+                _ = fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+                return
+            except OSError:
+                pass  # not a CoW filesystem, or src and dst on different devices
+
+        if hasattr(os, "copy_file_range"):
+            try:
+                remaining = os.fstat(fsrc.fileno()).st_size
+                while remaining > 0:
+                    sent = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                    if sent == 0:
+                        break
+                    remaining -= sent
+                return
+            except OSError:
+                _ = fsrc.seek(0)
+                _ = fdst.seek(0)
+                _ = fdst.truncate()
+
+        shutil.copyfileobj(fsrc, fdst)
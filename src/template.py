@@ -0,0 +1,195 @@
+from __future__ import annotations
+import re
+import logging
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# {{ Title }} is a slot filled per page, {{> header }} includes partials/header.html
+_PLACEHOLDER_RE = re.compile(r"\{\{\s*(>?)\s*([\w./-]+)\s*\}\}")
+# as written by LeafNode for markdown images, src first
+_IMG_RE = re.compile(r'<img src="(/[^"]*)"([^>]*)>')
+
+# image URL -> [(variant URL, width, MIME type)], see images.image_srcsets
+ImageVariants = dict[str, list[tuple[str, int, str]]]
+_ASSET_RE = re.compile(r'((?:href|src)=")(/[^"]*)"')
+
+
+class Template:
+    """A template split once into literal text and slots, so rendering is a single join"""
+
+    def __init__(
+        self,
+        name: str,
+        text: str,
+        base_path: str = "/",
+        images: ImageVariants | None = None,
+        image_sizes: str = "100vw",
+        assets: dict[str, str] | None = None,
+    ):
+        self.name: str = name
+        self.base_path: str = base_path
+        self.images: ImageVariants | None = images
+        self.image_sizes: str = image_sizes
+        # asset URL -> fingerprinted URL, see assets.fingerprint_assets
+        self.assets: dict[str, str] | None = assets
+        self.parts: list[str] = []
+        self.slots: list[tuple[int, str]] = []
+
+        pos = 0
+        for match in _PLACEHOLDER_RE.finditer(text):
+            if match.group(1):
+                raise ValueError(f"unresolved partial {match.group(0)} in {name}")
+            self.parts.append(self._rewrite(text[pos : match.start()]))
+            self.slots.append((len(self.parts), match.group(2)))
+            # unfilled slots render as the original placeholder
+            self.parts.append(match.group(0))
+            pos = match.end()
+        self.parts.append(self._rewrite(text[pos:]))
+        self.slot_names: dict[int, str] = dict(self.slots)
+
+    def _rewrite(self, html: str) -> str:
+        if self.images and "<img" in html:
+            html = _IMG_RE.sub(self._picture, html)
+        if self.assets and '="/' in html:
+            html = _ASSET_RE.sub(self._fingerprint, html)
+        if self.base_path == "/" or '="/' not in html:
+            return html
+        return html.replace('href="/', f'href="{self.base_path}').replace(
+            'src="/', f'src="{self.base_path}'
+        )
+
+    def _fingerprint(self, match: re.Match[str]) -> str:
+        url = match.group(2)
+        return f'{match.group(1)}{self.assets.get(url, url) if self.assets else url}"'
+
+    def _picture(self, match: re.Match[str]) -> str:
+        """Offer an image's variants through srcset, and WebP through <picture>"""
+        url, rest = match.group(1), match.group(2)
+        variants = self.images.get(url) if self.images else None
+        if not variants:
+            return match.group(0)
+
+        by_type: dict[str, list[str]] = {}
+        for variant_url, width, mime in variants:
+            by_type.setdefault(mime, []).append(
+                f"{self.base_path}{variant_url[1:]} {width}w"
+            )
+        own_type = next(
+            (mime for variant_url, _, mime in variants if variant_url == url),
+            variants[0][2],
+        )
+
+        # src is left root-relative, it is rebased with the rest of the chunk
+        sizes = f'sizes="{self.image_sizes}"'
+        img = (
+            f'<img src="{url}" srcset="{", ".join(by_type.pop(own_type, []))}" '
+            f"{sizes}{rest}>"
+        )
+        if not by_type:
+            return img
+
+        sources = "".join(
+            f'<source type="{mime}" srcset="{", ".join(srcset)}" {sizes}>'
+            for mime, srcset in by_type.items()
+        )
+        return f"<picture>{sources}{img}</picture>"
+
+    def render(self, values: dict[str, str]) -> str:
+        parts = self.parts.copy()
+        for idx, name in self.slots:
+            value = values.get(name)
+            if value is not None:
+                parts[idx] = self._rewrite(value)
+
+        return "".join(parts)
+
+    def render_chunks(self, values: dict[str, str | Iterable[str]]) -> Iterator[str]:
+        """Like render, but slot values may be chunk iterators, e.g. HTMLNode.iter_html"""
+        for idx, part in enumerate(self.parts):
+            name = self.slot_names.get(idx)
+            value = values.get(name) if name else None
+            if value is None:
+                yield part
+            elif isinstance(value, str):
+                yield self._rewrite(value)
+            else:
+                for chunk in value:
+                    yield self._rewrite(chunk)
+
+
+def compile_template(
+    template_path: Path,
+    partials_path: Path,
+    base_path: str = "/",
+    images: ImageVariants | None = None,
+    image_sizes: str = "100vw",
+    assets: dict[str, str] | None = None,
+) -> Template:
+    text = _resolve_partials(template_path.read_text(), partials_path, [template_path])
+    return Template(str(template_path), text, base_path, images, image_sizes, assets)
+
+
+def _resolve_partials(text: str, partials_path: Path, stack: list[Path]) -> str:
+    def _include(match: re.Match[str]) -> str:
+        if not match.group(1):
+            return match.group(0)
+
+        partial = partials_path.joinpath(f"{match.group(2)}.html")
+        if partial in stack:
+            raise ValueError(f"partial {partial} includes itself via {stack[-1]}")
+        if not partial.is_file():
+            raise ValueError(f"partial {partial} used in {stack[-1]} does not exist")
+
+        return _resolve_partials(partial.read_text(), partials_path, stack + [partial])
+
+    return _PLACEHOLDER_RE.sub(_include, text)
+
+
+class Layouts:
+    """Picks the template for a page from layouts/, falling back to the default"""
+
+    def __init__(
+        self, content_path: Path, default: Template, sections: dict[str, Template]
+    ):
+        self.content_path: Path = content_path
+        self.default: Template = default
+        self.sections: dict[str, Template] = sections
+
+    def for_page(self, src: Path) -> Template:
+        # content/blog/tom/index.md tries layouts/blog/tom.html, then layouts/blog.html
+        section = src.parent.relative_to(self.content_path)
+        while section.parts:
+            template = self.sections.get(section.as_posix())
+            if template:
+                return template
+            section = section.parent
+
+        return self.default
+
+
+def load_layouts(
+    content_path: Path,
+    template_path: Path,
+    layouts_path: Path,
+    partials_path: Path,
+    base_path: str = "/",
+    images: ImageVariants | None = None,
+    image_sizes: str = "100vw",
+    assets: dict[str, str] | None = None,
+) -> Layouts:
+    default = compile_template(
+        template_path, partials_path, base_path, images, image_sizes, assets
+    )
+
+    sections: dict[str, Template] = {}
+    if layouts_path.is_dir():
+        for layout in sorted(layouts_path.rglob("*.html")):
+            section = layout.relative_to(layouts_path).with_suffix("").as_posix()
+            sections[section] = compile_template(
+                layout, partials_path, base_path, images, image_sizes, assets
+            )
+            logger.debug("loaded layout %s for section %s", layout, section)
+
+    return Layouts(content_path, default, sections)
@@ -0,0 +1,80 @@
+import os
+import unittest
+import tempfile
+from pathlib import Path
+
+from assets import fingerprint_assets, fingerprinted_name, link_fingerprinted
+from manifest import hash_bytes
+
+
+class TestFingerprintAssets(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.static = self.root.joinpath("static")
+        self.static.joinpath("images").mkdir(parents=True)
+        self.css = self.static.joinpath("index.css")
+        _ = self.css.write_text("body {\n  color: red;\n}\n")
+        self.png = self.static.joinpath("images", "a.png")
+        _ = self.png.write_bytes(b"png")
+        self.index = self.root.joinpath("assets.json")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _assets(self, minify: bool = False) -> dict[str, str]:
+        return fingerprint_assets([self.css, self.png], self.static, self.index, minify)
+
+    def test_fingerprinted_name(self):
+        digest = "0123456789abcdef"
+        self.assertEqual(
+            fingerprinted_name("a.min.js", digest), "a.min.0123456789ab.js"
+        )
+        self.assertEqual(
+            fingerprinted_name("LICENSE", digest), "LICENSE.0123456789ab"
+        )
+
+    def test_urls(self):
+        digest = hash_bytes(b"png")[:12]
+        assets = self._assets()
+        self.assertEqual(assets["/images/a.png"], f"/images/a.{digest}.png")
+        self.assertRegex(assets["/index.css"], r"^/index\.[0-9a-f]{12}\.css$")
+
+    def test_only_changed_assets_get_new_urls(self):
+        before = self._assets()
+        _ = self.css.write_text("body {}")
+        after = self._assets()
+        self.assertNotEqual(before["/index.css"], after["/index.css"])
+        self.assertEqual(before["/images/a.png"], after["/images/a.png"])
+
+    def test_minified_css_hashed_as_served(self):
+        digest = hash_bytes(b"body{color:red}")[:12]
+        assets = self._assets(minify=True)
+        self.assertEqual(assets["/index.css"], f"/index.{digest}.css")
+
+    def test_link_fingerprinted(self):
+        public = self.root.joinpath("public")
+        public.joinpath("images").mkdir(parents=True)
+        _ = public.joinpath("images", "a.png").write_bytes(b"png")
+        assets = {"/images/a.png": "/images/a.0123456789ab.png"}
+
+        outputs = link_fingerprinted(assets, public)
+        hashed = public.joinpath("images", "a.0123456789ab.png")
+        self.assertDictEqual(
+            outputs, {f"{public}/images/a.png#fingerprint": hashed.as_posix()}
+        )
+        self.assertTrue(os.path.samefile(hashed, public.joinpath("images", "a.png")))
+
+    def test_link_fingerprinted_replaces_stale_copy(self):
+        public = self.root.joinpath("public")
+        public.joinpath("images").mkdir(parents=True)
+        _ = public.joinpath("images", "a.png").write_bytes(b"png")
+        hashed = public.joinpath("images", "a.0123456789ab.png")
+        _ = hashed.write_bytes(b"gif")  # same size, other bytes
+
+        _ = link_fingerprinted({"/images/a.png": "/images/a.0123456789ab.png"}, public)
+        self.assertEqual(hashed.read_bytes(), b"png")
+
+
+if __name__ == "__main__":
+    _ = unittest.main()
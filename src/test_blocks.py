@@ -1,5 +1,15 @@
 import unittest
-from blocks import BlockType, markdown_to_blocks, get_block_type
+import tempfile
+from pathlib import Path
+
+from blocks import (
+    Block,
+    BlockType,
+    get_block_type,
+    lex_blocks,
+    markdown_to_blocks,
+    read_blocks,
+)
 
 
 class TestMarkdownToBlocks(unittest.TestCase):
@@ -111,3 +121,69 @@ class TestBlockToBlock(unittest.TestCase):
         actual = get_block_type(block)
         expected = BlockType.PARAGRAPH
         self.assertEqual(actual, expected)
+
+
+class TestLexBlocks(unittest.TestCase):
+    def test_typed_blocks(self):
+        sample_md = """
+# This is a **heading**
+
+A paragraph
+over two lines
+
+- first
+- second
+
+1. one
+2. two
+
+> I am
+> quoted
+
+```python
+def f():
+    return 1
+```"""
+        actual = list(lex_blocks(sample_md))
+        expected = [
+            Block(BlockType.HEADING, ["This is a **heading**"], level=1),
+            Block(BlockType.PARAGRAPH, ["A paragraph", "over two lines"]),
+            Block(BlockType.UNORDERED_LIST, ["first", "second"]),
+            Block(BlockType.ORDERED_LIST, ["one", "two"]),
+            Block(BlockType.QUOTE, ["I am", "quoted"]),
+            Block(BlockType.CODE, ["def f():", "    return 1"], language="python"),
+        ]
+        self.assertListEqual(actual, expected)
+
+    def test_unknown_language_kept(self):
+        actual = list(lex_blocks("```\nprint(1)\n```"))
+        expected = [Block(BlockType.CODE, ["print(1)"])]
+        self.assertListEqual(actual, expected)
+
+    def test_start_lines(self):
+        md = "\n# Title\n\nfirst\nsecond\n\n\n```\ncode\n```\n- item"
+        actual = [block.line for block in lex_blocks(md)]
+        self.assertListEqual(actual, [2, 4, 8])
+
+    def test_read_blocks_small_and_large(self):
+        md = "# Title\n\nfirst\nsecond\n\n```\ncode\n```"
+        with tempfile.TemporaryDirectory() as tmp:
+            page = Path(tmp, "index.md")
+            _ = page.write_text(md)
+            expected = list(lex_blocks(md))
+            # read whole, then streamed from a memory map
+            for threshold in (1 << 20, 1):
+                self.assertListEqual(list(read_blocks(page, threshold)), expected)
+
+    def test_matches_get_block_type(self):
+        samples = [
+            "1. hey\n3. skipped\n4. okay",
+            "####### too many hashes",
+            "``x = 1",
+            "> This is\n a false\n> quote",
+            "- mixed\n* bullets",
+        ]
+        for sample in samples:
+            with self.subTest(sample=sample):
+                block = next(lex_blocks(sample))
+                self.assertEqual(block.block_type, get_block_type(sample))
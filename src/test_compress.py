@@ -0,0 +1,67 @@
+import os
+import gzip
+import unittest
+import tempfile
+from pathlib import Path
+
+import compress
+from compress import compress_outputs
+
+
+class TestCompressOutputs(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.page = self.root.joinpath("index.html")
+        _ = self.page.write_text("<p>compressible text</p>\n" * 200)
+        self.small = self.root.joinpath("small.css")
+        _ = self.small.write_text("body {}")
+        self.noise = self.root.joinpath("noise.svg")
+        _ = self.noise.write_bytes(os.urandom(4096))
+        self.image = self.root.joinpath("image.png")
+        _ = self.image.write_bytes(b"png" * 1000)
+        self.outputs = [self.page, self.small, self.noise, self.image]
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_writes_gzip(self):
+        entries = compress_outputs(self.outputs, {}, jobs=2)
+        gz = self.root.joinpath("index.html.gz")
+        self.assertEqual(gzip.decompress(gz.read_bytes()), self.page.read_bytes())
+        self.assertIn(".gz", entries[self.page.as_posix()]["variants"])
+
+    def test_skips_small_incompressible_and_other_types(self):
+        entries = compress_outputs(self.outputs, {})
+        self.assertListEqual(entries[self.small.as_posix()]["variants"], [])
+        self.assertListEqual(entries[self.noise.as_posix()]["variants"], [])
+        self.assertNotIn(self.image.as_posix(), entries)
+        self.assertListEqual(
+            list(self.root.glob("*.gz")), [self.root.joinpath("index.html.gz")]
+        )
+
+    def test_skips_unchanged(self):
+        entries = compress_outputs(self.outputs, {})
+        with self.assertLogs("compress", level="INFO") as logs:
+            again = compress_outputs(self.outputs, entries)
+        self.assertIn("0 updated, 3 unchanged", logs.output[-1])
+        self.assertDictEqual(again, entries)
+
+    def test_rewrites_changed_and_drops_shrunk(self):
+        entries = compress_outputs(self.outputs, {})
+        _ = self.page.write_text("<p>tiny</p>")
+        entries = compress_outputs(self.outputs, entries)
+        self.assertListEqual(entries[self.page.as_posix()]["variants"], [])
+        self.assertFalse(self.root.joinpath("index.html.gz").exists())
+
+    @unittest.skipIf(compress.brotli is None, "brotli is not installed")
+    def test_writes_brotli(self):
+        _ = compress_outputs(self.outputs, {})
+        br = self.root.joinpath("index.html.br")
+        self.assertEqual(
+            compress.brotli.decompress(br.read_bytes()), self.page.read_bytes()
+        )
+
+
+if __name__ == "__main__":
+    _ = unittest.main()
@@ -0,0 +1,43 @@
+import unittest
+
+from highlight import highlight
+
+
+class TestHighlight(unittest.TestCase):
+    def test_python(self):
+        code = 'def define(x):\n    return "#1" + 0x1F  # sum'
+        expected = (
+            '<span class="k">def</span> define(x):\n    <span class="k">return</span> '
+            '<span class="s">"#1"</span> + <span class="m">0x1F</span>  '
+            '<span class="c"># sum</span>'
+        )
+        self.assertEqual(highlight(code, "python"), expected)
+
+    def test_block_comments_and_escaping(self):
+        code = "/* a < b */\nconst s = `<${b}>`;"
+        expected = (
+            '<span class="c">/* a &lt; b */</span>\n<span class="k">const</span> s = '
+            '<span class="s">`&lt;${b}&gt;`</span>;'
+        )
+        self.assertEqual(highlight(code, "JavaScript"), expected)
+
+    def test_caseless_keywords(self):
+        self.assertEqual(
+            highlight("select a FROM t", "sql"),
+            '<span class="k">select</span> a <span class="k">FROM</span> t',
+        )
+
+    def test_markup(self):
+        self.assertEqual(
+            highlight('<a href="/">x</a>', "html"),
+            '<span class="nt">&lt;a</span> href=<span class="s">"/"</span>'
+            '<span class="nt">&gt;</span>x<span class="nt">&lt;/a</span>'
+            '<span class="nt">&gt;</span>',
+        )
+
+    def test_unknown_language_is_escaped(self):
+        self.assertEqual(highlight("<b> & if", "markdown"), "&lt;b&gt; &amp; if")
+
+
+if __name__ == "__main__":
+    unittest.main()
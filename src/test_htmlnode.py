@@ -1,4 +1,5 @@
 import unittest
+import io
 
 from htmlnode import HTMLNode, LeafNode, ParentNode
 
@@ -47,6 +48,12 @@ class TestLeafNode(unittest.TestCase):
         expected = '<a href="https://www.google.com" target="_blank">Click me!</a>'
         self.assertEqual(node.to_html(), expected)
 
+    def test_empty_leaf_is_closed(self):
+        self.assertEqual(LeafNode("code", "").to_html(), "<code></code>")
+        self.assertEqual(LeafNode(None, "").to_html(), "")
+        node = LeafNode("img", "", {"src": "a.png", "alt": ""})
+        self.assertEqual(node.to_html(), '<img src="a.png" alt="">')
+
 
 class TestParentNode(unittest.TestCase):
     def test_to_html_with_children(self):
@@ -92,6 +99,34 @@ class TestParentNode(unittest.TestCase):
         self.maxDiff = None
         self.assertEqual(actual_html, expected_html)
 
+    def test_no_instance_dict(self):
+        node = ParentNode("p", [LeafNode("b", "bold")])
+        self.assertFalse(hasattr(node, "__dict__"))
+        self.assertFalse(hasattr(node.children[0], "__dict__"))
+
+
+class TestStreamingHTML(unittest.TestCase):
+    def setUp(self):
+        link = LeafNode("a", "backend", {"href": "https://www.boot.dev"})
+        para = ParentNode("p", [LeafNode(None, "Come to the "), link])
+        self.node = ParentNode("div", [LeafNode("h1", "title"), para])
+
+    def test_iter_html_matches_to_html(self):
+        self.assertEqual("".join(self.node.iter_html()), self.node.to_html())
+
+    def test_iter_html_chunks(self):
+        chunks = list(ParentNode("p", [LeafNode("b", "bold")]).iter_html())
+        self.assertListEqual(chunks, ["<p>", "<b>bold</b>", "</p>"])
+
+    def test_write_html(self):
+        f = io.StringIO()
+        self.node.write_html(f)
+        self.assertEqual(f.getvalue(), self.node.to_html())
+
+    def test_iter_html_missing_children(self):
+        with self.assertRaises(ValueError):
+            _ = list(ParentNode("div", []).iter_html())
+
 
 if __name__ == "__main__":
     _ = unittest.main()
@@ -0,0 +1,109 @@
+import os
+import json
+import unittest
+import tempfile
+from pathlib import Path
+
+import images
+from images import image_srcsets, prepare_images, publish_images, variant_output
+
+
+class TestPublishImages(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.static = self.root.joinpath("static")
+        self.src = self.static.joinpath("images", "tom.png")
+        self.src.parent.mkdir(parents=True)
+        _ = self.src.write_bytes(b"original")
+
+        cached = self.root.joinpath("cache", "abc")
+        cached.mkdir(parents=True)
+        for name in ("480w.png", "full.png", "full.webp"):
+            _ = cached.joinpath(name).write_bytes(name.encode())
+        self.prepared: dict[Path, images.ImageEntry] = {
+            self.src: {
+                "dir": cached.as_posix(),
+                "width": 900,
+                "height": 600,
+                "variants": [
+                    {"name": "480w.png", "width": 480, "type": "image/png"},
+                    {"name": "full.png", "width": 900, "type": "image/png"},
+                    {"name": "full.webp", "width": 900, "type": "image/webp"},
+                ],
+            }
+        }
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_variant_output(self):
+        self.assertEqual(variant_output(self.src, "full.png"), "tom.png")
+        self.assertEqual(variant_output(self.src, "480w.webp"), "tom-480w.webp")
+
+    def test_srcsets(self):
+        self.assertDictEqual(
+            image_srcsets(self.prepared, self.static),
+            {
+                "/images/tom.png": [
+                    ("/images/tom-480w.png", 480, "image/png"),
+                    ("/images/tom.png", 900, "image/png"),
+                    ("/images/tom.webp", 900, "image/webp"),
+                ]
+            },
+        )
+
+    def test_publish(self):
+        public = self.root.joinpath("public")
+        outputs = publish_images(self.prepared, self.static, public)
+        self.assertDictEqual(
+            outputs,
+            {
+                self.src.as_posix(): f"{public}/images/tom.png",
+                f"{self.src}#480w.png": f"{public}/images/tom-480w.png",
+                f"{self.src}#full.webp": f"{public}/images/tom.webp",
+            },
+        )
+        self.assertEqual(public.joinpath("images", "tom.png").read_bytes(), b"full.png")
+
+        # published again unchanged, the links stay as they are
+        before = os.stat(public.joinpath("images", "tom.png")).st_ino
+        _ = publish_images(self.prepared, self.static, public)
+        self.assertEqual(os.stat(public.joinpath("images", "tom.png")).st_ino, before)
+
+
+@unittest.skipIf(not images.available(), "Pillow is not installed")
+class TestPrepareImages(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.src = self.root.joinpath("photo.png")
+        images.Image.new("RGB", (1000, 500), (200, 100, 50)).save(self.src)
+        self.cache = self.root.joinpath("cache")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_resizes_and_caches(self):
+        prepared = prepare_images([self.src], self.cache, widths=(480, 2000))
+        entry = prepared[self.src]
+        widths = sorted({v["width"] for v in entry["variants"]})
+        self.assertListEqual(widths, [480, 1000])
+        with images.Image.open(Path(entry["dir"], "480w.png")) as img:
+            self.assertEqual(img.size, (480, 240))
+
+        with self.assertLogs("images", level="INFO") as logs:
+            again = prepare_images([self.src], self.cache, widths=(480, 2000))
+        self.assertIn("0 processed, 1 cached", logs.output[-1])
+        self.assertEqual(again[self.src]["dir"], entry["dir"])
+
+    def test_settings_change_reprocesses(self):
+        first = prepare_images([self.src], self.cache, widths=(480,))
+        second = prepare_images([self.src], self.cache, widths=(640,))
+        self.assertNotEqual(first[self.src]["dir"], second[self.src]["dir"])
+        meta = json.loads(Path(second[self.src]["dir"], "meta.json").read_text())
+        self.assertIn(640, {v["width"] for v in meta["variants"]})
+
+
+if __name__ == "__main__":
+    _ = unittest.main()
@@ -0,0 +1,88 @@
+import unittest
+import tempfile
+from pathlib import Path
+
+import config as cfg
+from largefile import extract_title_mmap, iter_mmap_lines
+from main import generate_page
+from template import Template
+
+MARKDOWN = """Intro paragraph with **bold**
+and a second line
+
+# The  Title
+
+```python
+def f():
+    
+    return 1
+```
+
+> quoted
+> text
+
+- one
+- two
+
+1. first
+2. second
+"""
+
+
+class TestIterMmapLines(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name, "page.md")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_matches_splitlines(self):
+        for text in (MARKDOWN, MARKDOWN.replace("\n", "\r\n"), "x" * 100 + "\nend"):
+            _ = self.path.write_bytes(text.encode())
+            for window in (1, 7, 16, 1 << 20):
+                with self.subTest(window=window):
+                    lines = list(iter_mmap_lines(self.path, window=window))
+                    self.assertListEqual(lines, text.splitlines())
+
+    def test_empty_file(self):
+        _ = self.path.write_bytes(b"")
+        self.assertListEqual(list(iter_mmap_lines(self.path)), [])
+
+    def test_extract_title(self):
+        _ = self.path.write_text(MARKDOWN)
+        self.assertEqual(extract_title_mmap(self.path), "The Title")
+
+    def test_extract_title_missing(self):
+        _ = self.path.write_text("## small heading\n\n#hashtag\n")
+        with self.assertRaises(ValueError):
+            _ = extract_title_mmap(self.path)
+
+
+class TestLargePage(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.src = self.root.joinpath("index.md")
+        _ = self.src.write_text(MARKDOWN)
+        self.template = Template("t", "<h1>{{ Title }}</h1>{{ Content }}")
+        self.threshold = cfg.LARGE_FILE_THRESHOLD
+
+    def tearDown(self):
+        cfg.LARGE_FILE_THRESHOLD = self.threshold
+        self.tmp.cleanup()
+
+    def _render(self, name: str) -> str:
+        dst = self.root.joinpath(name)
+        dst.mkdir()
+        generate_page(self.src, self.template, dst)
+        return dst.joinpath("index.html").read_text()
+
+    def test_matches_normal_render(self):
+        normal = self._render("normal")
+        cfg.LARGE_FILE_THRESHOLD = 0
+        self.assertEqual(self._render("large"), normal)
+
+
+if __name__ == "__main__":
+    _ = unittest.main()
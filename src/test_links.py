@@ -0,0 +1,111 @@
+import unittest
+import tempfile
+from pathlib import Path
+
+from blocks import lex_blocks
+from links import check_references, output_urls, page_references, resolve_reference
+from manifest import PageEntry, hash_file
+
+
+class TestPageReferences(unittest.TestCase):
+    def test_collects_links_and_images_with_lines(self):
+        md = (
+            "# Title [home](/)\n\n"
+            "Some text\nwith ![an image](/img.png) and [a link](../other/)\n\n"
+            "> [quoted](/quote)\n\n"
+            "```\n[code](/code)\n```\n\n"
+            "- [`item`](/item)\n- [second](/second)"
+        )
+        self.assertListEqual(
+            page_references(lex_blocks(md)),
+            [
+                (1, "link", "/"),
+                (4, "image", "/img.png"),
+                (4, "link", "../other/"),
+                (12, "link", "/item"),
+                (13, "link", "/second"),
+            ],
+        )
+
+    def test_finds_links_wrapped_over_lines(self):
+        md = "Intro\nsee [a broken\nlink](/missing) and\n![an\nimage](/img.png)"
+        self.assertListEqual(
+            page_references(lex_blocks(md)),
+            [(2, "link", "/missing"), (4, "image", "/img.png")],
+        )
+
+
+class TestResolveReference(unittest.TestCase):
+    def test_resolves_site_paths(self):
+        self.assertEqual(resolve_reference("/blog/", "/"), "/blog")
+        self.assertEqual(resolve_reference("../tom/", "/blog/x/"), "/blog/tom")
+        self.assertEqual(
+            resolve_reference("img%20a.png?v=1#top", "/a/"), "/a/img a.png"
+        )
+        self.assertEqual(resolve_reference("/", "/a/"), "/")
+
+    def test_skips_other_sites_and_fragments(self):
+        for url in ["https://example.com", "mailto:a@b.c", "//cdn.example/x", "#top"]:
+            with self.subTest(url=url):
+                self.assertIsNone(resolve_reference(url, "/"))
+
+
+class TestCheckReferences(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.public = self.root.joinpath("public")
+        self.state = self.root.joinpath(".cache", "links.json")
+        self.content = self.root.joinpath("content")
+        self.content.joinpath("blog").mkdir(parents=True)
+        self.home = self.content.joinpath("index.md")
+        _ = self.home.write_text("# Home\n\n[blog](/blog) and ![logo](/logo.png)")
+        self.post = self.content.joinpath("blog", "index.md")
+        _ = self.post.write_text("# Blog\n\n[home](..)\n[gone](/gone/)")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def check(self):
+        pages: dict[str, PageEntry] = {}
+        for src in (self.home, self.post):
+            rel = src.parent.relative_to(self.content)
+            pages[src.as_posix()] = {
+                "hash": hash_file(src),
+                "output": self.public.joinpath(rel, "index.html").as_posix(),
+                "size": 0,
+                "mtime_ns": 0,
+            }
+        outputs = [entry["output"] for entry in pages.values()]
+        outputs.append(self.public.joinpath("logo.png").as_posix())
+        targets = output_urls(outputs, self.public)
+        return check_references(pages, targets, self.public, self.state, 1 << 20)
+
+    def test_reports_broken_references(self):
+        with self.assertLogs("links", "WARNING") as logs:
+            broken = self.check()
+        self.assertListEqual(
+            broken,
+            [
+                {
+                    "source": self.post.as_posix(),
+                    "line": 4,
+                    "kind": "link",
+                    "url": "/gone/",
+                }
+            ],
+        )
+        self.assertIn(
+            f"{self.post.as_posix()}:4: broken link to /gone/", logs.output[0]
+        )
+
+    def test_reuses_references_of_unchanged_pages(self):
+        _ = self.check()
+        _ = self.post.write_text("# Blog\n\n[home](/)")
+        self.assertListEqual(self.check(), [])
+        _ = self.home.write_text("# Home\n\n![logo](/missing.png)")
+        self.assertEqual(self.check()[0]["url"], "/missing.png")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,12 @@
+import os
+import sys
+import json
 import unittest
+import tempfile
+from pathlib import Path
 
-from main import extract_title
+from main import SiteBuilder, _walk_content, extract_title, get_web_content, parse_args
+from render_cache import RenderCache
 
 
 class TestExtractTitle(unittest.TestCase):
@@ -43,3 +49,161 @@ class TestExtractTitle(unittest.TestCase):
         actual = extract_title(md)
         expected = "title"
         self.assertEqual(actual, expected)
+
+
+class TestGetWebContent(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.template = self.root.joinpath("template.html")
+        _ = self.template.write_text(
+            '<title>{{ Title }}</title><link href="/index.css"><a>{{ Content }}</a>'
+        )
+        self.content = self.root.joinpath("content")
+        for i in range(12):
+            page = self.content.joinpath(f"post{i}", "index.md")
+            page.parent.mkdir(parents=True)
+            _ = page.write_text(f"# post {i}\n\nsome **bold** text [link](/post{i})")
+        _ = self.content.joinpath("index.md").write_text("# home")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _build(
+        self, name: str, jobs: int, cache: RenderCache | None = None
+    ) -> dict[str, bytes]:
+        public = self.root.joinpath(name)
+        public.mkdir()
+        _ = get_web_content(
+            public, self.content, self.template, "/base/", jobs=jobs, cache=cache
+        )
+        return {
+            path.relative_to(public).as_posix(): path.read_bytes()
+            for path in public.rglob("*")
+            if path.is_file()
+        }
+
+    def test_parallel_matches_serial(self):
+        serial = self._build("serial", 1)
+        parallel = self._build("parallel", 4)
+        self.assertEqual(len(serial), 13)
+        self.assertDictEqual(serial, parallel)
+
+    def test_cached_matches_uncached(self):
+        cache = RenderCache(self.root.joinpath("render.sqlite"), 1 << 20, 1)
+        uncached = self._build("uncached", 1)
+        self.assertDictEqual(self._build("cold", 4, cache), uncached)
+        self.assertGreater(cache.misses, 0)
+        cache.hits = cache.misses = 0
+        self.assertDictEqual(self._build("warm", 1, cache), uncached)
+        self.assertEqual(cache.misses, 0)
+        self.assertGreater(cache.hits, 0)
+        cache.close()
+
+    def test_parallel_reports_first_error(self):
+        _ = self.content.joinpath("post3", "index.md").write_text("no title")
+        _ = self.content.joinpath("post7", "index.md").write_text("no title")
+        public = self.root.joinpath("public")
+        public.mkdir()
+        with self.assertLogs("main", level="ERROR") as logs:
+            with self.assertRaises(ValueError):
+                _ = get_web_content(public, self.content, self.template, "/", jobs=4)
+
+        self.assertEqual(len(logs.records), 2)
+        self.assertIn("post3", logs.output[0])
+        self.assertIn("post7", logs.output[1])
+
+    def test_rebuild_into_existing_output(self):
+        first = self._build("public", 2)
+        public = self.root.joinpath("public")
+        _ = get_web_content(public, self.content, self.template, "/base/", jobs=2)
+        rebuilt = {
+            path.relative_to(public).as_posix(): path.read_bytes()
+            for path in public.rglob("*")
+            if path.is_file()
+        }
+        self.assertDictEqual(first, rebuilt)
+
+
+class TestApplyChanges(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cwd = os.getcwd()
+        os.chdir(self.tmp.name)  # the configured paths are relative to the site
+        _ = Path("template.html").write_text("<title>{{ Title }}</title>{{ Content }}")
+        Path("static").mkdir()
+        for name in ("a", "b"):
+            Path("content", name).mkdir(parents=True)
+            _ = Path("content", name, "index.md").write_text(f"# {name}")
+        self.builder = SiteBuilder(parse_args(["--no-cache"]))
+        self.builder.build()
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def test_failed_page_stays_changed(self):
+        broken = Path("content", "a", "index.md")
+        built = json.loads(self.builder.manifest_path().read_text())["pages"]
+        rendered = built[broken.as_posix()]["hash"]
+        other = built["content/b/index.md"]["hash"]
+        _ = broken.write_text("no title")
+        with self.assertRaises(ValueError):
+            self.builder.apply_changes({broken})
+        _ = Path("content", "b", "index.md").write_text("# b changed")
+        self.builder.apply_changes({Path("content", "b", "index.md")})
+
+        saved = json.loads(self.builder.manifest_path().read_text())
+        self.assertEqual(saved["pages"][broken.as_posix()]["hash"], rendered)
+        self.assertNotEqual(saved["pages"]["content/b/index.md"]["hash"], other)
+
+
+class TestWalkContent(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.content = self.root.joinpath("content")
+        self.public = self.root.joinpath("public")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_sorted_depth_first(self):
+        for rel in ("b.md", "a/z.md", "a/b/c.md", "c/d.md", "a.md"):
+            self.content.joinpath(rel).parent.mkdir(parents=True, exist_ok=True)
+            _ = self.content.joinpath(rel).write_text("# page")
+
+        walked = [
+            (src.relative_to(self.content).as_posix(), dst.relative_to(self.public))
+            for src, dst in _walk_content(self.public, self.content)
+        ]
+        self.assertListEqual(
+            walked,
+            [
+                ("a/b/c.md", Path("a/b")),
+                ("a/z.md", Path("a")),
+                ("a.md", Path(".")),
+                ("b.md", Path(".")),
+                ("c/d.md", Path("c")),
+            ],
+        )
+        self.assertTrue(self.public.joinpath("a", "b").is_dir())
+        # walking again over the outputs it created is fine
+        self.assertEqual(len(list(_walk_content(self.public, self.content))), 5)
+
+    def test_deeper_than_the_recursion_limit(self):
+        deep = self.content
+        for _ in range(150):
+            deep = deep.joinpath("d")
+            deep.mkdir(parents=True)
+        _ = deep.joinpath("index.md").write_text("# deep")
+
+        limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(100)
+        try:
+            walked = list(_walk_content(self.public, self.content))
+        finally:
+            sys.setrecursionlimit(limit)
+        output = self.public.joinpath(deep.relative_to(self.content))
+        self.assertListEqual(walked, [(deep.joinpath("index.md"), output)])
+        self.assertTrue(output.is_dir())
@@ -0,0 +1,138 @@
+import unittest
+import tempfile
+from pathlib import Path
+
+from manifest import (
+    BuildManifest,
+    hash_file,
+    hash_if_changed,
+    load_json_state,
+    save_json_state,
+)
+
+
+class TestBuildManifest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.manifest_path = self.root.joinpath("manifest.json")
+        self.src = self.root.joinpath("index.md")
+        _ = self.src.write_text("# title")
+        self.output = self.root.joinpath("public", "index.html")
+        self.output.parent.mkdir()
+        _ = self.output.write_text("<html></html>")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _saved(self, settings: str = "settings") -> BuildManifest:
+        manifest = BuildManifest.load(self.manifest_path, settings)
+        _ = manifest.needs_render(self.src, self.output)
+        manifest.save()
+        return BuildManifest.load(self.manifest_path, settings)
+
+    def test_missing_manifest_rebuilds(self):
+        manifest = BuildManifest.load(self.manifest_path, "settings")
+        self.assertTrue(manifest.needs_render(self.src, self.output))
+
+    def test_unchanged_source_skipped(self):
+        manifest = self._saved()
+        self.assertFalse(manifest.needs_render(self.src, self.output))
+
+    def test_changed_source_rendered(self):
+        manifest = self._saved()
+        _ = self.src.write_text("# new title")
+        self.assertTrue(manifest.needs_render(self.src, self.output))
+
+    def test_missing_output_rendered(self):
+        manifest = self._saved()
+        self.output.unlink()
+        self.assertTrue(manifest.needs_render(self.src, self.output))
+
+    def test_changed_settings_rebuilds(self):
+        _ = self._saved()
+        manifest = BuildManifest.load(self.manifest_path, "other settings")
+        self.assertTrue(manifest.needs_render(self.src, self.output))
+
+    def test_full_rebuilds(self):
+        _ = self._saved()
+        manifest = BuildManifest.load(self.manifest_path, "settings", full=True)
+        self.assertTrue(manifest.needs_render(self.src, self.output))
+
+    def test_remove_orphans(self):
+        public = self.root.joinpath("public")
+        nested = public.joinpath("blog", "post", "index.html")
+        nested.parent.mkdir(parents=True)
+        _ = nested.write_text("<html></html>")
+        old_src = self.root.joinpath("post.md")
+        _ = old_src.write_text("# post")
+
+        manifest = BuildManifest.load(self.manifest_path, "settings")
+        _ = manifest.needs_render(self.src, self.output)
+        _ = manifest.needs_render(old_src, nested)
+        manifest.save()
+
+        old_src.unlink()
+        manifest = BuildManifest.load(self.manifest_path, "settings")
+        _ = manifest.needs_render(self.src, self.output)
+        removed = manifest.remove_orphans(public)
+
+        self.assertListEqual(removed, [nested])
+        self.assertFalse(public.joinpath("blog").exists())
+        self.assertTrue(self.output.exists())
+
+    def test_remove_orphaned_compressed_copies(self):
+        gz = self.output.with_name("index.html.gz")
+        _ = gz.write_bytes(b"gz")
+        manifest = BuildManifest.load(self.manifest_path, "settings")
+        _ = manifest.needs_render(self.src, self.output)
+        manifest.compressed = {
+            self.output.as_posix(): {
+                "hash": "",
+                "size": 0,
+                "mtime_ns": 0,
+                "variants": [".gz"],
+            }
+        }
+        manifest.save()
+
+        # built again without --compress
+        manifest = BuildManifest.load(self.manifest_path, "settings")
+        _ = manifest.needs_render(self.src, self.output)
+        self.assertListEqual(manifest.remove_orphans(self.output.parent), [gz])
+        self.assertTrue(self.output.exists())
+
+
+
+class TestStateHelpers(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_hash_if_changed(self):
+        src = self.root.joinpath("a.txt")
+        _ = src.write_text("a")
+        digest, stat = hash_if_changed(src, None)
+        self.assertEqual(digest, hash_file(src))
+
+        known = {"hash": "recorded", "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        self.assertEqual(hash_if_changed(src, known)[0], "recorded")
+        _ = src.write_text("changed")
+        self.assertEqual(hash_if_changed(src, known)[0], hash_file(src))
+        self.assertEqual(hash_if_changed(src, None, lambda _: "custom")[0], "custom")
+
+    def test_json_state_round_trip(self):
+        path = self.root.joinpath(".cache", "state.json")
+        self.assertEqual(load_json_state(path), {})
+        save_json_state(path, {"version": 1, "pages": {}})
+        self.assertEqual(load_json_state(path), {"version": 1, "pages": {}})
+        self.assertListEqual([p.name for p in path.parent.iterdir()], ["state.json"])
+        _ = path.write_text("{torn")
+        self.assertEqual(load_json_state(path), {})
+
+
+if __name__ == "__main__":
+    _ = unittest.main()
@@ -122,6 +122,21 @@ Some text with gaps
         expected = "<div><h1>Title</h1><p>Some text with gaps</p><ul><li>list item</li></ul></div>"
         self.assertEqual(actual, expected)
 
+    def test_empty_code_block(self):
+        self.assertEqual(
+            md_to_html_node("```\n```").to_html(), "<div><pre><code></code></pre></div>"
+        )
+        self.assertEqual(
+            md_to_html_node("```python\n```", highlighted=True).to_html(),
+            '<div><pre><code class="language-python"></code></pre></div>',
+        )
+
+    def test_empty_list_item_and_heading(self):
+        # nothing to render, so they fail as before rather than emit empty leaves
+        for md in ("- a\n-  ", "1. a\n2.  ", "# t\n\n## "):
+            with self.assertRaises(ValueError, msg=md):
+                _ = md_to_html_node(md).to_html()
+
     def test_images_in_paragraph(self):
         md = "Here is an ![image](images/test.png)"
         actual = md_to_html_node(md).to_html()
@@ -175,3 +190,18 @@ Some text with gaps
         actual = md_to_html_node(md).to_html()
         expected = "<div><h2><b>Themes</b> of <i>Timeless</i> Relevance</h2></div>"
         self.assertEqual(actual, expected)
+
+    def test_highlighted_code_block(self):
+        md = '```python\nif x < 1:\n    print("a")  # done\n```'
+        actual = md_to_html_node(md, highlighted=True).to_html()
+        expected = (
+            '<div><pre><code class="language-python"><span class="k">if</span> x &lt; '
+            '<span class="m">1</span>:\n    print(<span class="s">"a"</span>)  '
+            '<span class="c"># done</span></code></pre></div>'
+        )
+        self.assertEqual(actual, expected)
+
+    def test_highlight_leaves_plain_code_blocks(self):
+        md = "```\nif x < 1: pass\n```"
+        actual = md_to_html_node(md, highlighted=True).to_html()
+        self.assertEqual(actual, "<div><pre><code>if x < 1: pass</code></pre></div>")
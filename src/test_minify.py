@@ -0,0 +1,92 @@
+import unittest
+
+from minify import HTMLMinifier, minify_css, minify_html_chunks
+
+
+def _minify(html: str, size: int | None = None) -> str:
+    size = size or len(html) or 1
+    chunks = [html[i : i + size] for i in range(0, len(html), size)]
+    return "".join(minify_html_chunks(chunks, HTMLMinifier()))
+
+
+class TestMinifyHTML(unittest.TestCase):
+    def test_drops_whitespace_around_blocks(self):
+        html = (
+            "<html>\n  <body>\n    <div>\n      <p>some   text</p>\n"
+            "    </div>\n  </body>\n</html>\n"
+        )
+        self.assertEqual(
+            _minify(html), "<html><body><div><p>some text</p></div></body></html>"
+        )
+
+    def test_keeps_space_between_inline_elements(self):
+        html = "<p><b>bold</b>\n  <i>italic</i> and <a href='/'>link</a> </p>"
+        self.assertEqual(
+            _minify(html), "<p><b>bold</b> <i>italic</i> and <a href='/'>link</a></p>"
+        )
+
+    def test_leaves_code_untouched(self):
+        html = (
+            "<div>\n<pre><code>def f():\n    return  1\n\n</code></pre>\n"
+            "<p>inline <code>a  =  b</code>  text</p>\n</div>"
+        )
+        self.assertEqual(
+            _minify(html),
+            "<div><pre><code>def f():\n    return  1\n\n</code></pre>"
+            "<p>inline <code>a  =  b</code> text</p></div>",
+        )
+
+    def test_same_result_for_any_chunking(self):
+        html = (
+            "<!doctype html>\n<head> <title> A  title </title> </head>\n"
+            "<body><!-- a > b --><pre>  x  </pre> <p>a < b  and <b> c </b></p></body>"
+        )
+        whole = _minify(html)
+        for size in range(1, 12):
+            with self.subTest(size=size):
+                self.assertEqual(_minify(html, size), whole)
+
+    def test_keeps_non_breaking_spaces(self):
+        self.assertEqual(_minify("<p>a  b</p>"), "<p>a  b</p>")
+
+    def test_counts_bytes(self):
+        minifier = HTMLMinifier()
+        _ = "".join(minify_html_chunks(["<p>\n  a  </p>\n"], minifier))
+        self.assertEqual((minifier.bytes_in, minifier.bytes_out), (14, 8))
+
+
+class TestMinifyCSS(unittest.TestCase):
+    def test_minifies(self):
+        css = "body {\n  color: red;\n  margin: 0 auto;\n}\n\nh1, h2 {\n  font-size: 2em;\n}"
+        self.assertEqual(
+            minify_css(css), "body{color:red;margin:0 auto}h1,h2{font-size:2em}"
+        )
+
+    def test_keeps_strings_selectors_and_notices(self):
+        css = '/*! licence */ /* note */ a :hover { content: " ; { } " }'
+        expected = '/*! licence */ a :hover{content:" ; { } "}'
+        self.assertEqual(minify_css(css), expected)
+
+    def test_keeps_operators_in_values(self):
+        css = "p { width: calc(100% - 2px); }"
+        self.assertEqual(minify_css(css), "p{width:calc(100% - 2px)}")
+
+    def test_keeps_semicolon_brace_in_strings(self):
+        css = "a::after { content: \";}\"; }"
+        self.assertEqual(minify_css(css), 'a::after{content:";}"}')
+
+    def test_apostrophe_in_comment(self):
+        css = (
+            "/* it's */ a::after { content: 'x' }  "
+            "b::after { content: 'a   b ; }' } /* don't */"
+        )
+        expected = "a::after{content:'x'}b::after{content:'a   b ; }'}"
+        self.assertEqual(minify_css(css), expected)
+
+    def test_comment_marker_in_string(self):
+        css = 'a::after { content: "/*" } /* note */ b { color: red }'
+        self.assertEqual(minify_css(css), 'a::after{content:"/*"}b{color:red}')
+
+
+if __name__ == "__main__":
+    _ = unittest.main()
@@ -0,0 +1,90 @@
+import time
+import unittest
+
+from pipeline import run_pipeline
+
+
+class TestRunPipeline(unittest.TestCase):
+    def test_runs_stages_in_order(self):
+        written: list[tuple[int, str]] = []
+        results = run_pipeline(
+            range(20),
+            lambda item: item * 2,
+            lambda item, data: f"{item}:{data}",
+            lambda item, data: written.append((item, data)),
+            depth=2,
+        )
+        self.assertListEqual(results, [(i, None) for i in range(20)])
+        self.assertListEqual(written, [(i, f"{i}:{i * 2}") for i in range(20)])
+
+    def test_collects_errors_per_item(self):
+        def read(item: int) -> int:
+            if item == 1:
+                raise OSError("unreadable")
+            return item
+
+        def process(item: int, data: int) -> int:
+            if item == 2:
+                raise ValueError("bad markdown")
+            return data
+
+        def write(item: int, data: int):
+            if item == 3:
+                raise OSError("disk full")
+
+        results = run_pipeline(range(5), read, process, write)
+        errors = [type(err) if err else None for _, err in results]
+        self.assertListEqual(errors, [None, OSError, ValueError, OSError, None])
+
+        failed = run_pipeline(range(5), read, process, write, failures_only=True)
+        self.assertListEqual([item for item, _ in failed], [1, 2, 3])
+
+    def test_processes_lazy_items_as_they_arrive(self):
+        produced: list[int] = []
+
+        def items():
+            for item in range(100):
+                produced.append(item)
+                yield item
+
+        first_seen: list[int] = []
+        _ = run_pipeline(
+            items(),
+            lambda item: item,
+            lambda item, data: first_seen.append(len(produced)) if not item else None,
+            lambda item, data: None,
+            depth=2,
+        )
+        # the first item was processed long before the generator ran out
+        self.assertLess(first_seen[0], 10)
+
+    def test_raises_when_items_fail(self):
+        def items():
+            yield 1
+            raise OSError("directory vanished")
+
+        written: list[int] = []
+        with self.assertRaises(OSError):
+            _ = run_pipeline(
+                items(),
+                lambda item: item,
+                lambda item, data: data,
+                lambda item, data: written.append(data),
+            )
+        self.assertEqual(written, [1])
+
+    def test_overlaps_io_with_processing(self):
+        delay = 0.02
+        started = time.perf_counter()
+        _ = run_pipeline(
+            range(10),
+            lambda item: time.sleep(delay),
+            lambda item, data: time.sleep(delay),
+            lambda item, data: time.sleep(delay),
+        )
+        # 30 sleeps run back to back would take 0.6s
+        self.assertLess(time.perf_counter() - started, 20 * delay)
+
+
+if __name__ == "__main__":
+    _ = unittest.main()
@@ -0,0 +1,101 @@
+import time
+import pickle
+import unittest
+import tempfile
+from pathlib import Path
+
+from blocks import lex_blocks
+from md_converter import block_to_html, md_to_html_cached, md_to_html_node
+from render_cache import RenderCache
+
+MARKDOWN = """# Heading
+
+A paragraph with **bold** text
+
+```python
+print("hi")
+```
+
+- one
+- two
+
+A paragraph with **bold** text
+"""
+
+
+class TestRenderCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name, "render.sqlite")
+        self.cache = RenderCache(self.path, max_bytes=1 << 20, version=1)
+
+    def tearDown(self):
+        self.cache.close()
+        self.tmp.cleanup()
+
+    def test_matches_uncached(self):
+        expected = md_to_html_node(MARKDOWN).to_html()
+        self.assertEqual(md_to_html_cached(MARKDOWN, self.cache), expected)
+        self.assertEqual(md_to_html_cached(MARKDOWN, self.cache), expected)
+
+    def test_reuses_blocks(self):
+        _ = md_to_html_cached(MARKDOWN, self.cache)
+        # the repeated paragraph is rendered once
+        self.assertEqual((self.cache.hits, self.cache.misses), (0, 4))
+
+        edited = MARKDOWN.replace("- two", "- three")
+        _ = md_to_html_cached(edited, self.cache)
+        self.assertEqual((self.cache.hits, self.cache.misses), (3, 5))
+
+    def test_persists(self):
+        _ = md_to_html_cached(MARKDOWN, self.cache)
+        other = RenderCache(self.path, max_bytes=1 << 20, version=1)
+        _ = md_to_html_cached(MARKDOWN, other)
+        self.assertEqual(other.misses, 0)
+        other.close()
+
+    def test_version_invalidates(self):
+        _ = md_to_html_cached(MARKDOWN, self.cache)
+        newer = RenderCache(self.path, max_bytes=1 << 20, version=2)
+        _ = md_to_html_cached(MARKDOWN, newer)
+        self.assertEqual(newer.hits, 0)
+        newer.close()
+
+    def test_variant_kept_apart(self):
+        _ = md_to_html_cached(MARKDOWN, self.cache)
+        highlighted = RenderCache(self.path, 1 << 20, version=1, variant="highlight")
+        html = md_to_html_cached(MARKDOWN, highlighted, highlighted=True)
+        self.assertEqual(highlighted.hits, 0)
+        self.assertEqual(html, md_to_html_node(MARKDOWN, highlighted=True).to_html())
+        self.assertIn('<code class="language-python">', html)
+        highlighted.close()
+
+    def test_prune_evicts_least_recently_used(self):
+        blocks = list(lex_blocks(MARKDOWN))
+        old, new = blocks[1], blocks[2]
+        _ = self.cache.render([old], block_to_html)
+        time.sleep(0.01)
+        _ = self.cache.render([new], block_to_html)
+
+        self.cache.max_bytes = len(block_to_html(new))
+        self.assertEqual(self.cache.prune(), 1)
+        _ = self.cache.render([old, new], block_to_html)
+        self.assertEqual(self.cache.misses, 3)
+
+    def test_stats_and_clear(self):
+        _ = md_to_html_cached(MARKDOWN, self.cache)
+        stats = self.cache.stats()
+        self.assertEqual(stats["entries"], 4)
+        self.assertGreater(stats["bytes"], 0)
+        self.assertEqual(self.cache.clear(), 4)
+        self.assertEqual(self.cache.stats()["entries"], 0)
+
+    def test_pickles_without_connection(self):
+        _ = self.cache.stats()
+        copy = pickle.loads(pickle.dumps(self.cache))
+        self.assertEqual(copy.stats()["entries"], 0)
+        copy.close()
+
+
+if __name__ == "__main__":
+    _ = unittest.main()
@@ -0,0 +1,122 @@
+import json
+import unittest
+import tempfile
+from pathlib import Path
+
+from blocks import lex_blocks
+from manifest import PageEntry, hash_file
+from search import page_terms, shard_name, update_search_index
+
+
+class TestPageTerms(unittest.TestCase):
+    def test_weights_headings_and_skips_code(self):
+        md = (
+            "# The **Tolkien** Club\n\n"
+            "Welcome to the club, read [the books](/books) and ![a map](/map.png)\n\n"
+            "- elves\n- dwarves\n\n"
+            "```\nskipped_code()\n```"
+        )
+        title, terms = page_terms(lex_blocks(md), heading_weight=3)
+        self.assertEqual(title, "The Tolkien Club")
+        self.assertEqual(terms["club"], 4)
+        self.assertEqual(terms["tolkien"], 3)
+        self.assertEqual(terms["books"], 1)
+        self.assertEqual(terms["map"], 1)
+        self.assertEqual(terms["dwarves"], 1)
+        self.assertNotIn("skipped", terms)
+        self.assertNotIn("png", terms)
+        self.assertNotIn("a", terms)
+
+    def test_shard_name(self):
+        self.assertEqual(shard_name("tolkien", 2), "to")
+        self.assertEqual(shard_name("élan", 2), "_c3a96c")
+
+
+class TestUpdateSearchIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.content = self.root.joinpath("content")
+        self.public = self.root.joinpath("public")
+        self.output = self.public.joinpath("search")
+        self.state = self.root.joinpath(".cache", "search.json")
+        self.content.joinpath("blog").mkdir(parents=True)
+        self.home = self.content.joinpath("index.md")
+        _ = self.home.write_text("# Home\n\nHobbits and elves")
+        self.post = self.content.joinpath("blog", "index.md")
+        _ = self.post.write_text("# Blog\n\nDwarves and elves")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def pages(self, *sources: Path) -> dict[str, PageEntry]:
+        entries: dict[str, PageEntry] = {}
+        for src in sources:
+            rel = src.parent.relative_to(self.content)
+            entries[src.as_posix()] = {
+                "hash": hash_file(src),
+                "output": self.public.joinpath(rel, "index.html").as_posix(),
+                "size": 0,
+                "mtime_ns": 0,
+            }
+        return entries
+
+    def update(self, *sources: Path) -> dict[str, str]:
+        return update_search_index(
+            self.pages(*sources),
+            self.public,
+            "/site/",
+            self.output,
+            self.state,
+            large_file_threshold=1 << 20,
+        )
+
+    def load(self, name: str):
+        return json.loads(self.output.joinpath(name).read_text())
+
+    def test_writes_pages_and_shards(self):
+        outputs = self.update(self.home, self.post)
+        pages = self.load("pages.json")
+        self.assertEqual(pages["prefix"], 2)
+        self.assertListEqual(
+            pages["pages"], [["/site/blog/", "Blog"], ["/site/", "Home"]]
+        )
+        self.assertDictEqual(self.load("el.json"), {"elves": [0, 1, 1, 1]})
+        self.assertDictEqual(self.load("ho.json"), {"home": [1, 3], "hobbits": [1, 1]})
+        self.assertEqual(
+            outputs["search#el.json"], self.output.joinpath("el.json").as_posix()
+        )
+
+    def test_incremental_update_keeps_ids_and_unchanged_shards(self):
+        _ = self.update(self.home, self.post)
+        dwarves = self.output.joinpath("dw.json")
+        mtime = dwarves.stat().st_mtime_ns
+
+        _ = self.home.write_text("# Home\n\nHobbits and wizards")
+        outputs = self.update(self.home, self.post)
+        self.assertDictEqual(self.load("wi.json"), {"wizards": [1, 1]})
+        self.assertDictEqual(self.load("el.json"), {"elves": [0, 1]})
+        self.assertEqual(dwarves.stat().st_mtime_ns, mtime)
+        self.assertIn("search#wi.json", outputs)
+
+        # removing a page leaves a hole rather than renumbering the others
+        _ = self.update(self.home)
+        self.assertListEqual(
+            self.load("pages.json")["pages"], [None, ["/site/", "Home"]]
+        )
+        self.assertFalse(dwarves.exists())
+
+        new = self.content.joinpath("blog", "index.md")
+        _ = new.write_text("# New\n\nElves")
+        _ = self.update(self.home, new)
+        self.assertEqual(self.load("pages.json")["pages"][0], ["/site/blog/", "New"])
+
+    def test_rewrites_missing_files(self):
+        _ = self.update(self.home, self.post)
+        self.output.joinpath("el.json").unlink()
+        _ = self.update(self.home, self.post)
+        self.assertTrue(self.output.joinpath("el.json").exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
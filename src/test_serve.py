@@ -0,0 +1,212 @@
+import os
+import asyncio
+import unittest
+import tempfile
+from pathlib import Path
+
+from server import HotCache, StaticServer
+
+
+class TestHotCache(unittest.TestCase):
+    def test_evicts_least_recently_used(self):
+        cache = HotCache(max_bytes=10, max_file_bytes=10)
+        cache.put(Path("a"), (4, 1), b"aaaa")
+        cache.put(Path("b"), (4, 1), b"bbbb")
+        self.assertEqual(cache.get(Path("a"), (4, 1)), b"aaaa")
+        cache.put(Path("c"), (4, 1), b"cccc")
+        self.assertIsNone(cache.get(Path("b"), (4, 1)))
+        self.assertEqual(cache.get(Path("a"), (4, 1)), b"aaaa")
+        self.assertEqual(cache.size, 8)
+
+    def test_skips_large_files_and_stale_entries(self):
+        cache = HotCache(max_bytes=100, max_file_bytes=4)
+        cache.put(Path("big"), (5, 1), b"12345")
+        self.assertIsNone(cache.get(Path("big"), (5, 1)))
+        cache.put(Path("a"), (4, 1), b"aaaa")
+        self.assertIsNone(cache.get(Path("a"), (4, 2)))
+        self.assertEqual(cache.size, 0)
+
+
+class TestStaticServer(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        _ = self.root.joinpath("index.html").write_text("<p>home</p>")
+        self.root.joinpath("blog").mkdir()
+        _ = self.root.joinpath("blog", "index.html").write_text("<p>blog</p>")
+        _ = self.root.joinpath("index.css").write_text("body {}")
+        _ = self.root.joinpath("index.css.gz").write_bytes(b"gzipped")
+        _ = self.root.joinpath("index.0123456789ab.css").write_text("body {}")
+        self.large = os.urandom(64 * 1024)
+        _ = self.root.joinpath("large.bin").write_bytes(self.large)
+
+        self.cache = HotCache(max_bytes=1024 * 1024, max_file_bytes=1024)
+        handler = StaticServer(self.root, self.cache).handle
+        self.server = await asyncio.start_server(handler, "127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def asyncTearDown(self):
+        self.server.close()
+        await self.server.wait_closed()
+        self.tmp.cleanup()
+
+    async def request(
+        self, path: str, headers: dict[str, str] | None = None, method: str = "GET"
+    ) -> tuple[int, dict[str, str], bytes]:
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+        try:
+            return await self.exchange(reader, writer, path, headers, method)
+        finally:
+            writer.close()
+
+    async def exchange(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+        path: str,
+        headers: dict[str, str] | None = None,
+        method: str = "GET",
+    ) -> tuple[int, dict[str, str], bytes]:
+        lines = [f"{method} {path} HTTP/1.1", "Host: localhost"]
+        lines.extend(f"{name}: {value}" for name, value in (headers or {}).items())
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode())
+        await writer.drain()
+
+        head = (await reader.readuntil(b"\r\n\r\n")).decode()
+        status_line, *header_lines = head.strip().split("\r\n")
+        response = {}
+        for line in header_lines:
+            name, _, value = line.partition(":")
+            response[name.lower()] = value.strip()
+        length = int(response.get("content-length", 0))
+        body = b"" if method == "HEAD" else await reader.readexactly(length)
+        return int(status_line.split()[1]), response, body
+
+    async def test_serves_files_and_directory_index(self):
+        status, headers, body = await self.request("/")
+        self.assertEqual(status, 200)
+        self.assertEqual(body, b"<p>home</p>")
+        self.assertEqual(headers["content-type"], "text/html; charset=utf-8")
+        self.assertEqual(headers["cache-control"], "no-cache")
+
+        status, headers, _ = await self.request("/blog")
+        self.assertEqual(status, 301)
+        self.assertEqual(headers["location"], "/blog/")
+        status, _, body = await self.request("/blog/?page=2")
+        self.assertEqual((status, body), (200, b"<p>blog</p>"))
+
+    async def test_not_found_and_traversal(self):
+        status, _, _ = await self.request("/missing.html")
+        self.assertEqual(status, 404)
+        status, _, _ = await self.request("/../" + self.root.name + "/index.html")
+        self.assertEqual(status, 200)
+        status, _, _ = await self.request("/%2e%2e/%2e%2e/etc/passwd")
+        self.assertEqual(status, 404)
+        status, _, _ = await self.request("/%00")
+        self.assertEqual(status, 404)
+
+    async def test_conditional_requests(self):
+        _, headers, _ = await self.request("/index.html")
+        etag = headers["etag"]
+        status, _, body = await self.request("/index.html", {"If-None-Match": etag})
+        self.assertEqual((status, body), (304, b""))
+        status, _, _ = await self.request(
+            "/index.html", {"If-Modified-Since": headers["last-modified"]}
+        )
+        self.assertEqual(status, 304)
+
+        _ = self.root.joinpath("index.html").write_text("<p>changed home</p>")
+        status, _, body = await self.request("/index.html", {"If-None-Match": etag})
+        self.assertEqual((status, body), (200, b"<p>changed home</p>"))
+
+    async def test_precompressed_variant(self):
+        status, headers, body = await self.request(
+            "/index.css", {"Accept-Encoding": "br;q=1.0, gzip"}
+        )
+        self.assertEqual((status, body), (200, b"gzipped"))
+        self.assertEqual(headers["content-encoding"], "gzip")
+        self.assertEqual(headers["content-type"], "text/css; charset=utf-8")
+        self.assertEqual(headers["vary"], "Accept-Encoding")
+
+        _, plain, body = await self.request("/index.css")
+        self.assertEqual(body, b"body {}")
+        self.assertNotIn("content-encoding", plain)
+        self.assertNotEqual(plain["etag"], headers["etag"])
+
+        for refused in ("gzip;q=0", "gzip; q=0.0, br;q=0"):
+            _, headers, body = await self.request(
+                "/index.css", {"Accept-Encoding": refused}
+            )
+            self.assertEqual(body, b"body {}", refused)
+            self.assertNotIn("content-encoding", headers)
+
+    async def test_fingerprinted_assets_are_immutable(self):
+        _, headers, _ = await self.request("/index.0123456789ab.css")
+        self.assertIn("immutable", headers["cache-control"])
+
+    async def test_keep_alive_sendfile_and_head(self):
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+        try:
+            status, headers, body = await self.exchange(reader, writer, "/large.bin")
+            self.assertEqual((status, body), (200, self.large))
+            self.assertEqual(headers["connection"], "keep-alive")
+            status, headers, body = await self.exchange(
+                reader, writer, "/large.bin", method="HEAD"
+            )
+            self.assertEqual((status, body), (200, b""))
+            self.assertEqual(headers["content-length"], str(len(self.large)))
+            status, _, body = await self.exchange(reader, writer, "/index.html")
+            self.assertEqual((status, body), (200, b"<p>home</p>"))
+        finally:
+            writer.close()
+
+        # too big for the hot cache, only the small page was kept
+        self.assertListEqual(
+            list(self.cache.entries), [self.root.resolve().joinpath("index.html")]
+        )
+
+    async def test_concurrent_connections(self):
+        results = await asyncio.gather(
+            *(self.request(path) for path in ["/", "/blog/", "/large.bin"] * 10)
+        )
+        self.assertTrue(all(status == 200 for status, _, _ in results))
+        self.assertEqual(results[2][2], self.large)
+
+    async def test_rejects_other_methods(self):
+        status, headers, _ = await self.request("/", method="POST")
+        self.assertEqual(status, 405)
+        self.assertEqual(headers["allow"], "GET, HEAD")
+
+    async def test_unread_body_closes_connection(self):
+        smuggled = b"GET /evil HTTP/1.1\r\nHost: localhost\r\n\r\n"
+        for method in ("POST", "GET"):
+            reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+            try:
+                writer.write(
+                    f"{method} / HTTP/1.1\r\nHost: localhost\r\n".encode()
+                    + f"Content-Length: {len(smuggled)}\r\n\r\n".encode()
+                    + smuggled
+                )
+                head = await reader.readuntil(b"\r\n\r\n")
+                self.assertIn(b"Connection: close", head, method)
+                rest = await reader.read()
+                self.assertNotIn(b"HTTP/1.1 404", rest, method)
+            finally:
+                writer.close()
+
+    async def test_head_errors_have_no_body(self):
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+        try:
+            status, headers, _ = await self.exchange(
+                reader, writer, "/nope", method="HEAD"
+            )
+            self.assertEqual(status, 404)
+            self.assertEqual(headers["connection"], "keep-alive")
+            status, _, body = await self.exchange(reader, writer, "/index.html")
+            self.assertEqual((status, body), (200, b"<p>home</p>"))
+        finally:
+            writer.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
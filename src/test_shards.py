@@ -0,0 +1,243 @@
+import argparse
+import json
+import shutil
+import unittest
+import tempfile
+from pathlib import Path
+
+from manifest import MANIFEST_VERSION
+from shards import (
+    SHARD_MANIFEST,
+    find_shards,
+    in_shard,
+    merge_shards,
+    parse_shard,
+    shard_path,
+)
+
+
+class TestParseShard(unittest.TestCase):
+    def test_parses_index_and_count(self):
+        self.assertEqual(parse_shard("1/4"), (1, 4))
+        self.assertEqual(parse_shard("4/4"), (4, 4))
+
+    def test_rejects_bad_specs(self):
+        for spec in ("0/4", "5/4", "1", "a/b", "1/4/2", "-1/4"):
+            with self.assertRaises(argparse.ArgumentTypeError, msg=spec):
+                _ = parse_shard(spec)
+
+
+class TestInShard(unittest.TestCase):
+    def test_every_page_lands_in_one_shard(self):
+        content = Path("content")
+        pages = [content.joinpath(f"blog/post-{i}/index.md") for i in range(200)]
+        for count in (1, 3, 8):
+            for page in pages:
+                owners = [
+                    index
+                    for index in range(1, count + 1)
+                    if in_shard(page, content, (index, count))
+                ]
+                self.assertEqual(len(owners), 1, f"{page} of {count}")
+
+    def test_shard_names(self):
+        public = Path("site", "public")
+        self.assertEqual(shard_path(public, (2, 3)), Path("site/public.shard-2-of-3"))
+
+
+class TestMergeShards(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.public = self.root.joinpath("public")
+        self.manifest = self.root.joinpath(".cache", "manifest.json")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def build_shard(
+        self,
+        index: int,
+        count: int,
+        files: dict[str, str],
+        pages: dict[str, str],
+        settings: str = "settings",
+    ) -> Path:
+        shard_dir = shard_path(self.public, (index, count))
+        shard_dir.mkdir(parents=True, exist_ok=True)
+        for rel, text in files.items():
+            shard_dir.joinpath(rel).parent.mkdir(parents=True, exist_ok=True)
+            _ = shard_dir.joinpath(rel).write_text(text)
+        data = {
+            "version": MANIFEST_VERSION,
+            "settings": settings,
+            "pages": {
+                src: {
+                    "hash": src,
+                    "output": shard_dir.joinpath(rel).as_posix(),
+                    "size": 0,
+                    "mtime_ns": 0,
+                }
+                for src, rel in pages.items()
+            },
+            "static": {"static/index.css": shard_dir.joinpath("index.css").as_posix()}
+            if "index.css" in files
+            else {},
+            "compressed": {},
+            "shard": f"{index}/{count}",
+        }
+        _ = shard_dir.joinpath(SHARD_MANIFEST).write_text(json.dumps(data))
+        return shard_dir
+
+    def test_merges_outputs_and_manifests(self):
+        _ = self.build_shard(
+            1,
+            2,
+            {"index.css": "body {}", "index.html": "home"},
+            {"content/index.md": "index.html"},
+        )
+        _ = self.build_shard(
+            2,
+            2,
+            {"blog/index.html": "blog"},
+            {"content/blog/index.md": "blog/index.html"},
+        )
+
+        manifest = merge_shards(find_shards(self.public), self.public, self.manifest)
+        self.assertEqual(self.public.joinpath("index.html").read_text(), "home")
+        self.assertEqual(self.public.joinpath("blog", "index.html").read_text(), "blog")
+        self.assertFalse(self.public.joinpath(SHARD_MANIFEST).exists())
+        self.assertEqual(
+            manifest.pages["content/blog/index.md"]["output"],
+            self.public.joinpath("blog", "index.html").as_posix(),
+        )
+        self.assertEqual(
+            manifest.static["static/index.css"],
+            self.public.joinpath("index.css").as_posix(),
+        )
+        saved = json.loads(self.manifest.read_text())
+        self.assertEqual(sorted(saved["pages"]), sorted(manifest.pages))
+        self.assertIsNone(saved["shard"])
+
+    def test_merges_shards_collected_elsewhere(self):
+        built = [
+            self.build_shard(
+                1, 2, {"index.html": "home"}, {"content/index.md": "index.html"}
+            ),
+            self.build_shard(
+                2,
+                2,
+                {"blog/index.html": "blog"},
+                {"content/blog/index.md": "blog/index.html"},
+            ),
+        ]
+        artifacts = self.root.joinpath("artifacts")
+        artifacts.mkdir()
+        moved = [Path(shutil.move(shard_dir, artifacts)) for shard_dir in built]
+
+        manifest = merge_shards(moved, self.public, self.manifest)
+        self.assertEqual(self.public.joinpath("blog", "index.html").read_text(), "blog")
+        self.assertEqual(
+            manifest.pages["content/blog/index.md"]["output"],
+            self.public.joinpath("blog", "index.html").as_posix(),
+        )
+
+    def test_output_outside_shard_dir_writes_nothing(self):
+        shard_dir = self.build_shard(1, 1, {"index.html": "home"}, {})
+        data = json.loads(shard_dir.joinpath(SHARD_MANIFEST).read_text())
+        data["static"] = {"static/index.css": "elsewhere/index.css"}
+        _ = shard_dir.joinpath(SHARD_MANIFEST).write_text(json.dumps(data))
+
+        with self.assertLogs("shards", "ERROR") as logs:
+            with self.assertRaises(ValueError):
+                _ = merge_shards([shard_dir], self.public, self.manifest)
+        self.assertIn("is not in the dir of shard 1/1", logs.output[0])
+        self.assertFalse(self.public.exists())
+        self.assertFalse(self.manifest.exists())
+
+    def test_removes_pages_no_shard_built(self):
+        _ = self.build_shard(
+            1,
+            1,
+            {"index.html": "home", "old/index.html": "old"},
+            {"content/index.md": "index.html", "content/old.md": "old/index.html"},
+        )
+        _ = merge_shards(find_shards(self.public), self.public, self.manifest)
+        self.assertTrue(self.public.joinpath("old", "index.html").exists())
+
+        shard_dir = shard_path(self.public, (1, 1))
+        shard_dir.joinpath("old", "index.html").unlink()
+        data = json.loads(shard_dir.joinpath(SHARD_MANIFEST).read_text())
+        del data["pages"]["content/old.md"]
+        _ = shard_dir.joinpath(SHARD_MANIFEST).write_text(json.dumps(data))
+
+        _ = merge_shards(find_shards(self.public), self.public, self.manifest)
+        self.assertFalse(self.public.joinpath("old").exists())
+
+    def test_conflicts_write_nothing(self):
+        cases = {
+            "missing shard": [(1, 3, {}, "settings")],
+            "other settings": [(1, 2, {}, "settings"), (2, 2, {}, "other")],
+            "other counts": [(1, 2, {}, "settings"), (2, 3, {}, "settings")],
+            "different bytes": [
+                (1, 2, {"index.css": "body {}"}, "settings"),
+                (2, 2, {"index.css": "p {}"}, "settings"),
+            ],
+        }
+        for name, shards in cases.items():
+            with self.subTest(name):
+                shard_dirs = [
+                    self.build_shard(index, count, files, {}, settings)
+                    for index, count, files, settings in shards
+                ]
+                with self.assertLogs("shards", "ERROR"):
+                    with self.assertRaises(ValueError):
+                        _ = merge_shards(shard_dirs, self.public, self.manifest)
+                self.assertFalse(self.public.exists())
+                self.assertFalse(self.manifest.exists())
+                for shard_dir in shard_dirs:
+                    shutil.rmtree(shard_dir)
+
+    def test_same_page_in_two_shards_conflicts(self):
+        page = {"content/index.md": "index.html"}
+        shard_dirs = [
+            self.build_shard(1, 2, {"index.html": "home"}, page),
+            self.build_shard(2, 2, {"index.html": "home"}, page),
+        ]
+        with self.assertLogs("shards", "ERROR") as logs:
+            with self.assertRaises(ValueError):
+                _ = merge_shards(shard_dirs, self.public, self.manifest)
+        self.assertIn("content/index.md was built by", logs.output[0])
+
+    def test_unbuilt_shard_conflicts(self):
+        shard_dir = shard_path(self.public, (1, 1))
+        shard_dir.mkdir(parents=True)
+        with self.assertLogs("shards", "ERROR") as logs:
+            with self.assertRaises(ValueError):
+                _ = merge_shards([shard_dir], self.public, self.manifest)
+        self.assertIn("has no shard manifest", logs.output[0])
+
+    def test_corrupt_shard_manifest_conflicts(self):
+        cases = {
+            "bad spec": ({"shard": "3/2"}, "corrupt shard manifest"),
+            "no settings": ({"settings": None}, "has no build settings"),
+            "not an object": ([], "has no shard manifest"),
+        }
+        for name, (change, message) in cases.items():
+            with self.subTest(name):
+                shard_dir = self.build_shard(1, 1, {"index.html": "home"}, {})
+                manifest = shard_dir.joinpath(SHARD_MANIFEST)
+                data = json.loads(manifest.read_text())
+                data = data | change if isinstance(change, dict) else change
+                _ = manifest.write_text(json.dumps(data))
+
+                with self.assertLogs("shards", "ERROR") as logs:
+                    with self.assertRaises(ValueError):
+                        _ = merge_shards([shard_dir], self.public, self.manifest)
+                self.assertIn(message, logs.output[0])
+                self.assertFalse(self.public.exists())
+                shutil.rmtree(shard_dir)
+
+
+if __name__ == "__main__":
+    _ = unittest.main()
@@ -0,0 +1,101 @@
+import os
+import unittest
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from sync import fast_copy, sync_static
+
+
+class TestSyncStatic(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.static = self.root.joinpath("static")
+        self.public = self.root.joinpath("public")
+        self.static.joinpath("images").mkdir(parents=True)
+        _ = self.static.joinpath("index.css").write_text("body {}")
+        _ = self.static.joinpath("images", "a.png").write_bytes(b"png a")
+        _ = self.static.joinpath("images", "b.png").write_bytes(b"png a")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_copies_tree(self):
+        synced = sync_static(self.static, self.public)
+        self.assertEqual(len(synced), 3)
+        self.assertEqual(self.public.joinpath("index.css").read_text(), "body {}")
+        self.assertEqual(self.public.joinpath("images", "b.png").read_bytes(), b"png a")
+
+    def test_skips_unchanged(self):
+        _ = sync_static(self.static, self.public)
+        with self.assertLogs("sync", level="INFO") as logs:
+            _ = sync_static(self.static, self.public)
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn("0 updated, 3 unchanged", logs.output[0])
+
+    def test_copies_changed(self):
+        _ = sync_static(self.static, self.public)
+        css = self.static.joinpath("index.css")
+        _ = css.write_text("body { color: red }")
+        _ = sync_static(self.static, self.public)
+        self.assertEqual(self.public.joinpath("index.css").read_text(), css.read_text())
+
+    def test_checksum_ignores_mtime(self):
+        _ = sync_static(self.static, self.public, checksum=True)
+        os.utime(self.static.joinpath("index.css"), (0, 0))
+        with self.assertLogs("sync", level="INFO") as logs:
+            _ = sync_static(self.static, self.public, checksum=True)
+        self.assertIn("0 updated", logs.output[-1])
+
+    def test_checksum_dedupes(self):
+        _ = sync_static(self.static, self.public, checksum=True)
+        a = self.public.joinpath("images", "a.png")
+        b = self.public.joinpath("images", "b.png")
+        self.assertTrue(os.path.samefile(a, b))
+
+    def test_link(self):
+        _ = sync_static(self.static, self.public, link=True, jobs=2)
+        self.assertTrue(
+            os.path.samefile(
+                self.static.joinpath("index.css"), self.public.joinpath("index.css")
+            )
+        )
+
+    def test_link_falls_back_to_copy_across_devices(self):
+        cross_device = OSError(18, "Invalid cross-device link")
+        with mock.patch("sync.os.link", side_effect=cross_device):
+            _ = sync_static(self.static, self.public, link=True)
+            src = self.static.joinpath("index.css")
+            dst = self.public.joinpath("index.css")
+            self.assertFalse(os.path.samefile(src, dst))
+            self.assertEqual(dst.stat().st_mtime_ns, src.stat().st_mtime_ns)
+            with self.assertLogs("sync", level="INFO") as logs:
+                _ = sync_static(self.static, self.public, link=True)
+        self.assertIn("0 updated, 3 unchanged", logs.output[-1])
+
+    def test_minify_writes_new_css(self):
+        _ = self.static.joinpath("index.css").write_text("body {\n  color: red;\n}\n")
+        _ = sync_static(self.static, self.public, link=True, minify=True)
+        css = self.public.joinpath("index.css")
+        self.assertEqual(css.read_text(), "body{color:red}")
+        self.assertFalse(os.path.samefile(self.static.joinpath("index.css"), css))
+        with self.assertLogs("sync", level="INFO") as logs:
+            _ = sync_static(self.static, self.public, minify=True)
+        self.assertIn("0 updated, 3 unchanged", logs.output[-1])
+
+    def test_exclude(self):
+        synced = sync_static(
+            self.static, self.public, exclude={self.static.joinpath("images", "a.png")}
+        )
+        self.assertEqual(len(synced), 2)
+        self.assertFalse(self.public.joinpath("images", "a.png").exists())
+
+    def test_fast_copy(self):
+        dst = self.root.joinpath("copy.css")
+        fast_copy(self.static.joinpath("index.css"), dst)
+        self.assertEqual(dst.read_text(), "body {}")
+
+
+if __name__ == "__main__":
+    _ = unittest.main()
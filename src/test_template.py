@@ -0,0 +1,151 @@
+import unittest
+import tempfile
+from pathlib import Path
+
+from template import Template, compile_template, load_layouts
+
+
+class TestTemplate(unittest.TestCase):
+    def test_render(self):
+        template = Template("t", "<title>{{ Title }}</title><p>{{ Content }}</p>")
+        actual = template.render({"Title": "hi", "Content": "<b>there</b>"})
+        self.assertEqual(actual, "<title>hi</title><p><b>there</b></p>")
+
+    def test_repeated_slot(self):
+        template = Template("t", "{{ Title }} and {{Title}}")
+        self.assertEqual(template.render({"Title": "x"}), "x and x")
+
+    def test_unfilled_slot_kept(self):
+        template = Template("t", "<p>{{ Footer }}</p>")
+        self.assertEqual(template.render({}), "<p>{{ Footer }}</p>")
+
+    def test_base_path(self):
+        template = Template(
+            "t", '<link href="/index.css" />{{ Content }}', "/site-generator/"
+        )
+        actual = template.render({"Content": '<img src="/images/a.png">'})
+        expected = '<link href="/site-generator/index.css" /><img src="/site-generator/images/a.png">'
+        self.assertEqual(actual, expected)
+
+    def test_matches_chained_replace(self):
+        text = Path("template.html").read_text()
+        title, content = "Tolkien", '<div><a href="/blog">blog</a></div>'
+        expected = (
+            text.replace("{{ Title }}", title)
+            .replace("{{ Content }}", content)
+            .replace('href="/', 'href="/base/')
+            .replace('src="/', 'src="/base/')
+        )
+        template = Template("template.html", text, "/base/")
+        actual = template.render({"Title": title, "Content": content})
+        self.assertEqual(actual, expected)
+
+    def test_render_chunks(self):
+        template = Template("t", '<a href="/">{{ Title }}</a>{{ Content }}', "/b/")
+        chunks = iter(['<img src="/x.png">', "<p>text</p>"])
+        actual = "".join(template.render_chunks({"Title": "t", "Content": chunks}))
+        expected = '<a href="/b/">t</a><img src="/b/x.png"><p>text</p>'
+        self.assertEqual(actual, expected)
+
+
+class TestImageVariants(unittest.TestCase):
+    def setUp(self):
+        self.images = {
+            "/images/tom.png": [
+                ("/images/tom-480w.png", 480, "image/png"),
+                ("/images/tom-480w.webp", 480, "image/webp"),
+                ("/images/tom.png", 900, "image/png"),
+                ("/images/tom.webp", 900, "image/webp"),
+            ]
+        }
+
+    def test_picture_with_srcset(self):
+        template = Template("t", "{{ Content }}", "/base/", self.images, "50vw")
+        html = template.render({"Content": '<img src="/images/tom.png" alt="Tom">'})
+        self.assertEqual(
+            html,
+            '<picture><source type="image/webp" srcset="/base/images/tom-480w.webp '
+            '480w, /base/images/tom.webp 900w" sizes="50vw"><img '
+            'src="/base/images/tom.png" srcset="/base/images/tom-480w.png 480w, '
+            '/base/images/tom.png 900w" sizes="50vw" alt="Tom"></picture>',
+        )
+
+    def test_srcset_only_without_other_types(self):
+        images = {"/a.png": [("/a-480w.png", 480, "image/png")]}
+        template = Template("t", "{{ Content }}", images=images)
+        html = template.render({"Content": '<img src="/a.png" alt="">'})
+        self.assertEqual(
+            html, '<img src="/a.png" srcset="/a-480w.png 480w" sizes="100vw" alt="">'
+        )
+
+    def test_unknown_images_untouched(self):
+        template = Template("t", "{{ Content }}", images=self.images)
+        html = '<img src="/images/other.png" alt="x"><img src="https://x/y.png">'
+        self.assertEqual(template.render({"Content": html}), html)
+
+
+class TestFingerprintedAssets(unittest.TestCase):
+    def test_rewrites_known_assets(self):
+        assets = {"/index.css": "/index.0123456789ab.css"}
+        template = Template(
+            "t",
+            '<link href="/index.css"><a href="/blog">{{ Content }}</a>',
+            "/b/",
+            assets=assets,
+        )
+        html = template.render({"Content": '<img src="/index.css">'})
+        self.assertEqual(
+            html,
+            '<link href="/b/index.0123456789ab.css"><a href="/b/blog">'
+            '<img src="/b/index.0123456789ab.css"></a>',
+        )
+
+
+class TestLayouts(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.partials = self.root.joinpath("partials")
+        self.layouts = self.root.joinpath("layouts")
+        self.content = self.root.joinpath("content")
+        self.partials.mkdir()
+        self.layouts.mkdir()
+        self.template = self.root.joinpath("template.html")
+        _ = self.template.write_text("{{> header }}<main>{{ Content }}</main>")
+        _ = self.partials.joinpath("header.html").write_text("<h1>{{ Title }}</h1>")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_partial(self):
+        template = compile_template(self.template, self.partials)
+        actual = template.render({"Title": "t", "Content": "c"})
+        self.assertEqual(actual, "<h1>t</h1><main>c</main>")
+
+    def test_missing_partial(self):
+        _ = self.template.write_text("{{> footer }}")
+        with self.assertRaises(ValueError):
+            _ = compile_template(self.template, self.partials)
+
+    def test_recursive_partial(self):
+        _ = self.partials.joinpath("header.html").write_text("{{> header }}")
+        with self.assertRaises(ValueError):
+            _ = compile_template(self.template, self.partials)
+
+    def test_section_layouts(self):
+        _ = self.layouts.joinpath("blog.html").write_text("blog {{ Content }}")
+        layouts = load_layouts(self.content, self.template, self.layouts, self.partials)
+
+        home = layouts.for_page(self.content.joinpath("index.md"))
+        post = layouts.for_page(self.content.joinpath("blog", "tom", "index.md"))
+        contact = layouts.for_page(self.content.joinpath("contact", "index.md"))
+
+        self.assertEqual(
+            home.render({"Content": "c"}), "<h1>{{ Title }}</h1><main>c</main>"
+        )
+        self.assertEqual(post.render({"Content": "c"}), "blog c")
+        self.assertIs(contact, layouts.default)
+
+
+if __name__ == "__main__":
+    _ = unittest.main()
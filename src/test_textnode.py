@@ -62,6 +62,10 @@ class TestTextNode(unittest.TestCase):
         node2 = TextNode("...to the text here", TextType.TEXT)
         self.assertNotEqual(node1, node2)
 
+    def test_no_instance_dict(self):
+        node = TextNode("text", TextType.TEXT)
+        self.assertFalse(hasattr(node, "__dict__"))
+
 
 class TestExtractMarkdownLinks(unittest.TestCase):
     def test_extract_Links(self):
@@ -321,6 +325,30 @@ class TestTextToTextNodes(unittest.TestCase):
         ]
         self.assertListEqual(actual, expected)
 
+    def test_empty_text(self):
+        self.assertListEqual(block_to_text_nodes(""), [])
+        self.assertListEqual(block_to_text_nodes("   "), [])
+
+    def test_plain_text(self):
+        sample_md = "no markup\nacross two lines"
+        actual = block_to_text_nodes(sample_md)
+        expected = [TextNode("no markup across two lines", TextType.TEXT)]
+        self.assertListEqual(actual, expected)
+
+    def test_brackets_without_links(self):
+        sample_md = "a [note] with **bold**"
+        actual = block_to_text_nodes(sample_md)
+        expected = [
+            TextNode("a [note] with ", TextType.TEXT),
+            TextNode("bold", TextType.BOLD),
+        ]
+        self.assertListEqual(actual, expected)
+
+    def test_invalid_syntax_code(self):
+        sample_md = "an `unclosed code span and a [link](boot.dev)"
+        with self.assertRaises(ValueError):
+            _ = block_to_text_nodes(sample_md)
+
 
 if __name__ == "__main__":
     _ = unittest.main()
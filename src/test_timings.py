@@ -0,0 +1,47 @@
+import unittest
+
+from timings import Timings, stage
+
+
+class TestTimings(unittest.TestCase):
+    def test_stage_records(self):
+        timings = Timings()
+        with timings.stage("read", "a.md"):
+            pass
+        with timings.stage("read", "b.md"):
+            pass
+
+        self.assertEqual(timings.stages["read"][2], 2)
+        self.assertSetEqual(set(timings.pages), {"a.md", "b.md"})
+
+    def test_merge(self):
+        timings, worker = Timings(), Timings()
+        timings.add("read", 1.0, 0.5, "a.md")
+        worker.add("read", 2.0, 1.0, "b.md")
+        worker.add("to_html", 3.0, 3.0, "b.md")
+        timings.merge(worker)
+
+        self.assertListEqual(timings.stages["read"], [3.0, 1.5, 2])
+        self.assertListEqual(timings.slowest_pages(), [("b.md", 5.0), ("a.md", 1.0)])
+
+    def test_slowest_pages_count(self):
+        timings = Timings()
+        for i in range(5):
+            timings.add("read", float(i), 0.0, f"{i}.md")
+        self.assertListEqual(timings.slowest_pages(2), [("4.md", 4.0), ("3.md", 3.0)])
+
+    def test_stage_without_timings(self):
+        with stage(None, "read"):
+            pass
+
+    def test_to_dict(self):
+        timings = Timings()
+        timings.add("read", 1.0, 0.5, "a.md")
+        report = timings.to_dict()
+        self.assertDictEqual(
+            report["pages"], {"a.md": {"read": {"wall": 1.0, "cpu": 0.5}}}
+        )
+
+
+if __name__ == "__main__":
+    _ = unittest.main()
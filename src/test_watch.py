@@ -0,0 +1,81 @@
+import unittest
+import tempfile
+import threading
+from pathlib import Path
+
+from watch import InotifyWatcher, PollingWatcher, ReloadSignal
+
+
+class TestPollingWatcher(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.page = self.root.joinpath("index.md")
+        _ = self.page.write_text("# title")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_no_changes(self):
+        watcher = PollingWatcher([self.root], interval=0.01)
+        self.assertSetEqual(watcher.wait(timeout=0.02), set())
+
+    def test_modified_and_created(self):
+        watcher = PollingWatcher([self.root], interval=0.01)
+        _ = self.page.write_text("# a longer title")
+        new_page = self.root.joinpath("blog", "index.md")
+        new_page.parent.mkdir()
+        _ = new_page.write_text("# post")
+        self.assertSetEqual(watcher.wait(timeout=1), {self.page, new_page})
+
+    def test_deleted(self):
+        watcher = PollingWatcher([self.root], interval=0.01)
+        self.page.unlink()
+        self.assertSetEqual(watcher.wait(timeout=1), {self.page})
+
+
+class TestInotifyWatcher(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.content = self.root.joinpath("content")
+        self.content.mkdir()
+        self.template = self.root.joinpath("template.html")
+        _ = self.template.write_text("{{ Content }}")
+        try:
+            self.watcher = InotifyWatcher([self.content, self.template])
+        except (OSError, AttributeError):
+            self.skipTest("inotify not available")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_new_directory(self):
+        page = self.content.joinpath("blog", "index.md")
+        page.parent.mkdir()
+        changed = self.watcher.wait(timeout=1)
+        _ = page.write_text("# post")
+        changed |= self.watcher.wait(timeout=1)
+        self.assertIn(page, changed)
+
+    def test_file_next_to_template_ignored(self):
+        _ = self.root.joinpath("notes.txt").write_text("ignored")
+        _ = self.template.write_text("<main>{{ Content }}</main>")
+        self.assertSetEqual(self.watcher.wait(timeout=1), {self.template})
+
+
+class TestReloadSignal(unittest.TestCase):
+    def test_wait_times_out(self):
+        signal = ReloadSignal()
+        self.assertEqual(signal.wait(0, timeout=0.01), 0)
+
+    def test_notify_wakes_waiter(self):
+        signal = ReloadSignal()
+        timer = threading.Timer(0.01, signal.notify)
+        timer.start()
+        self.assertEqual(signal.wait(0, timeout=1), 1)
+        timer.join()
+
+
+if __name__ == "__main__":
+    _ = unittest.main()
@@ -1,13 +1,10 @@
 from enum import Enum
 import re
+from collections.abc import Iterator
 from typing import override, Callable
 import logging
-from config import get_logging_level
 
 logger = logging.getLogger(__name__)
-logging.basicConfig(
-    level=get_logging_level(),
-)
 
 
 class TextType(Enum):
@@ -20,6 +17,8 @@ class TextType(Enum):
 
 
 class TextNode:
+    __slots__ = ("text", "text_type", "url")
+
     def __init__(self, text: str, text_type: TextType, url: str | None = None):
         self.text: str = text
         self.text_type: TextType = text_type
@@ -44,21 +43,31 @@ class TextNode:
         return f"TextNode({self.text}, {self.text_type.value}, {self.url})"
 
 
+# one alternation per inline construct, tried left to right in a single scan
+_INLINE_RE = re.compile(
+    r"!\[(?P<image_alt>[^\[\]]*)\]\((?P<image_url>[^\(\)]*)\)"
+    r"|\[(?P<link_text>[^\[\]]*)\]\((?P<link_url>[^\(\)]*)\)"
+    r"|`(?P<code>[^`]*)`"
+    r"|\*\*(?P<bold>.*?)\*\*"
+    r"|_(?P<italic>[^_]*)_"
+)
+_MARKUP_RE = re.compile(r"[\[`_*]")
+_IMAGE_RE = re.compile(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)")
+_LINK_RE = re.compile(r"\[([^\[\]]*)\]\(([^\(\)]*)\)")
+
+
 def block_to_text_nodes(text: str) -> list[TextNode]:
     """Simply pass MD text as string to be parsed, and list of TextNodes will be returned"""
     removed_nl = " ".join(line.strip() for line in text.splitlines())
-    text_node = TextNode(removed_nl, TextType.TEXT)
 
-    logger.debug(f"===========FOR INPUT {text}==============")
+    logger.debug("===========FOR INPUT %s==============", text)
+
+    if not _MARKUP_RE.search(removed_nl):
+        # empty text has no nodes, as the splitters drop empty runs
+        return [TextNode(removed_nl, TextType.TEXT)] if removed_nl else []
 
-    # image extraction MUST be run before link extraction, due to markdown syntax
-    nodes: list[TextNode] = []
     try:
-        nodes = _split_nodes([text_node], extractor=_split_node_images)
-        nodes = _split_nodes(nodes, extractor=_split_node_links)
-        nodes = _split_nodes(nodes, "`", TextType.CODE)
-        nodes = _split_nodes(nodes, "_", TextType.ITALIC)
-        nodes = _split_nodes(nodes, "**", TextType.BOLD)
+        nodes = _tokenize_inline(removed_nl)
     except ValueError:
         logger.exception("error splitting nodes")
         raise
@@ -66,6 +75,68 @@ def block_to_text_nodes(text: str) -> list[TextNode]:
     return nodes
 
 
+def iter_references(text: str) -> Iterator[tuple[int, TextNode]]:
+    """(offset, node) of the links and images block_to_text_nodes would find in text
+
+    Unlike block_to_text_nodes this never raises on stray markup, so a page with
+    a broken paragraph can still be checked.
+    """
+    for match in _INLINE_RE.finditer(text):
+        if match.lastgroup == "image_url":
+            node = TextNode(match["image_alt"], TextType.IMAGE, match["image_url"])
+        elif match.lastgroup == "link_url":
+            node = TextNode(match["link_text"], TextType.LINK, match["link_url"])
+        else:
+            continue
+        yield match.start(), node
+
+
+def _tokenize_inline(text: str) -> list[TextNode]:
+    # plain text waits as (text, run) until the scan ends, because the old link
+    # splitter dropped stray "[" from any run between images that contained a link
+    tokens: list[TextNode | tuple[str, int]] = []
+    runs_with_links: set[int] = set()
+    run = 0
+
+    pos = 0
+    for match in _INLINE_RE.finditer(text):
+        tokens.append((text[pos : match.start()], run))
+        pos = match.end()
+
+        kind = match.lastgroup
+        if kind == "image_url":
+            tokens.append(
+                TextNode(match["image_alt"], TextType.IMAGE, match["image_url"])
+            )
+            run += 1
+        elif kind == "link_url":
+            runs_with_links.add(run)
+            tokens.append(
+                TextNode(match["link_text"], TextType.LINK, match["link_url"])
+            )
+        elif kind == "code" and match["code"]:
+            tokens.append(TextNode(match["code"], TextType.CODE))
+        elif kind == "bold" and match["bold"]:
+            tokens.append(TextNode(match["bold"], TextType.BOLD))
+        elif kind == "italic" and match["italic"]:
+            tokens.append(TextNode(match["italic"], TextType.ITALIC))
+    tokens.append((text[pos:], run))
+
+    output: list[TextNode] = []
+    for token in tokens:
+        if isinstance(token, TextNode):
+            output.append(token)
+            continue
+
+        segment, segment_run = token
+        if "`" in segment or "_" in segment or "**" in segment:
+            raise ValueError("Invalid input: that is invalid Markdown syntax")
+        pieces = segment.split("[") if segment_run in runs_with_links else [segment]
+        output.extend(TextNode(piece, TextType.TEXT) for piece in pieces if piece)
+
+    return output
+
+
 def _split_nodes(
     old_nodes: list[TextNode],
     delimiter: str | None = None,
@@ -172,8 +243,8 @@ def _split_by_extractables(
 
 
 def _extract_markdown_images(text: str) -> list[tuple[str, str]]:
-    return re.findall(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)", text)
+    return _IMAGE_RE.findall(text)
 
 
 def _extract_markdown_links(text: str) -> list[tuple[str, str]]:
-    return re.findall(r"\[([^\[\]]*)\]\(([^\(\)]*)\)", text)
+    return _LINK_RE.findall(text)
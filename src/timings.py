@@ -0,0 +1,117 @@
+from __future__ import annotations
+import json
+import time
+import logging
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import ContextManager
+
+logger = logging.getLogger(__name__)
+
+
+class Timings:
+    """Wall and CPU time per build stage, and per page for page stages
+
+    Stages may run on several threads, CPU time is that of the calling thread.
+    """
+
+    def __init__(self):
+        # stage -> [wall, cpu, calls]
+        self.stages: dict[str, list[float]] = {}
+        # page -> stage -> [wall, cpu]
+        self.pages: dict[str, dict[str, list[float]]] = {}
+        self.lock: threading.Lock = threading.Lock()
+
+    def __getstate__(self) -> dict[str, object]:
+        return {"stages": self.stages, "pages": self.pages}
+
+    def __setstate__(self, state: dict[str, object]):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str, page: str | None = None) -> Iterator[None]:
+        wall, cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - wall, time.thread_time() - cpu, page)
+
+    def add(self, name: str, wall: float, cpu: float, page: str | None = None):
+        with self.lock:
+            self._add(name, wall, cpu, page)
+
+    def _add(self, name: str, wall: float, cpu: float, page: str | None):
+        totals = self.stages.setdefault(name, [0.0, 0.0, 0])
+        totals[0] += wall
+        totals[1] += cpu
+        totals[2] += 1
+
+        if page is not None:
+            page_totals = self.pages.setdefault(page, {}).setdefault(name, [0.0, 0.0])
+            page_totals[0] += wall
+            page_totals[1] += cpu
+
+    def merge(self, other: Timings):
+        """Fold in timings recorded by a worker process"""
+        for name, (wall, cpu, calls) in other.stages.items():
+            totals = self.stages.setdefault(name, [0.0, 0.0, 0])
+            totals[0] += wall
+            totals[1] += cpu
+            totals[2] += calls
+
+        for page, stages in other.pages.items():
+            for name, (wall, cpu) in stages.items():
+                page_totals = self.pages.setdefault(page, {}).setdefault(
+                    name, [0.0, 0.0]
+                )
+                page_totals[0] += wall
+                page_totals[1] += cpu
+
+    def slowest_pages(self, count: int = 10) -> list[tuple[str, float]]:
+        walls = {
+            page: sum(wall for wall, _ in stages.values())
+            for page, stages in self.pages.items()
+        }
+        return sorted(walls.items(), key=lambda item: item[1], reverse=True)[:count]
+
+    def to_dict(self) -> dict[str, object]:
+        return {
+            "stages": {
+                name: {"wall": wall, "cpu": cpu, "calls": int(calls)}
+                for name, (wall, cpu, calls) in self.stages.items()
+            },
+            "pages": {
+                page: {
+                    name: {"wall": wall, "cpu": cpu}
+                    for name, (wall, cpu) in stages.items()
+                }
+                for page, stages in sorted(self.pages.items())
+            },
+        }
+
+    def save(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def log_summary(self, count: int = 10):
+        logger.info("%-20s %10s %10s %8s", "stage", "wall ms", "cpu ms", "calls")
+        for name, (wall, cpu, calls) in self.stages.items():
+            logger.info(
+                "%-20s %10.1f %10.1f %8d", name, wall * 1000, cpu * 1000, calls
+            )
+
+        for page, wall in self.slowest_pages(count):
+            logger.info("slow page %8.1fms %s", wall * 1000, page)
+
+
+def stage(
+    timings: Timings | None, name: str, page: str | None = None
+) -> ContextManager[None]:
+    """Time a stage if timings are being recorded, otherwise do nothing"""
+    if timings is None:
+        return nullcontext()
+    return timings.stage(name, page)
@@ -0,0 +1,271 @@
+from __future__ import annotations
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import logging
+import threading
+import ctypes
+import ctypes.util
+from collections.abc import Callable, Iterable
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+RELOAD_PATH = "/__livereload"
+RELOAD_SCRIPT = (
+    f'<script>new EventSource("{RELOAD_PATH}").onmessage = '
+    "() => location.reload();</script>"
+).encode()
+
+# from sys/inotify.h
+_IN_CLOSE_WRITE = 0x008
+_IN_MOVED_FROM = 0x040
+_IN_MOVED_TO = 0x080
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_IN_Q_OVERFLOW = 0x4000
+_IN_ISDIR = 0x40000000
+_IN_MASK = _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class PollingWatcher:
+    """Finds changes by comparing size and mtime snapshots of the watched paths"""
+
+    def __init__(self, paths: Iterable[Path], interval: float = 0.25):
+        self.paths: list[Path] = list(paths)
+        self.interval: float = interval
+        self.snapshot: dict[Path, tuple[int, int]] = self._scan()
+
+    def _scan(self) -> dict[Path, tuple[int, int]]:
+        snapshot: dict[Path, tuple[int, int]] = {}
+        for root in self.paths:
+            if root.is_file():
+                stat = os.stat(root)
+                snapshot[root] = (stat.st_size, stat.st_mtime_ns)
+                continue
+            for dirpath, _, filenames in os.walk(root):
+                for filename in filenames:
+                    path = Path(dirpath, filename)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    snapshot[path] = (stat.st_size, stat.st_mtime_ns)
+
+        return snapshot
+
+    def wait(self, timeout: float | None = None) -> set[Path]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            snapshot = self._scan()
+            changed = {
+                path
+                for path in snapshot.keys() | self.snapshot.keys()
+                if snapshot.get(path) != self.snapshot.get(path)
+            }
+            self.snapshot = snapshot
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
+            time.sleep(self.interval)
+
+
+class InotifyWatcher:
+    """Linux inotify through libc, watching directories recursively"""
+
+    def __init__(self, paths: Iterable[Path]):
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd: int = self.libc.inotify_init1(os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        self.dirs: dict[int, Path] = {}
+        # single files are watched through their directory, as editors replace them
+        self.files: dict[Path, set[str]] = {}
+        self.roots: list[Path] = []
+        for path in paths:
+            if path.is_dir():
+                self.roots.append(path)
+                self._add_tree(path)
+            else:
+                self.files.setdefault(path.parent, set()).add(path.name)
+                self._add_dir(path.parent)
+
+    def _add_dir(self, path: Path) -> None:
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), _IN_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"cannot watch {path}")
+        self.dirs[wd] = path
+
+    def _add_tree(self, root: Path) -> set[Path]:
+        """Watch root and its subdirectories, returning the files already inside"""
+        found: set[Path] = set()
+        for dirpath, _, filenames in os.walk(root):
+            self._add_dir(Path(dirpath))
+            found.update(Path(dirpath, filename) for filename in filenames)
+
+        return found
+
+    def wait(self, timeout: float | None = None) -> set[Path]:
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+
+        changed: set[Path] = set()
+        data = os.read(self.fd, 64 * 1024)
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(data[offset : offset + length].rstrip(b"\0"))
+            offset += length
+
+            if mask & _IN_Q_OVERFLOW:
+                logger.warning("inotify queue overflowed, rebuilding everything")
+                changed.update(self.roots)
+                continue
+
+            parent = self.dirs.get(wd)
+            if parent is None:
+                continue
+            if parent in self.files and name not in self.files[parent]:
+                continue  # another file next to a watched one
+
+            path = parent.joinpath(name)
+            changed.add(path)
+            if mask & _IN_ISDIR and mask & (_IN_CREATE | _IN_MOVED_TO):
+                changed.update(self._add_tree(path))
+
+        return changed
+
+
+def make_watcher(paths: Iterable[Path]) -> InotifyWatcher | PollingWatcher:
+    paths = [path for path in paths if path.exists()]
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(paths)
+        except (OSError, AttributeError) as err:
+            if getattr(err, "errno", None) == errno.ENOSPC:
+                logger.warning("inotify watch limit reached")
+            logger.warning("inotify unavailable (%s), polling for changes", err)
+
+    return PollingWatcher(paths)
+
+
+class ReloadSignal:
+    def __init__(self):
+        self.version: int = 0
+        self.condition: threading.Condition = threading.Condition()
+
+    def notify(self):
+        with self.condition:
+            self.version += 1
+            self.condition.notify_all()
+
+    def wait(self, version: int, timeout: float) -> int:
+        with self.condition:
+            _ = self.condition.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+
+class LiveReloadHandler(SimpleHTTPRequestHandler):
+    """Serves the output tree, injecting a reload script into every HTML page"""
+
+    def __init__(self, *args, reload: ReloadSignal, **kwargs):
+        self.reload: ReloadSignal = reload
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self):
+        if self.path == RELOAD_PATH:
+            return self._stream_reloads()
+
+        url_path = self.path.split("?", 1)[0]
+        path = Path(self.translate_path(self.path))
+        if url_path.endswith("/"):
+            path = path.joinpath("index.html")
+        if not (path.suffix == ".html" and path.is_file()):
+            return super().do_GET()
+
+        body = path.read_bytes()
+        idx = body.rfind(b"</body>")
+        body = body[:idx] + RELOAD_SCRIPT + body[idx:] if idx >= 0 else body
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        _ = self.wfile.write(body)
+
+    def _stream_reloads(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+
+        version = self.reload.version
+        while True:
+            new_version = self.reload.wait(version, timeout=15)
+            # a comment line keeps idle connections open and detects closed tabs
+            message = b"data: reload\n\n" if new_version != version else b": ping\n\n"
+            version = new_version
+            try:
+                _ = self.wfile.write(message)
+                self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                return
+
+    def log_message(self, format: str, *args: object):
+        logger.debug(format, *args)
+
+
+def watch_and_serve(
+    public_path: Path,
+    watched: Iterable[Path],
+    on_change: Callable[[set[Path]], None],
+    port: int = 8888,
+    debounce: float = 0.05,
+):
+    reload = ReloadSignal()
+    handler = partial(LiveReloadHandler, directory=str(public_path), reload=reload)
+    server = ThreadingHTTPServer(("", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    watcher = make_watcher(watched)
+    logger.info(
+        "serving %s on http://localhost:%d, watching with %s",
+        public_path,
+        port,
+        type(watcher).__name__,
+    )
+
+    try:
+        while True:
+            changes = watcher.wait()
+            # editors often write several files at once, collect them into one rebuild
+            while more := watcher.wait(timeout=debounce):
+                changes |= more
+            if not changes:
+                continue
+
+            started = time.perf_counter()
+            try:
+                on_change(changes)
+            except Exception:
+                logger.exception("rebuild failed, keeping the previous output")
+                continue
+            logger.info(
+                "rebuilt %d changed paths in %.1fms",
+                len(changes),
+                (time.perf_counter() - started) * 1000,
+            )
+            reload.notify()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()